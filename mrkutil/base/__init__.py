@@ -1,6 +1,14 @@
 from .base_handler import BaseHandler
+from .cancellation_token import CancellationToken
+from .context import get_correlation_id
+from .handler_manifest import HandlerManifest
+from .handler_registry import HandlerRegistry
 
 
 __all__ = [
-    "BaseHandler"
+    "BaseHandler",
+    "CancellationToken",
+    "get_correlation_id",
+    "HandlerManifest",
+    "HandlerRegistry",
 ]
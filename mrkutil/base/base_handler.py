@@ -1,9 +1,18 @@
 import abc
+import importlib
 import logging
+import threading
+from typing import Callable
+from mrkutil.enum import HandlerLifecycleEnum, MiddlewareKindEnum
 from mrkutil.responses import ServiceResponse
+from .handler_manifest import HandlerManifest
+from .handler_registry import HandlerRegistry
+from .middleware import Middleware
 
 logger = logging.getLogger(__name__)
 
+_manifest_lock = threading.RLock()
+
 
 class BaseHandler(metaclass=abc.ABCMeta):
     """
@@ -11,20 +20,150 @@ class BaseHandler(metaclass=abc.ABCMeta):
 
     This class defines the interface for handlers and provides a method for processing data.
     Subclasses must implement the `name` and `process` methods.
+    Subclasses may set `timeout` (seconds) to limit execution time when run by a Subscriber.
+    Subclasses may set `lifecycle` to reuse instances between messages, see `HandlerLifecycleEnum`;
+    reused instances are shared between threads and must be thread-safe.
+    Middlewares added with `add_middleware` to BaseHandler or to a handler family base
+    (a class declaring `sub_classes` in its own body) are compiled into the family registry once.
+    With `use_manifest`, handler modules are imported on the first message for their method.
     """
 
     sub_classes = {}
+    timeout: float | None = None
+    lifecycle: HandlerLifecycleEnum = HandlerLifecycleEnum.TRANSIENT
+    pool_size: int = 10
 
     @classmethod
     def initialize(cls):
-        for sub_cls in cls.__subclasses__():
-            try:
-                name = sub_cls.name()
-                if name:
-                    cls.sub_classes[name] = sub_cls
-            except (NotImplementedError, TypeError):
-                # Skip classes that don't properly implement the abstract methods
-                continue
+        # The built registry is kept apart from `sub_classes`, which marks family bases
+        cls._registry = HandlerRegistry.build(cls, cls.get_middlewares())
+        cls._registry_source = cls.__dict__.get("sub_classes")
+
+    @classmethod
+    def get_middlewares(cls) -> list[Middleware]:
+        """
+        Get the middlewares of this class and its base classes, outermost first.
+
+        Returns:
+            list[Middleware]: The middlewares.
+        """
+        return [
+            middleware
+            for klass in reversed(cls.__mro__)
+            for middleware in klass.__dict__.get("_middlewares", ())
+        ]
+
+    @classmethod
+    def add_middleware(
+        cls,
+        kind: MiddlewareKindEnum,
+        hook: Callable,
+        methods: list[str] | None = None,
+    ) -> Callable:
+        """
+        Add a middleware to this handler family, see `Middleware` for the hook signatures.
+
+        Adding one to a built registry recompiles its pipelines; reused handler
+        instances are kept.
+
+        Args:
+            kind (MiddlewareKindEnum): When the hook runs.
+            hook (Callable): The hook.
+            methods (list[str], optional): Methods the hook applies to. Defaults to None, all of them.
+
+        Returns:
+            Callable: The hook.
+        """
+        if "_middlewares" not in cls.__dict__:
+            cls._middlewares = []
+        cls._middlewares.append(
+            Middleware(
+                MiddlewareKindEnum(kind), hook, frozenset(methods) if methods else None
+            )
+        )
+        registry = cls.__dict__.get("_registry")
+        if registry is not None:
+            registry.set_middlewares(cls.get_middlewares())
+        return hook
+
+    @classmethod
+    def use_manifest(cls, manifest: HandlerManifest | str, preload: bool = False):
+        """
+        Import handler modules of this family lazily, on the first use of their method.
+
+        Args:
+            manifest (HandlerManifest | str): The manifest, or the path of a saved one.
+            preload (bool, optional): Import all handler modules in a background thread.
+                Defaults to False.
+
+        Returns:
+            threading.Thread | None: The preload thread, if started.
+        """
+        if isinstance(manifest, str):
+            manifest = HandlerManifest.load(manifest)
+        cls._manifest = manifest
+        if not preload:
+            return None
+        thread = threading.Thread(
+            target=cls._preload_manifest, name=f"{cls.__name__}-preload", daemon=True
+        )
+        thread.start()
+        return thread
+
+    @classmethod
+    def _preload_manifest(cls):
+        cls.__dict__["_manifest"].import_all()
+        with _manifest_lock:
+            cls._rebuild()
+        logger.info(f"Preloaded {len(cls.get_registry())} handlers")
+
+    @classmethod
+    def _rebuild(cls):
+        previous = cls.__dict__.get("_registry")
+        cls.initialize()
+        if previous is not None:
+            cls._registry.adopt_pools(previous)
+
+    @classmethod
+    def _load_from_manifest(cls, method: str):
+        manifest = cls.__dict__.get("_manifest")
+        if manifest is None or method not in manifest:
+            return None
+        with _manifest_lock:
+            handler = cls.get_registry().get(method, None)
+            if handler is None:
+                logger.info(f"Importing {manifest[method]} for method {method}")
+                importlib.import_module(manifest[method])
+                cls._rebuild()
+                handler = cls.get_registry().get(method, None)
+        return handler
+
+    @classmethod
+    def get_registry(cls) -> HandlerRegistry:
+        """
+        Get the handler registry of this handler family, building it on the first use.
+
+        A mapping assigned to `sub_classes` by hand is used as is instead of the
+        subclass tree, and replaces the registry built before.
+
+        Returns:
+            HandlerRegistry: The registry.
+        """
+        declared = cls.__dict__.get("sub_classes")
+        registry = cls.__dict__.get("_registry")
+        if registry is not None and cls.__dict__.get("_registry_source") is declared:
+            return registry
+        if declared:
+            cls._registry = HandlerRegistry(declared, cls.get_middlewares())
+            cls._registry_source = declared
+        else:
+            cls.initialize()
+        return cls._registry
+
+    def setup(self):
+        """
+        Prepare expensive state, called once for every created instance.
+        """
 
     @abc.abstractmethod
     def name():
@@ -41,6 +180,9 @@ class BaseHandler(metaclass=abc.ABCMeta):
         """
         Process the data.
 
+        Implementations may be coroutines, and may accept a `cancel_token`
+        keyword argument to receive a CancellationToken for cooperative cancellation.
+
         Args:
             data (dict): The data to be processed.
             corr_id (str): The correlation ID.
@@ -51,26 +193,40 @@ class BaseHandler(metaclass=abc.ABCMeta):
         raise NotImplementedError
 
     @classmethod
-    def process_data(cls, data: dict, corr_id: str):
+    def get_handler(cls, method: str):
+        """
+        Get the handler class registered for the method.
+
+        Args:
+            method (str): The method name.
+
+        Returns:
+            type[BaseHandler] | None: The handler class, or None if there is none.
+        """
+        handler = cls.get_registry().get(method, None)
+        if handler is None:
+            handler = cls._load_from_manifest(method)
+        return handler
+
+    @classmethod
+    def process_data(cls, data: dict, corr_id: str, cancel_token=None):
         """
         Process the data using the appropriate handler.
 
         Args:
             data (dict): The data to be processed.
             corr_id (str): The correlation ID.
+            cancel_token (CancellationToken, optional): Passed on to handlers accepting it.
 
         Returns:
             dict: The result of the processing.
         """
-
-        # Initialize subl class list on the first use
-        if not cls.sub_classes:
-            cls.initialize()
-
         logger.info(f"process_data method: {data.get('method')}")
-        handler = cls.sub_classes.get(data.get("method", ""), None)
+        handler = cls.get_handler(data.get("method", ""))
         if handler:
             logger.info(f"process_data found method {handler}")
-            return handler().process(data, corr_id)
+            return cls.get_registry().call(
+                data.get("method", ""), data, corr_id, cancel_token
+            )
         logger.warning(f"No handler covering this method, method: {data.get('method')}")
         return ServiceResponse(code=404, message="Method not found.")
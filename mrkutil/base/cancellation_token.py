@@ -0,0 +1,48 @@
+import threading
+from mrkutil.exception import HandlerTimeoutException
+
+
+class CancellationToken:
+    """
+    Cooperative cancellation signal passed to handlers that accept a ``cancel_token``.
+
+    Long running handlers should check ``cancelled`` or call ``raise_if_cancelled``
+    between steps, and use ``wait`` instead of ``time.sleep`` so they stop as soon
+    as the Subscriber gives up on the message.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._done = False
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        self._event.set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise HandlerTimeoutException()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """
+        Sleep up to ``timeout`` seconds, returning True early if cancelled.
+        """
+        return self._event.wait(timeout)
+
+    def _cancel_running(self) -> bool:
+        # Cancel only if the work has not finished yet, returns whether it was cancelled
+        with self._lock:
+            if self._done:
+                return False
+            self._event.set()
+            return True
+
+    def _finish(self) -> bool:
+        # Mark the work as finished, returns whether it had already been cancelled
+        with self._lock:
+            self._done = True
+            return self._event.is_set()
@@ -0,0 +1,13 @@
+from contextvars import ContextVar
+
+correlation_id: ContextVar[str | None] = ContextVar("correlation_id", default=None)
+
+
+def get_correlation_id() -> str | None:
+    """
+    Get the correlation ID of the message processed by the current thread or task.
+
+    Returns:
+        str | None: The correlation ID, None outside of message processing.
+    """
+    return correlation_id.get()
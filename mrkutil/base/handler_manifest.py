@@ -0,0 +1,72 @@
+import importlib
+import logging
+import orjson
+from collections.abc import Mapping
+from mrkutil.utilities import import_all_subclasses_from_package
+
+logger = logging.getLogger(__name__)
+
+
+class HandlerManifest(Mapping):
+    """
+    Immutable mapping of method names to the modules defining their handlers.
+
+    Generated at build time so services can import handler modules on first use
+    instead of importing the whole handlers package at startup.
+
+    Args:
+        modules (Mapping[str, str]): Method name to module name mapping.
+    """
+
+    def __init__(self, modules: Mapping[str, str]):
+        self._modules = dict(modules)
+
+    @classmethod
+    def build(cls, package_name: str, root) -> "HandlerManifest":
+        """
+        Import every module of the package and record where each handler of `root` is defined.
+
+        Args:
+            package_name (str): The handlers package, e.g. "package.app.handlers".
+            root (type[BaseHandler]): The handler family base class.
+
+        Returns:
+            HandlerManifest: The manifest.
+        """
+        import_all_subclasses_from_package(package_name)
+        root.initialize()
+        return cls(
+            {name: handler.__module__ for name, handler in root.get_registry().items()}
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "HandlerManifest":
+        with open(path, "rb") as file:
+            return cls(orjson.loads(file.read()))
+
+    def save(self, path: str):
+        with open(path, "wb") as file:
+            file.write(
+                orjson.dumps(
+                    self._modules, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS
+                )
+            )
+
+    def __getitem__(self, method):
+        return self._modules[method]
+
+    def __iter__(self):
+        return iter(self._modules)
+
+    def __len__(self):
+        return len(self._modules)
+
+    def import_all(self):
+        """
+        Import every module of the manifest.
+        """
+        for module in sorted(set(self._modules.values())):
+            try:
+                importlib.import_module(module)
+            except Exception as e:
+                logger.exception(f"Failed to import handler module {module}: {e}")
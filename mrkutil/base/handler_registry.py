@@ -0,0 +1,278 @@
+import inspect
+import logging
+import queue
+import threading
+from collections.abc import Mapping
+from functools import lru_cache
+from mrkutil.enum import HandlerLifecycleEnum
+from .context import correlation_id
+from .middleware import Middleware, compile_pipeline
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def _accepts_cancel_token(process) -> bool:
+    return "cancel_token" in inspect.signature(process).parameters
+
+
+async def _with_correlation_id(awaitable, corr_id: str):
+    token = correlation_id.set(corr_id)
+    try:
+        return await awaitable
+    finally:
+        correlation_id.reset(token)
+
+
+async def _release_after(awaitable, pool, instance):
+    try:
+        return await awaitable
+    finally:
+        pool.release(instance)
+
+
+class HandlerInstancePool:
+    """
+    Provides handler instances according to the handler `lifecycle`.
+
+    TRANSIENT creates a new instance per message, SINGLETON shares one instance and
+    POOLED reuses up to `pool_size` instances, blocking when all of them are busy.
+    Every instance has its `setup` hook called once, right after it is created.
+
+    Args:
+        handler_cls (type[BaseHandler]): The handler class.
+    """
+
+    def __init__(self, handler_cls):
+        self.handler_cls = handler_cls
+        self.lifecycle = HandlerLifecycleEnum(handler_cls.lifecycle)
+        self.pool_size = handler_cls.pool_size
+        self._lock = threading.Lock()
+        self._singleton = None
+        self._idle = queue.LifoQueue()
+        self._created = 0
+
+    def _create(self):
+        instance = self.handler_cls()
+        instance.setup()
+        return instance
+
+    def acquire(self):
+        if self.lifecycle == HandlerLifecycleEnum.TRANSIENT:
+            return self._create()
+        if self.lifecycle == HandlerLifecycleEnum.SINGLETON:
+            if self._singleton is None:
+                with self._lock:
+                    if self._singleton is None:
+                        self._singleton = self._create()
+            return self._singleton
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_create = self._created < self.pool_size
+            if can_create:
+                self._created += 1
+        if not can_create:
+            return self._idle.get()
+        try:
+            return self._create()
+        except BaseException:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def release(self, instance):
+        if self.lifecycle == HandlerLifecycleEnum.POOLED:
+            self._idle.put(instance)
+
+    def warm_up(self):
+        """
+        Create the singleton or the first pooled instance ahead of the first message.
+        """
+        if self.lifecycle != HandlerLifecycleEnum.TRANSIENT:
+            self.release(self.acquire())
+
+
+class HandlerRegistry(Mapping):
+    """
+    Immutable mapping of method names to handler classes.
+
+    Built once by walking the whole subclass tree of a handler family, so handlers
+    deriving from intermediate base classes are found too. Holds the instance pool
+    of every registered handler and the compiled middleware pipeline of every
+    method with middlewares.
+
+    Args:
+        handlers (Mapping, optional): Method name to handler class mapping.
+        middlewares (list[Middleware], optional): Middlewares of the handler family.
+    """
+
+    def __init__(
+        self, handlers: Mapping | None = None, middlewares: list[Middleware] = ()
+    ):
+        self._handlers = dict(handlers or {})
+        self._pools = {}
+        self._pools_lock = threading.Lock()
+        self._pipelines = {}
+        self.set_middlewares(middlewares)
+
+    def set_middlewares(self, middlewares: list[Middleware]):
+        """
+        Recompile the middleware pipelines, keeping the reused handler instances.
+
+        Args:
+            middlewares (list[Middleware]): Middlewares of the handler family.
+        """
+        pipelines = {}
+        for name, handler_cls in self._handlers.items():
+            pipeline = compile_pipeline(
+                handler_cls, name, self._invoker(handler_cls), list(middlewares)
+            )
+            if pipeline is not None:
+                pipelines[name] = pipeline
+        self._pipelines = pipelines
+
+    @classmethod
+    def build(cls, root, middlewares: list[Middleware] = ()) -> "HandlerRegistry":
+        """
+        Collect every concrete subclass of `root` with a non empty `name()`.
+
+        Subclasses declaring `sub_classes` in their own class body start a
+        separate handler family, so their descendants are left to that family's registry.
+
+        Args:
+            root (type[BaseHandler]): The handler family base class.
+            middlewares (list[Middleware], optional): Middlewares of the handler family.
+
+        Returns:
+            HandlerRegistry: The registry.
+
+        Raises:
+            ValueError: If two different handlers use the same method name.
+        """
+        handlers = {}
+        pending = list(root.__subclasses__())
+        seen = set()
+        while pending:
+            sub_cls = pending.pop(0)
+            if sub_cls in seen:
+                continue
+            seen.add(sub_cls)
+            if "sub_classes" not in sub_cls.__dict__:
+                pending.extend(sub_cls.__subclasses__())
+            if inspect.isabstract(sub_cls):
+                continue
+            try:
+                name = sub_cls.name()
+            except (NotImplementedError, TypeError):
+                # Skip classes that don't properly implement the abstract methods
+                continue
+            if not name:
+                continue
+            existing = handlers.get(name)
+            if existing is not None and existing is not sub_cls:
+                if (existing.__module__, existing.__qualname__) != (
+                    sub_cls.__module__,
+                    sub_cls.__qualname__,
+                ):
+                    raise ValueError(
+                        f"Duplicate handler method {name}: {existing} and {sub_cls}"
+                    )
+                logger.warning(f"Handler {sub_cls} redefined, using the latest one")
+            handlers[name] = sub_cls
+        return cls(handlers, middlewares)
+
+    def __getitem__(self, name):
+        return self._handlers[name]
+
+    def __iter__(self):
+        return iter(self._handlers)
+
+    def __len__(self):
+        return len(self._handlers)
+
+    def __repr__(self):
+        return f"HandlerRegistry({self._handlers!r})"
+
+    def pool(self, handler_cls) -> HandlerInstancePool:
+        pool = self._pools.get(handler_cls)
+        if pool is None:
+            with self._pools_lock:
+                pool = self._pools.get(handler_cls)
+                if pool is None:
+                    pool = self._pools[handler_cls] = HandlerInstancePool(handler_cls)
+        return pool
+
+    def _invoker(self, handler_cls):
+        def invoke(data, corr_id, cancel_token=None):
+            return self.invoke(handler_cls, data, corr_id, cancel_token)
+
+        return invoke
+
+    def invoke(self, handler_cls, data: dict, corr_id: str, cancel_token=None):
+        """
+        Run a handler on an instance from its pool, without middlewares.
+        """
+        pool = self.pool(handler_cls)
+        instance = pool.acquire()
+        try:
+            if cancel_token is not None and _accepts_cancel_token(handler_cls.process):
+                result = instance.process(data, corr_id, cancel_token=cancel_token)
+            else:
+                result = instance.process(data, corr_id)
+        except BaseException:
+            pool.release(instance)
+            raise
+        if (
+            inspect.isawaitable(result)
+            and pool.lifecycle == HandlerLifecycleEnum.POOLED
+        ):
+            return _release_after(result, pool, instance)
+        pool.release(instance)
+        return result
+
+    def call(self, method: str, data: dict, corr_id: str, cancel_token=None):
+        """
+        Run the handler of a method through its middleware pipeline, exposing the
+        correlation ID to the code it calls through `get_correlation_id`.
+
+        Args:
+            method (str): The method name.
+            data (dict): The data to be processed.
+            corr_id (str): The correlation ID.
+            cancel_token (CancellationToken, optional): Passed on to handlers accepting it.
+
+        Returns:
+            dict: The result of the processing.
+        """
+        token = correlation_id.set(corr_id)
+        try:
+            pipeline = self._pipelines.get(method)
+            if pipeline is not None:
+                result = pipeline(data, corr_id, cancel_token)
+            else:
+                result = self.invoke(
+                    self._handlers[method], data, corr_id, cancel_token
+                )
+        finally:
+            correlation_id.reset(token)
+        if inspect.isawaitable(result):
+            return _with_correlation_id(result, corr_id)
+        return result
+
+    def adopt_pools(self, previous: "HandlerRegistry"):
+        """
+        Keep the instance pools of handlers already registered in a previous registry.
+        """
+        for handler_cls, pool in previous._pools.items():
+            if handler_cls in self._handlers.values():
+                self._pools.setdefault(handler_cls, pool)
+
+    def warm_up(self):
+        """
+        Create singleton and pooled handler instances, running their `setup` hooks.
+        """
+        for handler_cls in set(self._handlers.values()):
+            self.pool(handler_cls).warm_up()
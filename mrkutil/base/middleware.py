@@ -0,0 +1,93 @@
+import inspect
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable
+from mrkutil.enum import MiddlewareKindEnum
+
+
+@dataclass(frozen=True)
+class Middleware:
+    """
+    Hook run around handler execution.
+
+    BEFORE hooks are called as ``hook(data, corr_id)`` and may validate or change the data.
+    AFTER hooks are called as ``hook(data, corr_id, result)`` and return the result to send.
+    AROUND hooks are called as ``hook(call_next, data, corr_id)`` and return
+    ``call_next(data, corr_id)`` or their own result; for coroutine handlers
+    ``call_next`` returns an awaitable.
+
+    Attributes:
+        kind (MiddlewareKindEnum): When the hook runs.
+        hook (Callable): The hook.
+        methods (frozenset[str] | None): Methods the hook applies to, None for all of them.
+    """
+
+    kind: MiddlewareKindEnum
+    hook: Callable
+    methods: frozenset[str] | None = None
+
+    def applies_to(self, method: str) -> bool:
+        return self.methods is None or method in self.methods
+
+
+def _before(hook, call_next):
+    def call(data, corr_id, cancel_token=None):
+        hook(data, corr_id)
+        return call_next(data, corr_id, cancel_token)
+
+    return call
+
+
+def _after(hook, call_next):
+    def call(data, corr_id, cancel_token=None):
+        return hook(data, corr_id, call_next(data, corr_id, cancel_token))
+
+    return call
+
+
+def _async_after(hook, call_next):
+    async def call(data, corr_id, cancel_token=None):
+        return hook(data, corr_id, await call_next(data, corr_id, cancel_token))
+
+    return call
+
+
+def _around(hook, call_next):
+    def call(data, corr_id, cancel_token=None):
+        if cancel_token is None:
+            return hook(call_next, data, corr_id)
+        return hook(partial(call_next, cancel_token=cancel_token), data, corr_id)
+
+    return call
+
+
+def compile_pipeline(
+    handler_cls, method: str, invoke: Callable, middlewares: list[Middleware]
+) -> Callable | None:
+    """
+    Compose the middlewares applying to a method into a single callable.
+
+    The first middleware is the outermost one.
+
+    Args:
+        handler_cls (type[BaseHandler]): The handler class of the method.
+        method (str): The method name.
+        invoke (Callable): Runs the handler, ``invoke(data, corr_id, cancel_token)``.
+        middlewares (list[Middleware]): Middlewares of the handler family.
+
+    Returns:
+        Callable | None: The pipeline, or None if no middleware applies to the method.
+    """
+    applying = [m for m in middlewares if m.applies_to(method)]
+    if not applying:
+        return None
+    is_async = inspect.iscoroutinefunction(handler_cls.process)
+    call = invoke
+    for middleware in reversed(applying):
+        if middleware.kind == MiddlewareKindEnum.BEFORE:
+            call = _before(middleware.hook, call)
+        elif middleware.kind == MiddlewareKindEnum.AFTER:
+            call = (_async_after if is_async else _after)(middleware.hook, call)
+        else:
+            call = _around(middleware.hook, call)
+    return call
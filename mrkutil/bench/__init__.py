@@ -0,0 +1,20 @@
+from .runner import (
+    BenchmarkResult,
+    benchmark,
+    measure,
+    summarize,
+    run_benchmarks,
+    compare_results,
+)
+from . import communication  # noqa: F401  registers the communication benchmarks
+from . import cache  # noqa: F401  registers the cache benchmarks
+
+
+__all__ = [
+    "BenchmarkResult",
+    "benchmark",
+    "measure",
+    "summarize",
+    "run_benchmarks",
+    "compare_results",
+]
@@ -0,0 +1,59 @@
+import argparse
+import json
+import logging
+import sys
+
+from mrkutil.bench import run_benchmarks, compare_results
+from mrkutil.bench.runner import BENCHMARKS
+
+
+def int_list(value: str) -> list[int]:
+    return [int(x) for x in value.split(",") if x]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m mrkutil.bench",
+        description="Benchmark the mrkutil communication stack.",
+    )
+    parser.add_argument(
+        "benchmarks",
+        nargs="*",
+        help=f"Benchmarks to run, defaults to all: {', '.join(BENCHMARKS)}",
+    )
+    parser.add_argument(
+        "--rabbit-url",
+        default="memory://bench",
+        help="Broker URL, defaults to the in-memory broker.",
+    )
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--payload-sizes", type=int_list, default=[64, 1024, 65536])
+    parser.add_argument("--concurrency", type=int_list, default=[1, 4, 16])
+    parser.add_argument("--output", help="Write the JSON results to this file.")
+    parser.add_argument("--compare", help="Baseline JSON results to compare against.")
+    parser.add_argument("--log-level", default="WARNING")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level)
+    report = run_benchmarks(
+        args.benchmarks,
+        rabbit_url=args.rabbit_url,
+        iterations=args.iterations,
+        payload_sizes=args.payload_sizes,
+        concurrency_levels=args.concurrency,
+    )
+    if args.compare:
+        with open(args.compare) as file:
+            report["comparison"] = compare_results(json.load(file), report)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+import logging
+import os
+import random
+import uuid
+
+import orjson
+import redis
+
+from mrkutil.cache import BucketRedisBase, RedisBase
+from mrkutil.cache.compression import CompressionCodec, decompress
+from mrkutil.cache.local_redis import is_local_url
+from mrkutil.cache.compression import lz4_frame, zstandard
+from mrkutil.enum import CompressionAlgorithmEnum
+from .runner import BenchmarkResult, benchmark, measure
+
+logger = logging.getLogger(__name__)
+
+# Larger values do not fit the compact hash encoding, so bucketing does not pay off
+SMALL_VALUE_LIMIT = 1024
+
+
+def make_document(size: int) -> bytes:
+    """
+    Build a JSON document of about ``size`` bytes shaped like typical service data.
+    """
+    items = []
+    document = b""
+    while len(document) < size:
+        i = len(items)
+        items.append(
+            {
+                "id": i,
+                "status": "COMPLETE" if i % 3 else "PENDING",
+                "name": f"item-{i * 7919 % 10007}",
+                "price": round(i * 1.37 % 100, 2),
+                "tags": ["alpha", "beta"][: i % 3],
+            }
+        )
+        document = orjson.dumps({"items": items})
+    return document
+
+
+def available_algorithms() -> list[CompressionAlgorithmEnum]:
+    algorithms = [CompressionAlgorithmEnum.ZLIB]
+    if zstandard is not None:
+        algorithms.append(CompressionAlgorithmEnum.ZSTD)
+    if lz4_frame is not None:
+        algorithms.append(CompressionAlgorithmEnum.LZ4)
+    return algorithms
+
+
+@benchmark("redis_compression")
+def redis_compression(iterations: int, payload_sizes: list[int], **_):
+    """Bytes saved by the RedisBase compression codecs against their encode and decode cost."""
+    results = []
+    for payload_size in payload_sizes:
+        document = make_document(payload_size)
+        for algorithm in available_algorithms():
+            codec = CompressionCodec(algorithm, threshold=0)
+            stored = codec.encode(document)
+            extra = {
+                "raw_bytes": len(document),
+                "stored_bytes": len(stored),
+                "saved_pct": round((1 - len(stored) / len(document)) * 100, 2),
+            }
+            params = {"payload_size": payload_size, "algorithm": algorithm.value}
+            results.append(
+                BenchmarkResult(
+                    "redis_compression",
+                    {**params, "operation": "encode"},
+                    measure(lambda: codec.encode(document), iterations, warmup=1),
+                    extra,
+                )
+            )
+            results.append(
+                BenchmarkResult(
+                    "redis_compression",
+                    {**params, "operation": "decode"},
+                    measure(lambda: decompress(stored), iterations, warmup=1),
+                    extra,
+                )
+            )
+    return results
+
+
+def _memory_usage(server, keys) -> int:
+    pipe = server.pipeline(transaction=False)
+    for key in keys:
+        pipe.memory_usage(key, samples=0)
+    return sum(x or 0 for x in pipe.execute())
+
+
+@benchmark("redis_bucket_memory")
+def redis_bucket_memory(iterations: int, payload_sizes: list[int], **_):
+    """Memory per entry and read latency of bucketed storage against plain keys.
+
+    Stores ``iterations`` entries of every payload size up to 1024 bytes in a Redis
+    server given by REDIS_HOST, and is skipped when the server is unreachable
+    or REDIS_HOST selects a local backend.
+    """
+    if is_local_url(os.getenv("REDIS_HOST")):
+        logger.warning("Skipping redis_bucket_memory, it needs a Redis server")
+        return []
+    results = []
+    for payload_size in [x for x in payload_sizes if x <= SMALL_VALUE_LIMIT]:
+        document = orjson.loads(make_document(payload_size))
+        items = {f"entry{i}": document for i in range(iterations)}
+        keys = list(items)
+        prefix = f"bench_{uuid.uuid4().hex[:8]}"
+        plain = RedisBase(key=f"{prefix}_plain", cache_timeout=600)
+        bucketed = BucketRedisBase(
+            key=f"{prefix}_bucketed",
+            cache_timeout=600,
+            buckets=max(1, iterations // 100),
+        )
+        try:
+            plain.set_many(items)
+            bucketed.set_many(items)
+            memory = {
+                "plain": _memory_usage(
+                    plain.server, [f"{plain._key}_{x}" for x in keys]
+                ),
+                "bucketed": _memory_usage(bucketed.server, bucketed._all_buckets()),
+            }
+            for mode, cache in (("plain", plain), ("bucketed", bucketed)):
+                results.append(
+                    BenchmarkResult(
+                        "redis_bucket_memory",
+                        {
+                            "payload_size": payload_size,
+                            "mode": mode,
+                            "entries": iterations,
+                        },
+                        measure(lambda: cache.get(random.choice(keys)), iterations),
+                        {
+                            "memory_bytes": memory[mode],
+                            "bytes_per_entry": round(memory[mode] / iterations, 2),
+                        },
+                    )
+                )
+        except redis.ConnectionError as e:
+            logger.warning(f"Skipping redis_bucket_memory, Redis is unreachable: {e}")
+            return []
+        finally:
+            try:
+                plain.delete_many(keys)
+                bucketed.server.unlink(*bucketed._all_buckets())
+            except redis.ConnectionError:
+                pass
+    return results
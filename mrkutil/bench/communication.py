@@ -0,0 +1,185 @@
+import threading
+import time
+import uuid
+
+from mrkutil.base import BaseHandler
+from mrkutil.communication import call_service, listen, trigger_service
+from mrkutil.communication.listen import Subscriber
+from .runner import BenchmarkResult, benchmark, measure
+
+RPC_EXCHANGE = "bench_rpc"
+RPC_QUEUE = "bench_rpc_queue"
+CALLER_EXCHANGE = "bench_caller"
+
+_listeners = set()
+_listeners_lock = threading.Lock()
+
+
+class BenchHandler(BaseHandler):
+    """Handler family used only by the benchmarks, kept out of the service registry."""
+
+    sub_classes = {}
+
+    @staticmethod
+    def name():
+        return None
+
+
+class BenchEchoHandler(BenchHandler):
+    @staticmethod
+    def name():
+        return "bench_echo"
+
+    def process(self, data, corr_id):
+        return data["request"]
+
+
+class BenchNoopHandler(BenchHandler):
+    @staticmethod
+    def name():
+        return "bench_noop"
+
+    def process(self, data, corr_id):
+        return None
+
+
+def make_request(method: str, payload_size: int) -> dict:
+    return {"method": method, "request": {"payload": "x" * payload_size}}
+
+
+def make_body(method: str, payload_size: int) -> dict:
+    return {
+        "meta": {"correlationId": str(uuid.uuid4()), "source": CALLER_EXCHANGE},
+        "data": make_request(method, payload_size),
+    }
+
+
+def ensure_listener(rabbit_url: str, max_threads: int):
+    """
+    Start a ``listen`` loop serving the bench handlers once per broker URL.
+    """
+    with _listeners_lock:
+        if rabbit_url in _listeners:
+            return
+        thread = threading.Thread(
+            target=listen,
+            kwargs={
+                "exchange": RPC_EXCHANGE,
+                "exchange_type": "direct",
+                "queue": RPC_QUEUE,
+                "max_threads": max_threads,
+                "base_handler": BenchHandler,
+                "use_job_cache": False,
+                "rabbit_url": rabbit_url,
+            },
+            daemon=True,
+        )
+        thread.start()
+        _listeners.add(rabbit_url)
+    time.sleep(1)  # Give listener time to declare its queue
+
+
+@benchmark("rpc_round_trip")
+def rpc_round_trip(
+    rabbit_url: str,
+    iterations: int,
+    payload_sizes: list[int],
+    concurrency_levels: list[int],
+    **_,
+):
+    """call_service round trip through listen, Subscriber.handle and the reply."""
+    ensure_listener(rabbit_url, max(concurrency_levels))
+    results = []
+    for payload_size in payload_sizes:
+        request = make_request("bench_echo", payload_size)
+        for concurrency in concurrency_levels:
+            stats = measure(
+                lambda: call_service(
+                    request,
+                    destination=RPC_EXCHANGE,
+                    source=CALLER_EXCHANGE,
+                    rabbit_url=rabbit_url,
+                ),
+                iterations,
+                concurrency,
+                warmup=1,
+            )
+            results.append(
+                BenchmarkResult(
+                    "rpc_round_trip",
+                    {"payload_size": payload_size, "concurrency": concurrency},
+                    stats,
+                )
+            )
+    return results
+
+
+@benchmark("publish_throughput")
+def publish_throughput(
+    rabbit_url: str,
+    iterations: int,
+    payload_sizes: list[int],
+    concurrency_levels: list[int],
+    **_,
+):
+    """Fire and forget trigger_service publishes."""
+    results = []
+    for payload_size in payload_sizes:
+        request = make_request("bench_noop", payload_size)
+        for concurrency in concurrency_levels:
+            stats = measure(
+                lambda: trigger_service(
+                    request,
+                    destination="bench_publish",
+                    source=CALLER_EXCHANGE,
+                    rabbit_url=rabbit_url,
+                ),
+                iterations,
+                concurrency,
+            )
+            results.append(
+                BenchmarkResult(
+                    "publish_throughput",
+                    {"payload_size": payload_size, "concurrency": concurrency},
+                    stats,
+                )
+            )
+    return results
+
+
+@benchmark("handler_dispatch")
+def handler_dispatch(rabbit_url: str, iterations: int, payload_sizes: list[int], **_):
+    """Subscriber.handle for a handler without a reply, isolating dispatch overhead."""
+    subscriber = Subscriber(
+        RPC_EXCHANGE,
+        base_handler=BenchHandler,
+        use_job_cache=False,
+        rabbit_url=rabbit_url,
+    )
+    results = []
+    for payload_size in payload_sizes:
+        body = make_body("bench_noop", payload_size)
+        stats = measure(lambda: subscriber.handle(body), iterations, warmup=1)
+        results.append(
+            BenchmarkResult("handler_dispatch", {"payload_size": payload_size}, stats)
+        )
+    return results
+
+
+@benchmark("reply_path")
+def reply_path(rabbit_url: str, iterations: int, payload_sizes: list[int], **_):
+    """Subscriber.handle for an echo handler, including the reply publish."""
+    subscriber = Subscriber(
+        RPC_EXCHANGE,
+        base_handler=BenchHandler,
+        use_job_cache=False,
+        rabbit_url=rabbit_url,
+    )
+    results = []
+    for payload_size in payload_sizes:
+        body = make_body("bench_echo", payload_size)
+        stats = measure(lambda: subscriber.handle(body), iterations, warmup=1)
+        results.append(
+            BenchmarkResult("reply_path", {"payload_size": payload_size}, stats)
+        )
+    return results
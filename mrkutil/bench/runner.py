@@ -0,0 +1,171 @@
+import datetime as dt
+import logging
+import platform
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from typing import Callable
+
+import mrkutil
+
+logger = logging.getLogger(__name__)
+
+BENCHMARKS = {}
+
+
+@dataclass
+class BenchmarkResult:
+    benchmark: str
+    params: dict
+    stats: dict
+    extra: dict = field(default_factory=dict)
+
+
+def benchmark(name: str):
+    """
+    Register a benchmark function under the given name.
+
+    The function receives the options passed to ``run_benchmarks`` as keyword
+    arguments and returns a list of BenchmarkResult objects.
+
+    Args:
+        name (str): The benchmark name used for selection on the command line.
+    """
+
+    def decorator(func: Callable):
+        BENCHMARKS[name] = func
+        return func
+
+    return decorator
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(
+        int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1
+    )
+    return sorted_values[index]
+
+
+def summarize(latencies: list[float], elapsed: float) -> dict:
+    """
+    Summarize per-operation latencies into milliseconds percentiles and throughput.
+
+    Args:
+        latencies (list[float]): Duration of each operation in seconds.
+        elapsed (float): Wall clock time of the whole run in seconds.
+
+    Returns:
+        dict: count, ops_per_sec, mean_ms, p50_ms, p90_ms, p99_ms and max_ms.
+    """
+    ordered = sorted(latencies)
+    to_ms = 1000
+    return {
+        "count": len(ordered),
+        "ops_per_sec": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(ordered) * to_ms, 4) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * to_ms, 4),
+        "p90_ms": round(percentile(ordered, 90) * to_ms, 4),
+        "p99_ms": round(percentile(ordered, 99) * to_ms, 4),
+        "max_ms": round(ordered[-1] * to_ms, 4) if ordered else 0.0,
+    }
+
+
+def measure(func: Callable, iterations: int, concurrency: int = 1, warmup: int = 0):
+    """
+    Call ``func`` ``iterations`` times from ``concurrency`` threads and time each call.
+
+    Args:
+        func (Callable): Zero argument callable to measure.
+        iterations (int): Total number of measured calls.
+        concurrency (int): Number of threads issuing calls in parallel.
+        warmup (int): Number of unmeasured calls made before timing starts.
+
+    Returns:
+        dict: The summary produced by ``summarize``.
+    """
+    for _ in range(warmup):
+        func()
+
+    def timed_call(_):
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    if concurrency <= 1:
+        latencies = [timed_call(i) for i in range(iterations)]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(timed_call, range(iterations)))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def run_benchmarks(names: list[str] | None = None, **options) -> dict:
+    """
+    Run the selected benchmarks and collect their results.
+
+    Args:
+        names (list[str], optional): Benchmarks to run. Defaults to all registered ones.
+        **options: Options forwarded to every benchmark function.
+
+    Returns:
+        dict: A JSON serializable document with run metadata and results.
+    """
+    selected = names or list(BENCHMARKS)
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks {unknown}, available {list(BENCHMARKS)}")
+    results = []
+    for name in selected:
+        logger.info(f"Running benchmark {name}")
+        results.extend(asdict(result) for result in BENCHMARKS[name](**options))
+    return {
+        "meta": {
+            "timestamp": dt.datetime.now().isoformat(),
+            "mrkutil_version": mrkutil.__version__,
+            "python_version": platform.python_version(),
+            "platform": platform.platform(),
+            "options": options,
+        },
+        "results": results,
+    }
+
+
+def compare_results(baseline: dict, current: dict) -> list[dict]:
+    """
+    Compare two ``run_benchmarks`` documents by benchmark name and parameters.
+
+    Args:
+        baseline (dict): The reference run.
+        current (dict): The run to compare against the reference.
+
+    Returns:
+        list[dict]: One entry per matching result with relative change in percent
+        for p50, p99 and throughput. Positive latency change means slower.
+    """
+
+    def result_key(result):
+        return result["benchmark"], tuple(sorted(result["params"].items()))
+
+    reference = {result_key(result): result for result in baseline["results"]}
+    comparison = []
+    for result in current["results"]:
+        old = reference.get(result_key(result))
+        if not old:
+            continue
+        change = {}
+        for stat in ("p50_ms", "p99_ms", "ops_per_sec"):
+            before, after = old["stats"].get(stat), result["stats"].get(stat)
+            if before:
+                change[stat] = round((after - before) / before * 100, 2)
+        comparison.append(
+            {
+                "benchmark": result["benchmark"],
+                "params": result["params"],
+                "change_pct": change,
+            }
+        )
+    return comparison
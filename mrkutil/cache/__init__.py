@@ -1,5 +1,36 @@
 from .base_redis import RedisBase, AsyncRedisBase
+from .bucket_redis import BucketRedisBase, AsyncBucketRedisBase
+from .compression import CompressionCodec
+from .instrumentation import RedisInstrumentation
 from .job_cache import JobCache, AJobCache
+from .local_redis import LocalRedis, AsyncLocalRedis
+from .lru_cache import LRUCache
+from .memoize import memoize
+from .near_cache import NearCache
+from .serialization import ValueCodec, OrjsonCodec, MsgpackCodec, RawCodec
+from .redis_pool import get_client, get_async_client, close_pools, aclose_pools
 
 
-__all__ = ["RedisBase", "AsyncRedisBase", "JobCache", "AJobCache"]
+__all__ = [
+    "RedisBase",
+    "AsyncRedisBase",
+    "BucketRedisBase",
+    "AsyncBucketRedisBase",
+    "CompressionCodec",
+    "RedisInstrumentation",
+    "JobCache",
+    "AJobCache",
+    "LocalRedis",
+    "AsyncLocalRedis",
+    "LRUCache",
+    "memoize",
+    "NearCache",
+    "ValueCodec",
+    "OrjsonCodec",
+    "MsgpackCodec",
+    "RawCodec",
+    "get_client",
+    "get_async_client",
+    "close_pools",
+    "aclose_pools",
+]
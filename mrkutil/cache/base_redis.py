@@ -1,11 +1,93 @@
-import redis
-import redis.asyncio as aredis
-import os
 import orjson
 import logging
+import math
+import random
+import time
+import asyncio
+from typing import Callable
+from redis.exceptions import LockError
+from .compression import CompressionCodec, decompress
+from .instrumentation import RedisInstrumentation, observe, payload_size
+from .near_cache import MISSING, NearCache
+from .redis_pool import cluster_requested, get_client, get_async_client
+from .scripts import SCRIPTS
+from .serialization import JSON_CODEC, OrjsonCodec, ValueCodec
 
 logger = logging.getLogger(__name__)
 
+PIPELINE_CHUNK_SIZE = 500
+SCAN_COUNT = 1000
+
+
+def _chunks(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def _encode(data):
+    if isinstance(data, dict):
+        return orjson.dumps(data)
+    return data
+
+
+def _decode(data):
+    try:
+        if data:
+            return orjson.loads(data)
+    except Exception as e:
+        logger.warning("Stored data is not dictionary. Exception: {}".format(str(e)))
+    return data
+
+
+def _should_refresh(meta: dict | None, beta: float) -> bool:
+    """
+    Probabilistic early expiration (XFetch): refresh more likely the closer the
+    logical expiry is and the longer the value took to compute.
+    """
+    if not meta:
+        return True
+    jitter = -meta["delta"] * beta * math.log(1.0 - random.random())
+    return time.time() + jitter >= meta["expires_at"]
+
+
+def _key_prefix(key: str, hash_tag: bool | str) -> str:
+    """
+    Prefix of the stored keys. With a hash tag every key of the prefix maps to the same
+    cluster slot, so multi-key commands and pipelines stay on one node.
+    """
+    if hash_tag is True:
+        return f"{{{key}}}"
+    if hash_tag:
+        return f"{{{hash_tag}}}{key}"
+    return key
+
+
+def _require_json(cache, operation: str):
+    """
+    Scripted updates read and write stored objects as plain JSON on the server.
+    """
+    if cache.compression is not None or not isinstance(
+        cache.codec or JSON_CODEC, OrjsonCodec
+    ):
+        raise ValueError(
+            f"{operation} requires uncompressed JSON values, "
+            "it cannot be used with compression or a non-JSON codec"
+        )
+
+
+def _count(call, values: list):
+    if not call:
+        return
+    call.read = sum(payload_size(x) for x in values)
+    call.hits = sum(1 for x in values if x is not None)
+    call.misses = len(values) - call.hits
+
+
+def _aligned(keys: list[str], values: list, as_dict: bool):
+    if as_dict:
+        return dict(zip(keys, values))
+    return values
+
 
 class RedisBase:
     """Data structure store
@@ -15,47 +97,134 @@ class RedisBase:
     received from other services.
 
     Attributes:
-        server (redis.Redis): The Redis server instance.
-        _key (str): The key prefix used for storing data.
+        server (redis.Redis | redis.cluster.RedisCluster): The Redis server instance, sharing
+            the process-wide connection pool of host, port and db, or the shared cluster client.
+        _key (str): The key prefix used for storing data, including its hash tag.
         _cache_timeout (int): The cache timeout value in seconds.
+        near_cache (NearCache | None): Optional in-process tier used by `get`, kept
+            coherent across replicas by `set` and `delete`.
+        compression (CompressionCodec | None): Optional codec compressing large values.
+            Instances without compression return compressed values as raw bytes, so every
+            instance sharing a key needs a codec once any of them compresses.
+        codec (ValueCodec | None): Optional value serializer. Without it dicts are stored
+            as JSON and other values are passed to redis-py as they are.
+        instrumentation (RedisInstrumentation | None): Optional collector of latency, payload
+            and hit rate metrics, also logging slow calls.
 
     """
 
-    def __init__(self, key: str = "", cache_timeout: int = 86400):
-        self.server = redis.Redis(host=os.getenv("REDIS_HOST"))
-        self._key = key
+    def __init__(
+        self,
+        key: str = "",
+        cache_timeout: int = 86400,
+        host: str | None = None,
+        port: int = 6379,
+        db: int = 0,
+        near_cache: NearCache | None = None,
+        compression: CompressionCodec | None = None,
+        cluster: bool | None = None,
+        hash_tag: bool | str = False,
+        codec: ValueCodec | None = None,
+        instrumentation: RedisInstrumentation | None = None,
+    ):
+        if cluster is None:
+            cluster = cluster_requested()
+        self.server = get_client(host, port, db, cluster=cluster)
+        self._key = _key_prefix(key, hash_tag)
         self._cache_timeout = cache_timeout
+        self._scripts = {}
+        self.compression = compression
+        self.codec = codec
+        self.instrumentation = instrumentation
+        self.near_cache = near_cache
+        if near_cache is not None:
+            near_cache.start(self.server, f"{key}_near_cache_invalidations")
+
+    def _pack(self, data):
+        data = _encode(data) if self.codec is None else self.codec.encode(data)
+        if self.compression is not None:
+            return self.compression.encode(data)
+        return data
+
+    def _decompress(self, data):
+        # Only compressing instances look for the header, so raw values are never mistaken for it
+        return data if self.compression is None else decompress(data)
+
+    def _unpack(self, data, type: type | None = None):
+        if data is None:
+            return None
+        if self.codec is not None:
+            return self.codec.decode(data, type)
+        if type is not None:
+            return JSON_CODEC.decode(data, type)
+        return _decode(data)
+
+    def _observe(self, operation: str, key: str | None = None):
+        return observe(self.instrumentation, self._key, operation, key)
 
     def _setData(self, key: str, data: dict):
-        if self._cache_timeout:
-            self.server.set(key, data, self._cache_timeout)
-        else:
-            self.server.set(key, data)
+        data = self._pack(data)
+        with self._observe("set", key) as call:
+            if call:
+                call.written = payload_size(data)
+            if self._cache_timeout:
+                self.server.set(key, data, self._cache_timeout)
+            else:
+                self.server.set(key, data)
 
     def _getData(self, key: str):
-        return self.server.get(key)
+        with self._observe("get", key) as call:
+            data = self._decompress(self.server.get(key))
+            if call:
+                call.read = payload_size(data)
+                call.hits, call.misses = (0, 1) if data is None else (1, 0)
+        return data
 
     def _delData(self, key: str):
-        return self.server.delete(key)
+        with self._observe("delete", key):
+            return self.server.delete(key)
 
     def _getMultiple(self, keys: list[str]):
-        return self.server.mget(keys)
+        # Cluster clients split MGET per slot
+        mget = getattr(self.server, "mget_nonatomic", self.server.mget)
+        with self._observe("mget") as call:
+            data = [self._decompress(x) for x in mget(keys)]
+            _count(call, data)
+        return data
+
+    def get(self, key: str, type: type | None = None):
+        """
+        Get a key, decoded into an instance of `type` when given.
 
-    def get(self, key: str):
+        Typed reads bypass the near cache, which holds untyped values.
+        """
+        near_cache = self.near_cache if type is None else None
+        if near_cache is not None:
+            data = near_cache.get(key)
+            if data is not MISSING:
+                return data
+            generation = near_cache.generation
         data = self._getData("{}_{}".format(self._key, key))
-        try:
-            if data:
-                data = orjson.loads(data)
-        except Exception as e:
-            logger.warning(
-                "Stored data is not dictionary. Exception: {}".format(str(e))
-            )
-            pass
+        if self.codec is not None or type is not None:
+            data = self._unpack(data, type)
+        else:
+            try:
+                if data:
+                    data = orjson.loads(data)
+            except Exception as e:
+                logger.warning(
+                    "Stored data is not dictionary. Exception: {}".format(str(e))
+                )
+                pass
+        if near_cache is not None:
+            near_cache.set(key, data, generation)
         return data
 
-    def get_multiple(self, keys: list[str]):
+    def get_multiple(self, keys: list[str], type: type | None = None):
         keys = [f"{self._key}_{x}" for x in keys]
         data = self._getMultiple(keys)
+        if self.codec is not None or type is not None:
+            return [self._unpack(x, type) for x in data if x is not None]
         try:
             if data:
                 data = [orjson.loads(x) for x in data if x is not None]
@@ -67,23 +236,367 @@ class RedisBase:
         return data
 
     def set(self, key: str, data: dict):
-        if isinstance(data, dict):
-            data = orjson.dumps(data)
-
-        return self._setData("{}_{}".format(self._key, key), data)
+        result = self._setData("{}_{}".format(self._key, key), data)
+        if self.near_cache is not None:
+            self.near_cache.invalidate([key])
+        return result
 
     def delete(self, key: str):
-        return self._delData("{}_{}".format(self._key, key))
+        result = self._delData("{}_{}".format(self._key, key))
+        if self.near_cache is not None:
+            self.near_cache.invalidate([key])
+        return result
+
+    def iter_keys(self, pattern: str, count: int = SCAN_COUNT):
+        """
+        Iterate over keys matching the pattern with SCAN, without blocking the server.
+
+        Keys changed during the iteration may be skipped or returned twice.
+
+        Args:
+            pattern (str): Glob-style pattern, without the key prefix.
+            count (int, optional): Keys examined per SCAN call. Defaults to 1000.
+
+        Yields:
+            str: The keys, without the key prefix.
+        """
+        prefix = f"{self._key}_"
+        for key in self.server.scan_iter(match=prefix + pattern, count=count):
+            yield key.decode("utf-8")[len(prefix) :]
+
+    def search(self, pattern: str, count: int = SCAN_COUNT) -> list[str]:
+        with self._observe("search"):
+            return list(dict.fromkeys(self.iter_keys(pattern, count)))
+
+    def delete_keys(
+        self,
+        pattern: str,
+        count: int = SCAN_COUNT,
+        chunk_size: int = PIPELINE_CHUNK_SIZE,
+    ) -> int:
+        """
+        Delete keys matching the pattern in UNLINK batches while scanning.
+
+        Returns:
+            int: Number of deleted keys.
+        """
+        deleted = 0
+        batch = []
+        with self._observe("delete_keys"):
+            for key in self.iter_keys(pattern, count):
+                batch.append(key)
+                if len(batch) >= chunk_size:
+                    deleted += self.delete_many(batch, chunk_size)
+                    batch = []
+            if batch:
+                deleted += self.delete_many(batch, chunk_size)
+        return deleted
+
+    def _ttl(self, key: str, timeout: int | None, timeouts: dict[str, int] | None):
+        if timeouts and key in timeouts:
+            return timeouts[key]
+        return self._cache_timeout if timeout is None else timeout
+
+    def set_many(
+        self,
+        items: dict[str, dict],
+        timeout: int | None = None,
+        timeouts: dict[str, int] | None = None,
+        chunk_size: int = PIPELINE_CHUNK_SIZE,
+    ):
+        """
+        Set many keys in pipelined round trips of at most `chunk_size` commands.
+
+        Args:
+            items (dict[str, dict]): Key to data mapping.
+            timeout (int, optional): Expiry of all keys in seconds. Defaults to the cache timeout.
+            timeouts (dict[str, int], optional): Expiry per key in seconds, overriding `timeout`.
+            chunk_size (int, optional): Commands per pipeline. Defaults to 500.
+        """
+        keys = list(items)
+        with self._observe("set_many") as call:
+            for chunk in _chunks(keys, chunk_size):
+                pipe = self.server.pipeline(transaction=False)
+                for key in chunk:
+                    value = self._pack(items[key])
+                    if call:
+                        call.written += payload_size(value)
+                    pipe.set(
+                        f"{self._key}_{key}",
+                        value,
+                        ex=self._ttl(key, timeout, timeouts) or None,
+                    )
+                pipe.execute()
+        if self.near_cache is not None and keys:
+            self.near_cache.invalidate(keys)
+
+    def delete_many(
+        self, keys: list[str], chunk_size: int = PIPELINE_CHUNK_SIZE
+    ) -> int:
+        """
+        Delete many keys with UNLINK, freeing memory in the background on the server.
+
+        Args:
+            keys (list[str]): The keys.
+            chunk_size (int, optional): Keys per UNLINK command. Defaults to 500.
+
+        Returns:
+            int: Number of deleted keys.
+        """
+        keys = list(keys)
+        deleted = 0
+        with self._observe("delete_many"):
+            for chunk in _chunks(keys, chunk_size):
+                deleted += self.server.unlink(*[f"{self._key}_{x}" for x in chunk])
+        if self.near_cache is not None and keys:
+            self.near_cache.invalidate(keys)
+        return deleted
+
+    def get_many(
+        self,
+        keys: list[str],
+        as_dict: bool = False,
+        chunk_size: int = PIPELINE_CHUNK_SIZE,
+        type: type | None = None,
+    ):
+        """
+        Get many keys with one MGET per `chunk_size` keys.
+
+        Args:
+            keys (list[str]): The keys.
+            as_dict (bool, optional): Return a key to data mapping. Defaults to False.
+            chunk_size (int, optional): Keys per MGET command. Defaults to 500.
+            type (type, optional): Class the values are decoded into.
+
+        Returns:
+            list | dict: Data aligned with `keys`, None for missing keys.
+        """
+        keys = list(keys)
+        values = []
+        for chunk in _chunks(keys, chunk_size):
+            data = self._getMultiple([f"{self._key}_{x}" for x in chunk])
+            values.extend(self._unpack(x, type) for x in data)
+        return _aligned(keys, values, as_dict)
+
+    def _store_loaded(self, key: str, loader: Callable, ttl: int, stale_ttl: int):
+        start = time.perf_counter()
+        value = loader()
+        pipe = self.server.pipeline(transaction=False)
+        if ttl:
+            meta = {
+                "delta": time.perf_counter() - start,
+                "expires_at": time.time() + ttl,
+            }
+            pipe.set(f"{self._key}_{key}", self._pack(value), ex=ttl + stale_ttl)
+            pipe.set(f"{self._key}_{key}:meta", orjson.dumps(meta), ex=ttl + stale_ttl)
+        else:
+            # Values that never expire are never refreshed early, so they need no metadata
+            pipe.set(f"{self._key}_{key}", self._pack(value))
+            pipe.delete(f"{self._key}_{key}:meta")
+        pipe.execute()
+        if self.near_cache is not None:
+            self.near_cache.invalidate([key])
+        return value
+
+    def get_or_set(
+        self,
+        key: str,
+        loader: Callable,
+        ttl: int | None = None,
+        stale_ttl: int = 0,
+        beta: float = 1.0,
+        lock_timeout: float = 10,
+        wait_timeout: float | None = None,
+        wait_interval: float = 0.05,
+    ):
+        """
+        Get a key, computing and storing it with `loader` when it is missing or expiring.
 
-    def search(self, pattern: str) -> list[str]:
-        keys = self.server.keys(pattern=self._key + "_" + pattern)
-        return [(x.decode("utf-8")).replace(self._key + "_", "") for x in keys]
+        Only the caller holding a short Redis lock recomputes. While the value exists,
+        other callers get the current value, kept `stale_ttl` seconds past `ttl` to serve
+        during a refresh; when it is missing, they wait for it. Hot keys are refreshed
+        before they expire with probability growing as expiry nears (XFetch). The value
+        and a `<key>:meta` key with its compute time are stored together.
 
-    def delete_keys(self, pattern: str):
-        keys = self.search(pattern)
-        for key in keys:
-            self.delete(key)
-        return len(keys)
+        Args:
+            key (str): The key.
+            loader (Callable): Computes the value, without arguments.
+            ttl (int, optional): Seconds the value is fresh, 0 for a value that never expires
+                and is never refreshed. Defaults to the cache timeout.
+            stale_ttl (int, optional): Seconds a stale value is served during a refresh. Defaults to 0.
+            beta (float, optional): XFetch aggressiveness, above 1 refreshes earlier. Defaults to 1.0.
+            lock_timeout (float, optional): Seconds the recompute lock is held at most. Defaults to 10.
+            wait_timeout (float, optional): Seconds to wait for another caller before computing.
+                Defaults to `lock_timeout`.
+            wait_interval (float, optional): Seconds between polls while waiting. Defaults to 0.05.
+
+        Returns:
+            The cached or computed value.
+        """
+        ttl = self._cache_timeout if ttl is None else ttl
+        full_key = f"{self._key}_{key}"
+        pipe = self.server.pipeline(transaction=False)
+        pipe.get(full_key)
+        pipe.get(f"{full_key}:meta")
+        data, meta = pipe.execute()
+        data = self._decompress(data)
+        if data is not None and (
+            not ttl or not _should_refresh(meta and orjson.loads(meta), beta)
+        ):
+            return self._unpack(data)
+        lock = self.server.lock(
+            f"{full_key}:lock", timeout=lock_timeout, blocking=False
+        )
+        if lock.acquire():
+            try:
+                return self._store_loaded(key, loader, ttl, stale_ttl)
+            finally:
+                try:
+                    lock.release()
+                except LockError:
+                    logger.warning(f"Lock of {full_key} expired while loading")
+        if data is not None:
+            return self._unpack(data)
+        deadline = time.monotonic() + (
+            lock_timeout if wait_timeout is None else wait_timeout
+        )
+        while time.monotonic() < deadline:
+            time.sleep(wait_interval)
+            data = self._getData(full_key)
+            if data is not None:
+                return self._unpack(data)
+        logger.warning(f"Timed out waiting for {full_key}, loading without lock")
+        return self._store_loaded(key, loader, ttl, stale_ttl)
+
+    def _script(self, name: str):
+        script = self._scripts.get(name)
+        if script is None:
+            script = self._scripts[name] = self.server.register_script(SCRIPTS[name])
+        return script
+
+    def load_scripts(self):
+        """
+        Load the Lua scripts into the server script cache, so their first calls use EVALSHA.
+        Scripts missing from the cache, e.g. after a restart, are sent again automatically.
+        """
+        for name in SCRIPTS:
+            self._script(name)
+            self.server.script_load(SCRIPTS[name])
+
+    def compare_and_set(
+        self, key: str, field: str, expected, data: dict, timeout: int | None = None
+    ) -> bool:
+        """
+        Atomically replace a stored object only while one of its fields has the expected value.
+
+        Args:
+            key (str): The key.
+            field (str): Top-level field of the stored object to compare.
+            expected: Expected scalar value of the field, None matching null. A missing
+                field matches nothing.
+            data (dict): The new value.
+            timeout (int, optional): Expiry in seconds. Defaults to the cache timeout.
+
+        Returns:
+            bool: Whether the value was replaced.
+
+        Raises:
+            ValueError: If compression or a non-JSON codec is configured.
+        """
+        _require_json(self, "compare_and_set")
+        replaced = self._script("compare_and_set")(
+            keys=[f"{self._key}_{key}"],
+            args=[
+                field,
+                orjson.dumps(expected),
+                JSON_CODEC.encode(data),
+                self._cache_timeout if timeout is None else timeout,
+            ],
+        )
+        if replaced and self.near_cache is not None:
+            self.near_cache.invalidate([key])
+        return bool(replaced)
+
+    def update_fields(self, key: str, fields: dict, timeout: int | None = None) -> dict:
+        """
+        Atomically merge fields into a stored object, creating it when missing.
+
+        Args:
+            key (str): The key.
+            fields (dict): Top-level fields to set.
+            timeout (int, optional): New expiry in seconds. By default an existing key keeps
+                its expiry and a new one gets the cache timeout.
+
+        Returns:
+            dict: The updated object.
+
+        Raises:
+            ValueError: If compression or a non-JSON codec is configured.
+        """
+        _require_json(self, "update_fields")
+        result = self._script("update_fields")(
+            keys=[f"{self._key}_{key}"],
+            args=[JSON_CODEC.encode(fields), timeout or 0, self._cache_timeout or 0],
+        )
+        if self.near_cache is not None:
+            self.near_cache.invalidate([key])
+        return orjson.loads(result)
+
+    def incr_with_ttl(
+        self,
+        key: str,
+        amount: int = 1,
+        timeout: int | None = None,
+        field: str | None = None,
+    ) -> int | float:
+        """
+        Atomically increment a counter, setting its expiry only when it is created,
+        e.g. for fixed window rate limits.
+
+        Args:
+            key (str): The key.
+            amount (int, optional): Increment. Defaults to 1.
+            timeout (int, optional): Expiry of a new counter in seconds. Defaults to the cache timeout.
+            field (str, optional): Increment this numeric field of a stored object instead of
+                an integer key. The field may also be incremented by a float.
+
+        Returns:
+            int | float: The new value.
+
+        Raises:
+            ValueError: If `field` is given and compression or a non-JSON codec is configured.
+        """
+        if field is not None:
+            _require_json(self, "incr_with_ttl with a field")
+        timeout = self._cache_timeout if timeout is None else timeout
+        if field is None:
+            result = self._script("incr_with_ttl")(
+                keys=[f"{self._key}_{key}"], args=[amount, timeout or 0]
+            )
+        else:
+            result = orjson.loads(
+                self._script("incr_field_with_ttl")(
+                    keys=[f"{self._key}_{key}"], args=[field, amount, timeout or 0]
+                )
+            )
+        if self.near_cache is not None:
+            self.near_cache.invalidate([key])
+        return result
+
+    def set_if_absent(self, key: str, data: dict, timeout: int | None = None) -> bool:
+        """
+        Set a key only when it does not exist yet, with SET NX.
+
+        Returns:
+            bool: Whether the key was set.
+        """
+        timeout = self._cache_timeout if timeout is None else timeout
+        created = self.server.set(
+            f"{self._key}_{key}", self._pack(data), ex=timeout or None, nx=True
+        )
+        if created and self.near_cache is not None:
+            self.near_cache.invalidate([key])
+        return bool(created)
 
 
 class AsyncRedisBase:
@@ -94,47 +607,107 @@ class AsyncRedisBase:
     received from other services.
 
     Attributes:
-        server (redis.Redis): The Redis server instance.
-        _key (str): The key prefix used for storing data.
+        server (redis.asyncio.Redis | redis.asyncio.cluster.RedisCluster): The Redis server
+            instance of the running event loop, sharing the connection pool of host, port and db
+            or the cluster client within that loop.
+        _key (str): The key prefix used for storing data, including its hash tag.
         _cache_timeout (int): The cache timeout value in seconds.
+        compression (CompressionCodec | None): Optional codec compressing large values.
+            Instances without compression return compressed values as raw bytes, so every
+            instance sharing a key needs a codec once any of them compresses.
+        codec (ValueCodec | None): Optional value serializer. Without it dicts are stored
+            as JSON and other values are passed to redis-py as they are.
+        instrumentation (RedisInstrumentation | None): Optional collector of latency, payload
+            and hit rate metrics, also logging slow calls.
 
     """
 
-    def __init__(self, key: str = "", cache_timeout: int = 86400):
-        self.server = aredis.Redis(host=os.getenv("REDIS_HOST"))
-        self._key = key
+    def __init__(
+        self,
+        key: str = "",
+        cache_timeout: int = 86400,
+        host: str | None = None,
+        port: int = 6379,
+        db: int = 0,
+        compression: CompressionCodec | None = None,
+        cluster: bool | None = None,
+        hash_tag: bool | str = False,
+        codec: ValueCodec | None = None,
+        instrumentation: RedisInstrumentation | None = None,
+    ):
+        self.compression = compression
+        self.codec = codec
+        self.instrumentation = instrumentation
+        self._host = host
+        self._port = port
+        self._db = db
+        self._cluster = cluster_requested() if cluster is None else cluster
+        self._key = _key_prefix(key, hash_tag)
         self._cache_timeout = cache_timeout
+        self._scripts = {}
 
-    def __del__(self):
-        # Close connection when this object is destroyed
-        import asyncio
+    @property
+    def server(self):
+        return get_async_client(self._host, self._port, self._db, cluster=self._cluster)
 
-        try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                loop.create_task(self.server.aclose())
-            else:
-                loop.run_until_complete(self.server.aclose())
-        except Exception:
-            pass
+    def _pack(self, data):
+        data = _encode(data) if self.codec is None else self.codec.encode(data)
+        if self.compression is not None:
+            return self.compression.encode(data)
+        return data
+
+    def _decompress(self, data):
+        # Only compressing instances look for the header, so raw values are never mistaken for it
+        return data if self.compression is None else decompress(data)
+
+    def _unpack(self, data, type: type | None = None):
+        if data is None:
+            return None
+        if self.codec is not None:
+            return self.codec.decode(data, type)
+        if type is not None:
+            return JSON_CODEC.decode(data, type)
+        return _decode(data)
+
+    def _observe(self, operation: str, key: str | None = None):
+        return observe(self.instrumentation, self._key, operation, key)
 
     async def _setData(self, key: str, data: dict):
-        if self._cache_timeout:
-            await self.server.set(key, data, self._cache_timeout)
-        else:
-            await self.server.set(key, data)
+        data = self._pack(data)
+        with self._observe("set", key) as call:
+            if call:
+                call.written = payload_size(data)
+            if self._cache_timeout:
+                await self.server.set(key, data, self._cache_timeout)
+            else:
+                await self.server.set(key, data)
 
     async def _getData(self, key: str):
-        return await self.server.get(key)
+        with self._observe("get", key) as call:
+            data = self._decompress(await self.server.get(key))
+            if call:
+                call.read = payload_size(data)
+                call.hits, call.misses = (0, 1) if data is None else (1, 0)
+        return data
 
     async def _delData(self, key: str):
-        return await self.server.delete(key)
+        with self._observe("delete", key):
+            return await self.server.delete(key)
 
     async def _getMultiple(self, keys: list[str]):
-        return await self.server.mget(keys)
+        mget = getattr(self.server, "mget_nonatomic", self.server.mget)
+        with self._observe("mget") as call:
+            data = [self._decompress(x) for x in await mget(keys)]
+            _count(call, data)
+        return data
 
-    async def get(self, key: str):
+    async def get(self, key: str, type: type | None = None):
+        """
+        Get a key, decoded into an instance of `type` when given.
+        """
         data = await self._getData("{}_{}".format(self._key, key))
+        if self.codec is not None or type is not None:
+            return self._unpack(data, type)
         try:
             if data:
                 data = orjson.loads(data)
@@ -145,9 +718,11 @@ class AsyncRedisBase:
             pass
         return data
 
-    async def get_multiple(self, keys: list[str]):
+    async def get_multiple(self, keys: list[str], type: type | None = None):
         keys = [f"{self._key}_{x}" for x in keys]
         data = await self._getMultiple(keys)
+        if self.codec is not None or type is not None:
+            return [self._unpack(x, type) for x in data if x is not None]
         try:
             if data:
                 data = [orjson.loads(x) for x in data if x is not None]
@@ -159,20 +734,315 @@ class AsyncRedisBase:
         return data
 
     async def set(self, key: str, data: dict):
-        if isinstance(data, dict):
-            data = orjson.dumps(data)
-
         return await self._setData("{}_{}".format(self._key, key), data)
 
     async def delete(self, key: str):
         return await self._delData("{}_{}".format(self._key, key))
 
-    async def search(self, pattern: str) -> list[str]:
-        keys = await self.server.keys(pattern=self._key + "_" + pattern)
-        return [(x.decode("utf-8")).replace(self._key + "_", "") for x in keys]
+    async def iter_keys(self, pattern: str, count: int = SCAN_COUNT):
+        """
+        Iterate over keys matching the pattern with SCAN, without blocking the server.
+
+        Keys changed during the iteration may be skipped or returned twice.
+
+        Args:
+            pattern (str): Glob-style pattern, without the key prefix.
+            count (int, optional): Keys examined per SCAN call. Defaults to 1000.
+
+        Yields:
+            str: The keys, without the key prefix.
+        """
+        prefix = f"{self._key}_"
+        async for key in self.server.scan_iter(match=prefix + pattern, count=count):
+            yield key.decode("utf-8")[len(prefix) :]
+
+    async def search(self, pattern: str, count: int = SCAN_COUNT) -> list[str]:
+        with self._observe("search"):
+            return list(
+                dict.fromkeys([key async for key in self.iter_keys(pattern, count)])
+            )
+
+    async def delete_keys(
+        self,
+        pattern: str,
+        count: int = SCAN_COUNT,
+        chunk_size: int = PIPELINE_CHUNK_SIZE,
+    ) -> int:
+        """
+        Delete keys matching the pattern in UNLINK batches while scanning.
+
+        Returns:
+            int: Number of deleted keys.
+        """
+        deleted = 0
+        batch = []
+        with self._observe("delete_keys"):
+            async for key in self.iter_keys(pattern, count):
+                batch.append(key)
+                if len(batch) >= chunk_size:
+                    deleted += await self.delete_many(batch, chunk_size)
+                    batch = []
+            if batch:
+                deleted += await self.delete_many(batch, chunk_size)
+        return deleted
+
+    def _ttl(self, key: str, timeout: int | None, timeouts: dict[str, int] | None):
+        if timeouts and key in timeouts:
+            return timeouts[key]
+        return self._cache_timeout if timeout is None else timeout
+
+    async def set_many(
+        self,
+        items: dict[str, dict],
+        timeout: int | None = None,
+        timeouts: dict[str, int] | None = None,
+        chunk_size: int = PIPELINE_CHUNK_SIZE,
+    ):
+        """
+        Set many keys in pipelined round trips of at most `chunk_size` commands.
+
+        Args:
+            items (dict[str, dict]): Key to data mapping.
+            timeout (int, optional): Expiry of all keys in seconds. Defaults to the cache timeout.
+            timeouts (dict[str, int], optional): Expiry per key in seconds, overriding `timeout`.
+            chunk_size (int, optional): Commands per pipeline. Defaults to 500.
+        """
+        with self._observe("set_many") as call:
+            for chunk in _chunks(list(items), chunk_size):
+                pipe = self.server.pipeline(transaction=False)
+                for key in chunk:
+                    value = self._pack(items[key])
+                    if call:
+                        call.written += payload_size(value)
+                    pipe.set(
+                        f"{self._key}_{key}",
+                        value,
+                        ex=self._ttl(key, timeout, timeouts) or None,
+                    )
+                await pipe.execute()
+
+    async def delete_many(
+        self, keys: list[str], chunk_size: int = PIPELINE_CHUNK_SIZE
+    ) -> int:
+        """
+        Delete many keys with UNLINK, freeing memory in the background on the server.
+
+        Args:
+            keys (list[str]): The keys.
+            chunk_size (int, optional): Keys per UNLINK command. Defaults to 500.
+
+        Returns:
+            int: Number of deleted keys.
+        """
+        deleted = 0
+        with self._observe("delete_many"):
+            for chunk in _chunks(list(keys), chunk_size):
+                deleted += await self.server.unlink(
+                    *[f"{self._key}_{x}" for x in chunk]
+                )
+        return deleted
+
+    async def get_many(
+        self,
+        keys: list[str],
+        as_dict: bool = False,
+        chunk_size: int = PIPELINE_CHUNK_SIZE,
+        type: type | None = None,
+    ):
+        """
+        Get many keys with one MGET per `chunk_size` keys.
+
+        Args:
+            keys (list[str]): The keys.
+            as_dict (bool, optional): Return a key to data mapping. Defaults to False.
+            chunk_size (int, optional): Keys per MGET command. Defaults to 500.
+            type (type, optional): Class the values are decoded into.
+
+        Returns:
+            list | dict: Data aligned with `keys`, None for missing keys.
+        """
+        keys = list(keys)
+        values = []
+        for chunk in _chunks(keys, chunk_size):
+            data = await self._getMultiple([f"{self._key}_{x}" for x in chunk])
+            values.extend(self._unpack(x, type) for x in data)
+        return _aligned(keys, values, as_dict)
+
+    async def _store_loaded(self, key: str, loader: Callable, ttl: int, stale_ttl: int):
+        start = time.perf_counter()
+        value = loader()
+        if asyncio.iscoroutine(value):
+            value = await value
+        pipe = self.server.pipeline(transaction=False)
+        if ttl:
+            meta = {
+                "delta": time.perf_counter() - start,
+                "expires_at": time.time() + ttl,
+            }
+            pipe.set(f"{self._key}_{key}", self._pack(value), ex=ttl + stale_ttl)
+            pipe.set(f"{self._key}_{key}:meta", orjson.dumps(meta), ex=ttl + stale_ttl)
+        else:
+            # Values that never expire are never refreshed early, so they need no metadata
+            pipe.set(f"{self._key}_{key}", self._pack(value))
+            pipe.delete(f"{self._key}_{key}:meta")
+        await pipe.execute()
+        return value
+
+    async def get_or_set(
+        self,
+        key: str,
+        loader: Callable,
+        ttl: int | None = None,
+        stale_ttl: int = 0,
+        beta: float = 1.0,
+        lock_timeout: float = 10,
+        wait_timeout: float | None = None,
+        wait_interval: float = 0.05,
+    ):
+        """
+        Get a key, computing and storing it with `loader` when it is missing or expiring.
+
+        Only the caller holding a short Redis lock recomputes. While the value exists,
+        other callers get the current value, kept `stale_ttl` seconds past `ttl` to serve
+        during a refresh; when it is missing, they wait for it. Hot keys are refreshed
+        before they expire with probability growing as expiry nears (XFetch). The value
+        and a `<key>:meta` key with its compute time are stored together.
+
+        Args:
+            key (str): The key.
+            loader (Callable): Computes the value, without arguments; may be a coroutine function.
+            ttl (int, optional): Seconds the value is fresh, 0 for a value that never expires
+                and is never refreshed. Defaults to the cache timeout.
+            stale_ttl (int, optional): Seconds a stale value is served during a refresh. Defaults to 0.
+            beta (float, optional): XFetch aggressiveness, above 1 refreshes earlier. Defaults to 1.0.
+            lock_timeout (float, optional): Seconds the recompute lock is held at most. Defaults to 10.
+            wait_timeout (float, optional): Seconds to wait for another caller before computing.
+                Defaults to `lock_timeout`.
+            wait_interval (float, optional): Seconds between polls while waiting. Defaults to 0.05.
+
+        Returns:
+            The cached or computed value.
+        """
+        ttl = self._cache_timeout if ttl is None else ttl
+        full_key = f"{self._key}_{key}"
+        pipe = self.server.pipeline(transaction=False)
+        pipe.get(full_key)
+        pipe.get(f"{full_key}:meta")
+        data, meta = await pipe.execute()
+        data = self._decompress(data)
+        if data is not None and (
+            not ttl or not _should_refresh(meta and orjson.loads(meta), beta)
+        ):
+            return self._unpack(data)
+        lock = self.server.lock(
+            f"{full_key}:lock", timeout=lock_timeout, blocking=False
+        )
+        if await lock.acquire():
+            try:
+                return await self._store_loaded(key, loader, ttl, stale_ttl)
+            finally:
+                try:
+                    await lock.release()
+                except LockError:
+                    logger.warning(f"Lock of {full_key} expired while loading")
+        if data is not None:
+            return self._unpack(data)
+        deadline = time.monotonic() + (
+            lock_timeout if wait_timeout is None else wait_timeout
+        )
+        while time.monotonic() < deadline:
+            await asyncio.sleep(wait_interval)
+            data = await self._getData(full_key)
+            if data is not None:
+                return self._unpack(data)
+        logger.warning(f"Timed out waiting for {full_key}, loading without lock")
+        return await self._store_loaded(key, loader, ttl, stale_ttl)
+
+    def _script(self, name: str):
+        script = self._scripts.get(name)
+        if script is None:
+            script = self._scripts[name] = self.server.register_script(SCRIPTS[name])
+        return script
+
+    async def load_scripts(self):
+        """
+        Load the Lua scripts into the server script cache, so their first calls use EVALSHA.
+        """
+        for name in SCRIPTS:
+            self._script(name)
+            await self.server.script_load(SCRIPTS[name])
+
+    async def compare_and_set(
+        self, key: str, field: str, expected, data: dict, timeout: int | None = None
+    ) -> bool:
+        """
+        Atomically replace a stored object only while one of its fields has the expected value.
+        See RedisBase.compare_and_set.
+        """
+        _require_json(self, "compare_and_set")
+        replaced = await self._script("compare_and_set")(
+            keys=[f"{self._key}_{key}"],
+            args=[
+                field,
+                orjson.dumps(expected),
+                JSON_CODEC.encode(data),
+                self._cache_timeout if timeout is None else timeout,
+            ],
+            client=self.server,
+        )
+        return bool(replaced)
+
+    async def update_fields(
+        self, key: str, fields: dict, timeout: int | None = None
+    ) -> dict:
+        """
+        Atomically merge fields into a stored object, creating it when missing.
+        See RedisBase.update_fields.
+        """
+        _require_json(self, "update_fields")
+        result = await self._script("update_fields")(
+            keys=[f"{self._key}_{key}"],
+            args=[JSON_CODEC.encode(fields), timeout or 0, self._cache_timeout or 0],
+            client=self.server,
+        )
+        return orjson.loads(result)
+
+    async def incr_with_ttl(
+        self,
+        key: str,
+        amount: int = 1,
+        timeout: int | None = None,
+        field: str | None = None,
+    ) -> int | float:
+        """
+        Atomically increment a counter, setting its expiry only when it is created.
+        See RedisBase.incr_with_ttl.
+        """
+        if field is not None:
+            _require_json(self, "incr_with_ttl with a field")
+        timeout = self._cache_timeout if timeout is None else timeout
+        if field is None:
+            return await self._script("incr_with_ttl")(
+                keys=[f"{self._key}_{key}"],
+                args=[amount, timeout or 0],
+                client=self.server,
+            )
+        return orjson.loads(
+            await self._script("incr_field_with_ttl")(
+                keys=[f"{self._key}_{key}"],
+                args=[field, amount, timeout or 0],
+                client=self.server,
+            )
+        )
 
-    async def delete_keys(self, pattern: str) -> int:
-        keys = await self.search(pattern)
-        for key in keys:
-            await self.delete(key)
-        return len(keys)
+    async def set_if_absent(
+        self, key: str, data: dict, timeout: int | None = None
+    ) -> bool:
+        """
+        Set a key only when it does not exist yet, with SET NX.
+        """
+        timeout = self._cache_timeout if timeout is None else timeout
+        created = await self.server.set(
+            f"{self._key}_{key}", self._pack(data), ex=timeout or None, nx=True
+        )
+        return bool(created)
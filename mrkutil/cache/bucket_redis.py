@@ -0,0 +1,390 @@
+import os
+import struct
+import time
+import zlib
+from collections import defaultdict
+
+from .base_redis import PIPELINE_CHUNK_SIZE, SCAN_COUNT, _aligned, _chunks, _decode
+from .base_redis import _encode, _key_prefix
+from .compression import CompressionCodec, decompress
+from .local_redis import is_local_url
+from .redis_pool import cluster_requested, get_async_client, get_client
+from .scripts import SCRIPTS
+from .serialization import JSON_CODEC, ValueCodec
+
+# Every field value starts with its expiry as unix seconds, 0 when it never expires.
+EXPIRY = struct.Struct(">I")
+
+
+def _bucket_index(key: str, buckets: int) -> int:
+    return zlib.crc32(key.encode("utf-8")) % buckets
+
+
+def _unwrap(value: bytes | None, now: float):
+    """
+    Split a field value into its data, or None when it is missing or expired.
+    """
+    if value is None or len(value) < EXPIRY.size:
+        return None
+    (expires_at,) = EXPIRY.unpack_from(value)
+    if expires_at and expires_at <= now:
+        return None
+    return value[EXPIRY.size :]
+
+
+class _BucketLayout:
+    """Key placement and value framing shared by the sync and async bucket stores."""
+
+    def _setup(self, key, cache_timeout, buckets, compression, hash_tag, codec, host):
+        if is_local_url(host or os.getenv("REDIS_HOST")):
+            raise ValueError(
+                "Bucketed storage requires Redis, local backends store plain keys"
+            )
+        if buckets < 1:
+            raise ValueError("buckets must be at least 1")
+        self._key = _key_prefix(key, hash_tag)
+        self._cache_timeout = cache_timeout
+        self.buckets = buckets
+        self.compression = compression
+        self.codec = codec
+        self._scripts = {}
+
+    def _script(self, name: str):
+        script = self._scripts.get(name)
+        if script is None:
+            script = self._scripts[name] = self.server.register_script(SCRIPTS[name])
+        return script
+
+    def _bucket(self, key: str) -> str:
+        return f"{self._key}_bucket_{_bucket_index(key, self.buckets)}"
+
+    def _all_buckets(self) -> list[str]:
+        return [f"{self._key}_bucket_{i}" for i in range(self.buckets)]
+
+    def _group(self, keys: list[str]) -> dict[str, list[str]]:
+        groups = defaultdict(list)
+        for key in keys:
+            groups[self._bucket(key)].append(key)
+        return groups
+
+    def _wrap(self, data, ttl: int) -> bytes:
+        data = _encode(data) if self.codec is None else self.codec.encode(data)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if self.compression is not None:
+            data = self.compression.encode(data)
+        return EXPIRY.pack(int(time.time()) + ttl if ttl else 0) + data
+
+    def _unpack(self, data, type: type | None = None):
+        if data is None:
+            return None
+        if self.compression is not None:
+            data = decompress(data)
+        if self.codec is not None:
+            return self.codec.decode(data, type)
+        if type is not None:
+            return JSON_CODEC.decode(data, type)
+        return _decode(data)
+
+    def _ttl(self, key: str, timeout: int | None, timeouts: dict[str, int] | None):
+        if timeouts and key in timeouts:
+            return timeouts[key]
+        return self._cache_timeout if timeout is None else timeout
+
+    def _queue_set(self, pipe, bucket: str, fields: dict[str, bytes], ttl: int):
+        # The bucket lives as long as its longest lived field, and forever with a field
+        # that never expires. Awaited on async pipelines.
+        return self._script("bucket_set")(
+            keys=[bucket],
+            args=[ttl or 0, *[x for item in fields.items() for x in item]],
+            client=pipe,
+        )
+
+
+class BucketRedisBase(_BucketLayout):
+    """Memory-compact store for many small values
+
+    Keys are hashed into a fixed number of Redis hashes (buckets) and stored as hash fields,
+    so small buckets use the compact listpack encoding instead of a full Redis key per value.
+    Keep buckets within `hash-max-listpack-entries` (128 by default) fields, e.g. with
+    `buckets` around the expected number of keys divided by 100, and values within
+    `hash-max-listpack-value` bytes. Redis 7 or newer is required.
+
+    Fields have no native expiry, so every value carries its expiry time. Expired values
+    are never returned and are removed with `purge_expired`. A bucket itself expires
+    with its longest lived field, and never while it holds a field without expiry.
+
+    Attributes:
+        server (redis.Redis | redis.cluster.RedisCluster): The Redis server instance.
+        buckets (int): Number of hashes the keys are spread over.
+        compression (CompressionCodec | None): Optional codec compressing values.
+        codec (ValueCodec | None): Optional value serializer, as in RedisBase.
+    """
+
+    def __init__(
+        self,
+        key: str = "",
+        cache_timeout: int = 86400,
+        buckets: int = 1024,
+        host: str | None = None,
+        port: int = 6379,
+        db: int = 0,
+        compression: CompressionCodec | None = None,
+        cluster: bool | None = None,
+        hash_tag: bool | str = False,
+        codec: ValueCodec | None = None,
+    ):
+        self._setup(key, cache_timeout, buckets, compression, hash_tag, codec, host)
+        if cluster is None:
+            cluster = cluster_requested()
+        self.server = get_client(host, port, db, cluster=cluster)
+
+    def _read(self, groups: dict[str, list[str]]) -> dict[str, bytes | None]:
+        pipe = self.server.pipeline(transaction=False)
+        for bucket, fields in groups.items():
+            pipe.hmget(bucket, fields)
+        now = time.time()
+        found = {}
+        # Expired fields are left to purge_expired, deleting them here could race with a set
+        for (bucket, fields), values in zip(groups.items(), pipe.execute()):
+            for field, value in zip(fields, values):
+                found[field] = _unwrap(value, now)
+        return found
+
+    def get(self, key: str, type: type | None = None):
+        return self._unpack(self._read({self._bucket(key): [key]})[key], type)
+
+    def get_multiple(self, keys: list[str], type: type | None = None):
+        found = self._read(self._group(keys))
+        return [self._unpack(found[x], type) for x in keys if found[x] is not None]
+
+    def get_many(
+        self,
+        keys: list[str],
+        as_dict: bool = False,
+        chunk_size: int = PIPELINE_CHUNK_SIZE,
+        type: type | None = None,
+    ):
+        """
+        Get many keys with one HMGET per bucket, pipelined per `chunk_size` keys.
+
+        Returns:
+            list | dict: Data aligned with `keys`, None for missing or expired keys.
+        """
+        keys = list(keys)
+        values = []
+        for chunk in _chunks(keys, chunk_size):
+            found = self._read(self._group(chunk))
+            values.extend(self._unpack(found[x], type) for x in chunk)
+        return _aligned(keys, values, as_dict)
+
+    def set(self, key: str, data: dict, timeout: int | None = None):
+        ttl = self._ttl(key, timeout, None)
+        pipe = self.server.pipeline(transaction=False)
+        self._queue_set(pipe, self._bucket(key), {key: self._wrap(data, ttl)}, ttl)
+        return pipe.execute()[0]
+
+    def set_many(
+        self,
+        items: dict[str, dict],
+        timeout: int | None = None,
+        timeouts: dict[str, int] | None = None,
+        chunk_size: int = PIPELINE_CHUNK_SIZE,
+    ):
+        """
+        Set many keys with one HSET per bucket and expiry, pipelined per `chunk_size` keys.
+        """
+        for chunk in _chunks(list(items), chunk_size):
+            groups = defaultdict(dict)
+            for key in chunk:
+                ttl = self._ttl(key, timeout, timeouts)
+                groups[(self._bucket(key), ttl)][key] = self._wrap(items[key], ttl)
+            pipe = self.server.pipeline(transaction=False)
+            for (bucket, ttl), fields in groups.items():
+                self._queue_set(pipe, bucket, fields, ttl)
+            pipe.execute()
+
+    def delete(self, key: str):
+        return self.server.hdel(self._bucket(key), key)
+
+    def delete_many(
+        self, keys: list[str], chunk_size: int = PIPELINE_CHUNK_SIZE
+    ) -> int:
+        deleted = 0
+        for chunk in _chunks(list(keys), chunk_size):
+            pipe = self.server.pipeline(transaction=False)
+            for bucket, fields in self._group(chunk).items():
+                pipe.hdel(bucket, *fields)
+            deleted += sum(pipe.execute())
+        return deleted
+
+    def iter_keys(self, pattern: str = "*", count: int = SCAN_COUNT):
+        """
+        Iterate over live keys matching the pattern with HSCAN over every bucket.
+
+        Yields:
+            str: The keys.
+        """
+        now = time.time()
+        for bucket in self._all_buckets():
+            for field, value in self.server.hscan_iter(
+                bucket, match=pattern, count=count
+            ):
+                if _unwrap(value, now) is not None:
+                    yield field.decode("utf-8")
+
+    def search(self, pattern: str, count: int = SCAN_COUNT) -> list[str]:
+        return list(self.iter_keys(pattern, count))
+
+    def purge_expired(self, count: int = SCAN_COUNT) -> int:
+        """
+        Delete expired fields from every bucket.
+
+        Returns:
+            int: Number of deleted fields.
+        """
+        deleted = 0
+        for bucket in self._all_buckets():
+            now = time.time()
+            expired = [
+                field
+                for field, value in self.server.hscan_iter(bucket, count=count)
+                if _unwrap(value, now) is None
+            ]
+            for chunk in _chunks(expired, PIPELINE_CHUNK_SIZE):
+                deleted += self.server.hdel(bucket, *chunk)
+        return deleted
+
+
+class AsyncBucketRedisBase(_BucketLayout):
+    """Memory-compact store for many small values, for asyncio
+
+    Same layout and behaviour as BucketRedisBase, using the client of the running event loop.
+
+    Attributes:
+        server (redis.asyncio.Redis | redis.asyncio.cluster.RedisCluster): The Redis server
+            instance of the running event loop.
+        buckets (int): Number of hashes the keys are spread over.
+        compression (CompressionCodec | None): Optional codec compressing values.
+        codec (ValueCodec | None): Optional value serializer, as in RedisBase.
+    """
+
+    def __init__(
+        self,
+        key: str = "",
+        cache_timeout: int = 86400,
+        buckets: int = 1024,
+        host: str | None = None,
+        port: int = 6379,
+        db: int = 0,
+        compression: CompressionCodec | None = None,
+        cluster: bool | None = None,
+        hash_tag: bool | str = False,
+        codec: ValueCodec | None = None,
+    ):
+        self._host = host
+        self._port = port
+        self._db = db
+        self._cluster = cluster_requested() if cluster is None else cluster
+        self._setup(key, cache_timeout, buckets, compression, hash_tag, codec, host)
+
+    @property
+    def server(self):
+        return get_async_client(self._host, self._port, self._db, cluster=self._cluster)
+
+    async def _read(self, groups: dict[str, list[str]]) -> dict[str, bytes | None]:
+        pipe = self.server.pipeline(transaction=False)
+        for bucket, fields in groups.items():
+            pipe.hmget(bucket, fields)
+        now = time.time()
+        found = {}
+        # Expired fields are left to purge_expired, deleting them here could race with a set
+        for (bucket, fields), values in zip(groups.items(), await pipe.execute()):
+            for field, value in zip(fields, values):
+                found[field] = _unwrap(value, now)
+        return found
+
+    async def get(self, key: str, type: type | None = None):
+        return self._unpack((await self._read({self._bucket(key): [key]}))[key], type)
+
+    async def get_multiple(self, keys: list[str], type: type | None = None):
+        found = await self._read(self._group(keys))
+        return [self._unpack(found[x], type) for x in keys if found[x] is not None]
+
+    async def get_many(
+        self,
+        keys: list[str],
+        as_dict: bool = False,
+        chunk_size: int = PIPELINE_CHUNK_SIZE,
+        type: type | None = None,
+    ):
+        keys = list(keys)
+        values = []
+        for chunk in _chunks(keys, chunk_size):
+            found = await self._read(self._group(chunk))
+            values.extend(self._unpack(found[x], type) for x in chunk)
+        return _aligned(keys, values, as_dict)
+
+    async def set(self, key: str, data: dict, timeout: int | None = None):
+        ttl = self._ttl(key, timeout, None)
+        pipe = self.server.pipeline(transaction=False)
+        await self._queue_set(
+            pipe, self._bucket(key), {key: self._wrap(data, ttl)}, ttl
+        )
+        return (await pipe.execute())[0]
+
+    async def set_many(
+        self,
+        items: dict[str, dict],
+        timeout: int | None = None,
+        timeouts: dict[str, int] | None = None,
+        chunk_size: int = PIPELINE_CHUNK_SIZE,
+    ):
+        for chunk in _chunks(list(items), chunk_size):
+            groups = defaultdict(dict)
+            for key in chunk:
+                ttl = self._ttl(key, timeout, timeouts)
+                groups[(self._bucket(key), ttl)][key] = self._wrap(items[key], ttl)
+            pipe = self.server.pipeline(transaction=False)
+            for (bucket, ttl), fields in groups.items():
+                await self._queue_set(pipe, bucket, fields, ttl)
+            await pipe.execute()
+
+    async def delete(self, key: str):
+        return await self.server.hdel(self._bucket(key), key)
+
+    async def delete_many(
+        self, keys: list[str], chunk_size: int = PIPELINE_CHUNK_SIZE
+    ) -> int:
+        deleted = 0
+        for chunk in _chunks(list(keys), chunk_size):
+            pipe = self.server.pipeline(transaction=False)
+            for bucket, fields in self._group(chunk).items():
+                pipe.hdel(bucket, *fields)
+            deleted += sum(await pipe.execute())
+        return deleted
+
+    async def iter_keys(self, pattern: str = "*", count: int = SCAN_COUNT):
+        now = time.time()
+        for bucket in self._all_buckets():
+            async for field, value in self.server.hscan_iter(
+                bucket, match=pattern, count=count
+            ):
+                if _unwrap(value, now) is not None:
+                    yield field.decode("utf-8")
+
+    async def search(self, pattern: str, count: int = SCAN_COUNT) -> list[str]:
+        return [key async for key in self.iter_keys(pattern, count)]
+
+    async def purge_expired(self, count: int = SCAN_COUNT) -> int:
+        deleted = 0
+        for bucket in self._all_buckets():
+            now = time.time()
+            expired = [
+                field
+                async for field, value in self.server.hscan_iter(bucket, count=count)
+                if _unwrap(value, now) is None
+            ]
+            for chunk in _chunks(expired, PIPELINE_CHUNK_SIZE):
+                deleted += await self.server.hdel(bucket, *chunk)
+        return deleted
@@ -0,0 +1,106 @@
+import zlib
+
+from mrkutil.enum import CompressionAlgorithmEnum
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover - optional dependency
+    lz4_frame = None
+
+# Compressed values start with a zero byte followed by the algorithm id.
+# Only readers with a codec look for it, so binary values of other caches are never decoded.
+MARKER = b"\x00"
+ALGORITHM_IDS = {
+    CompressionAlgorithmEnum.ZLIB: b"z",
+    CompressionAlgorithmEnum.ZSTD: b"s",
+    CompressionAlgorithmEnum.LZ4: b"l",
+}
+ALGORITHMS_BY_ID = {value: key for key, value in ALGORITHM_IDS.items()}
+
+
+def _require(algorithm: CompressionAlgorithmEnum):
+    if algorithm == CompressionAlgorithmEnum.ZSTD and zstandard is None:
+        raise ValueError("zstd compression requires the zstandard package")
+    if algorithm == CompressionAlgorithmEnum.LZ4 and lz4_frame is None:
+        raise ValueError("lz4 compression requires the lz4 package")
+
+
+def _compress(
+    algorithm: CompressionAlgorithmEnum, data: bytes, level: int | None
+) -> bytes:
+    if algorithm == CompressionAlgorithmEnum.ZSTD:
+        return zstandard.ZstdCompressor(level=level or 3).compress(data)
+    if algorithm == CompressionAlgorithmEnum.LZ4:
+        return lz4_frame.compress(data, compression_level=level or 0)
+    return zlib.compress(data, 6 if level is None else level)
+
+
+def decompress(data):
+    """
+    Decompress a value read from Redis, returning values without the header unchanged.
+
+    Args:
+        data (bytes | None): The stored value.
+
+    Returns:
+        bytes | None: The original value.
+    """
+    if not data or data[:1] != MARKER:
+        return data
+    algorithm = ALGORITHMS_BY_ID.get(data[1:2])
+    if algorithm is None:
+        return data
+    _require(algorithm)
+    payload = data[2:]
+    if algorithm == CompressionAlgorithmEnum.ZSTD:
+        return zstandard.ZstdDecompressor().decompress(payload)
+    if algorithm == CompressionAlgorithmEnum.LZ4:
+        return lz4_frame.decompress(payload)
+    return zlib.decompress(payload)
+
+
+class CompressionCodec:
+    """
+    Compresses values written to Redis above a size threshold.
+
+    Compressed values carry a two byte header, so readers with any codec decode mixed
+    compressed and plain values. Readers without a codec cannot read compressed values.
+
+    Args:
+        algorithm (CompressionAlgorithmEnum): ZLIB, or ZSTD/LZ4 if their packages are installed.
+        threshold (int): Values shorter than this many bytes are stored as they are.
+        level (int, optional): Compression level. Defaults to the algorithm default.
+
+    Raises:
+        ValueError: If the algorithm package is not installed.
+    """
+
+    def __init__(
+        self,
+        algorithm: CompressionAlgorithmEnum = CompressionAlgorithmEnum.ZLIB,
+        threshold: int = 1024,
+        level: int | None = None,
+    ):
+        self.algorithm = CompressionAlgorithmEnum(algorithm)
+        _require(self.algorithm)
+        self.threshold = threshold
+        self.level = level
+        self._header = MARKER + ALGORITHM_IDS[self.algorithm]
+
+    def encode(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if not isinstance(data, bytes) or len(data) < self.threshold:
+            return data
+        compressed = self._header + _compress(self.algorithm, data, self.level)
+        # Keep incompressible values as they are
+        return compressed if len(compressed) < len(data) else data
+
+    @staticmethod
+    def decode(data):
+        return decompress(data)
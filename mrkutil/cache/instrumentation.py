@@ -0,0 +1,190 @@
+import bisect
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from mrkutil.base import get_correlation_id
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency buckets in milliseconds, the last bucket is unbounded
+LATENCY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class RedisCall:
+    """Outcome of one instrumented call, filled in by the caller."""
+
+    __slots__ = ("key", "read", "written", "hits", "misses")
+
+    def __init__(self, key: str | None = None):
+        self.key = key
+        self.read = 0
+        self.written = 0
+        self.hits = 0
+        self.misses = 0
+
+
+class _OperationStats:
+    __slots__ = (
+        "calls",
+        "errors",
+        "slow",
+        "total",
+        "buckets",
+        "read",
+        "written",
+        "hits",
+        "misses",
+    )
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.slow = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.read = 0
+        self.written = 0
+        self.hits = 0
+        self.misses = 0
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "slow": self.slow,
+            "mean_ms": round(self.total / self.calls, 4) if self.calls else 0.0,
+            "latency_ms": {
+                **{
+                    f"le_{bound}": count
+                    for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets)
+                },
+                "le_inf": self.buckets[-1],
+            },
+            "bytes_read": self.read,
+            "bytes_written": self.written,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class RedisInstrumentation:
+    """Latency, payload and hit rate metrics of RedisBase calls
+
+    Pass one instance to any number of RedisBase objects; metrics are kept per key prefix
+    and operation. Calls slower than `slow_threshold` are logged with the correlation ID
+    of the message being processed.
+
+    Attributes:
+        slow_threshold (float | None): Seconds after which a call is logged, None to disable.
+    """
+
+    def __init__(self, slow_threshold: float | None = 0.05):
+        self.slow_threshold = slow_threshold
+        self._lock = threading.Lock()
+        self._stats = defaultdict(_OperationStats)
+
+    @contextmanager
+    def call(self, prefix: str, operation: str, key: str | None = None):
+        """
+        Measure one call. The yielded RedisCall collects its payload sizes and hits.
+        """
+        call = RedisCall(key)
+        error = False
+        start = time.perf_counter()
+        try:
+            yield call
+        except Exception:
+            error = True
+            raise
+        finally:
+            self.record(prefix, operation, time.perf_counter() - start, call, error)
+
+    def record(
+        self,
+        prefix: str,
+        operation: str,
+        duration: float,
+        call: RedisCall,
+        error: bool = False,
+    ):
+        elapsed_ms = duration * 1000
+        slow = self.slow_threshold is not None and duration >= self.slow_threshold
+        with self._lock:
+            stats = self._stats[(prefix, operation)]
+            stats.calls += 1
+            stats.errors += error
+            stats.slow += slow
+            stats.total += elapsed_ms
+            stats.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+            stats.read += call.read
+            stats.written += call.written
+            stats.hits += call.hits
+            stats.misses += call.misses
+        if slow:
+            key = f" key {call.key}" if call.key is not None else ""
+            logger.warning(
+                f"Slow redis {operation} on {prefix}{key} took {elapsed_ms:.1f}ms, "
+                f"corr id {get_correlation_id()}"
+            )
+
+    def snapshot(self) -> dict:
+        """
+        Returns:
+            dict: Metrics per key prefix and operation.
+        """
+        with self._lock:
+            result = defaultdict(dict)
+            for (prefix, operation), stats in self._stats.items():
+                result[prefix][operation] = stats.as_dict()
+            return dict(result)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+class _NotInstrumented:
+    """Stateless stand-in for RedisCall while instrumentation is off.
+
+    It is falsy, so callers can skip measuring payloads, and discards what is recorded on it.
+    """
+
+    __slots__ = ()
+
+    def __bool__(self):
+        return False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return 0
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NOT_INSTRUMENTED = _NotInstrumented()
+
+
+def observe(
+    instrumentation: RedisInstrumentation | None, prefix: str, operation: str, key=None
+):
+    """
+    Measure a call when instrumentation is enabled, otherwise do nothing.
+    """
+    if instrumentation is None:
+        return _NOT_INSTRUMENTED
+    return instrumentation.call(prefix, operation, key)
+
+
+def payload_size(value) -> int:
+    return len(value) if isinstance(value, (bytes, bytearray, str)) else 0
@@ -1,17 +1,128 @@
+import asyncio
+import time
+from collections import Counter
+import orjson
 from mrkutil.utilities import random_uuid
 from .base_redis import RedisBase, AsyncRedisBase
+from .job_notifier import JobNotifier
+from .redis_pool import get_client
 from mrkutil.enum import JobStatusEnum
 
+FINAL_STATUSES = (JobStatusEnum.COMPLETE, JobStatusEnum.FAILED)
+
+
+def _parent_of(key: str) -> str | None:
+    parent, _, _ = key.rpartition("_")
+    return parent or None
+
+
+def _text(value) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else str(value)
+
+
+def _pairs(values: list) -> dict[str, str]:
+    values = [_text(x) for x in values]
+    return dict(zip(values[::2], values[1::2]))
+
+
+def _decode_counts(result: list) -> tuple[int, dict]:
+    return int(result[0]), {
+        field: int(value) for field, value in _pairs(result[1:]).items()
+    }
+
+
+def _decode_progress(fields: dict) -> dict:
+    return {_text(field): orjson.loads(value) for field, value in fields.items()}
+
+
+def _decode_events(entries: list) -> list[tuple[str, dict]]:
+    return [
+        (_text(entry_id), orjson.loads(fields[b"event"]))
+        for entry_id, fields in entries
+    ]
+
+
+def _resolve_parent(
+    total: int, counts: dict, status: JobStatusEnum
+) -> JobStatusEnum | None:
+    if counts.get(JobStatusEnum.COMPLETE.value, 0) == total:
+        return status
+    if counts.get(JobStatusEnum.FAILED.value, 0) > 0:
+        return JobStatusEnum.FAILED
+    return None
+
+
+def _finished(job: dict | None) -> bool:
+    return job is None or job.get("status") in FINAL_STATUSES
+
+
+def _notification(key: str, status: JobStatusEnum | None = None) -> bytes:
+    return orjson.dumps(
+        {"key": key, "status": status.value if status is not None else None}
+    )
+
+
+def _legacy_counts(children: list) -> tuple[int, dict]:
+    children = [x for x in children if isinstance(x, dict)]
+    return len(children), Counter(str(x.get("status")) for x in children)
+
 
 class JobCache(RedisBase):
-    def __init__(self):
+    """Job status storage
+
+    Child jobs are created with `create_job(parent_key)`. Every parent keeps a hash of the
+    status of each child and a hash counting them per status, updated atomically on every
+    child status change, so `check_set_parent_job` resolves the parent in O(1). Both use
+    the parent as hash tag and the progress keys of a job use the job, so the scripts
+    touch a single cluster slot.
+
+    Status changes are published on the `u_jobs_events` channel; `wait_for_job` blocks
+    on them instead of polling `check_job`.
+
+    Progress fields live in a hash per job, so `update_progress` changes them in place.
+    With `history`, every status and progress update is also appended to a capped
+    Redis Stream per job, read with `job_events`.
+
+    Attributes:
+        history (int): Approximate number of events kept per job, 0 to keep none.
+    """
+
+    def __init__(self, history: int = 0):
         super().__init__(key="u_jobs", cache_timeout=3600)
+        self.history = history
+
+    def _parent_keys(self, parent: str) -> list[str]:
+        return [
+            f"{self._key}_{{{parent}}}:children",
+            f"{self._key}_{{{parent}}}:counts",
+        ]
+
+    def _progress_keys(self, key: str) -> list[str]:
+        return [f"{self._key}_{{{key}}}:progress", f"{self._key}_{{{key}}}:events"]
+
+    def _set_status(self, key: str, status: JobStatusEnum, data, register: bool):
+        parent = _parent_of(key)
+        value = (
+            {"status": status, "data": data} if data is not None else {"status": status}
+        )
+        self.set(key, value)
+        if parent is not None:
+            self._script("set_job_status")(
+                keys=self._parent_keys(parent),
+                args=[key, status.value, self._cache_timeout or 0, int(register)],
+            )
+        if self.history:
+            self._script("append_job_event")(
+                keys=[self._progress_keys(key)[1]],
+                args=[orjson.dumps(value), self.history, self._cache_timeout or 0],
+            )
+        self.server.publish(f"{self._key}_events", _notification(key, status))
 
     def create_job(self, parent_key: str = None):
         key = random_uuid()
         if parent_key:
             key = f"{parent_key}_{key}"
-        self.set(key, {"status": JobStatusEnum.PENDING})
+        self._set_status(key, JobStatusEnum.PENDING, None, register=bool(parent_key))
         return key
 
     def set_progress(
@@ -20,44 +131,311 @@ class JobCache(RedisBase):
         status: JobStatusEnum = JobStatusEnum.IN_PROGRESS,
         data: dict = {},
     ):
-        self.set(key, {"status": status, "data": data})
+        self._set_status(key, JobStatusEnum(status), data, register=False)
 
     def check_job(self, key: str):
         return self.get(key)
 
+    def wait_for_job(self, key: str, timeout: float | None = None):
+        """
+        Block until a job is COMPLETE or FAILED, woken by status notifications.
+        All waiting threads of the process share one subscription.
+
+        Args:
+            key (str): The job key.
+            timeout (float, optional): Seconds to wait at most, None to wait indefinitely.
+
+        Returns:
+            dict | None: The job, still unfinished when the timeout expired,
+                or None when it does not exist.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        notifier = JobNotifier.get(self.server, f"{self._key}_events")
+        waiter = notifier.register(key)
+        try:
+            while True:
+                waiter.event.clear()
+                job = self.check_job(key)
+                if _finished(job):
+                    return job
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return job
+                waiter.event.wait(remaining)
+        finally:
+            notifier.unregister(key, waiter)
+
+    def update_progress(
+        self, key: str, fields: dict | None = None, increments: dict | None = None
+    ) -> dict:
+        """
+        Update progress fields of a job in place, without rewriting the job.
+
+        Args:
+            key (str): The job key.
+            fields (dict, optional): Fields to set, e.g. {"percent": 40}.
+            increments (dict, optional): Amounts added to numeric fields, e.g. {"processed": 10}.
+
+        Returns:
+            dict: All progress fields of the job.
+        """
+        result = self._script("update_job_progress")(
+            keys=self._progress_keys(key),
+            args=[
+                orjson.dumps(fields or {}),
+                orjson.dumps(increments or {}),
+                self._cache_timeout or 0,
+                self.history,
+            ],
+        )
+        self.server.publish(f"{self._key}_events", _notification(key))
+        return _decode_progress(_pairs(result))
+
+    def get_progress(self, key: str) -> dict:
+        """
+        Returns:
+            dict: The progress fields of a job, empty when none were set.
+        """
+        return _decode_progress(self.server.hgetall(self._progress_keys(key)[0]))
+
+    def job_events(
+        self,
+        key: str,
+        after: str = "0-0",
+        count: int = 100,
+        timeout: float | None = None,
+    ) -> list[tuple[str, dict]]:
+        """
+        Read the recorded events of a job, oldest first. Pass the ID of the last event
+        read as `after` to tail the job.
+
+        Args:
+            key (str): The job key.
+            after (str, optional): Return events after this stream ID. Defaults to the start.
+            count (int, optional): Maximum number of events. Defaults to 100.
+            timeout (float, optional): Seconds to wait for new events when there are none.
+                Defaults to returning immediately.
+
+        Returns:
+            list[tuple[str, dict]]: Stream IDs and events, with "status" and "data"
+                or "progress" with the changed fields.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        stream = self._progress_keys(key)[1]
+        notifier = waiter = None
+        try:
+            while True:
+                if waiter is not None:
+                    waiter.event.clear()
+                events = _decode_events(
+                    self.server.xrange(stream, f"({after}", "+", count=count)
+                )
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if events or remaining is None or remaining <= 0:
+                    return events
+                if waiter is None:
+                    # Registered before reading again, so no event is missed
+                    notifier = JobNotifier.get(self.server, f"{self._key}_events")
+                    waiter = notifier.register(key)
+                    continue
+                waiter.event.wait(remaining)
+        finally:
+            if waiter is not None:
+                notifier.unregister(key, waiter)
+
+    def child_job_counts(self, key: str) -> tuple[int, dict]:
+        """
+        Args:
+            key (str): The parent job key.
+
+        Returns:
+            tuple[int, dict]: Number of child jobs and their count per status.
+        """
+        return _decode_counts(
+            self._script("child_job_counts")(keys=self._parent_keys(key))
+        )
+
     def check_set_parent_job(self, key: str, status: JobStatusEnum, data: dict):
         job = self.get(key)
         if job:
-            keys = self.search(pattern=f"{key}_*")
-            children = self.get_multiple(keys)
-            if all(item.get("status") == JobStatusEnum.COMPLETE for item in children):
-                self.set_progress(key, status, data)
-            elif any(item.get("status") == JobStatusEnum.FAILED for item in children):
+            total, counts = self.child_job_counts(key)
+            if not total:
+                # Children stored without create_job are only found by scanning
+                keys = self.search(pattern=f"{key}_*")
+                total, counts = _legacy_counts(self.get_multiple(keys))
+            resolved = _resolve_parent(total, counts, status)
+            if resolved == JobStatusEnum.FAILED:
                 self.set_progress(key, JobStatusEnum.FAILED)
+            elif resolved is not None:
+                self.set_progress(key, resolved, data)
 
 
 class AJobCache(AsyncRedisBase):
-    def __init__(self):
+    """Job status storage, see JobCache"""
+
+    def __init__(self, history: int = 0):
         super().__init__(key="u_jobs", cache_timeout=3600)
+        self.history = history
+
+    def _parent_keys(self, parent: str) -> list[str]:
+        return [
+            f"{self._key}_{{{parent}}}:children",
+            f"{self._key}_{{{parent}}}:counts",
+        ]
+
+    def _progress_keys(self, key: str) -> list[str]:
+        return [f"{self._key}_{{{key}}}:progress", f"{self._key}_{{{key}}}:events"]
 
-    async def create_job(self):
+    async def _set_status(self, key: str, status: JobStatusEnum, data, register: bool):
+        parent = _parent_of(key)
+        value = (
+            {"status": status, "data": data} if data is not None else {"status": status}
+        )
+        await self.set(key, value)
+        if parent is not None:
+            await self._script("set_job_status")(
+                keys=self._parent_keys(parent),
+                args=[key, status.value, self._cache_timeout or 0, int(register)],
+                client=self.server,
+            )
+        if self.history:
+            await self._script("append_job_event")(
+                keys=[self._progress_keys(key)[1]],
+                args=[orjson.dumps(value), self.history, self._cache_timeout or 0],
+                client=self.server,
+            )
+        await self.server.publish(f"{self._key}_events", _notification(key, status))
+
+    async def create_job(self, parent_key: str = None):
         key = random_uuid()
-        await self.set(key, {"status": JobStatusEnum.PENDING})
+        if parent_key:
+            key = f"{parent_key}_{key}"
+        await self._set_status(
+            key, JobStatusEnum.PENDING, None, register=bool(parent_key)
+        )
         return key
 
-    async def set_progress(self, key: str, status: JobStatusEnum, data: dict = {}):
-        await self.set(key, {"status": status, "data": data})
+    async def set_progress(
+        self,
+        key: str,
+        status: JobStatusEnum = JobStatusEnum.IN_PROGRESS,
+        data: dict = {},
+    ):
+        await self._set_status(key, JobStatusEnum(status), data, register=False)
 
     async def check_job(self, key: str):
         job = await self.get(key)
         return job
 
+    async def wait_for_job(self, key: str, timeout: float | None = None):
+        """
+        Wait until a job is COMPLETE or FAILED, see JobCache.wait_for_job.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        notifier = JobNotifier.get(
+            get_client(self._host, self._port, self._db, cluster=self._cluster),
+            f"{self._key}_events",
+        )
+        waiter = notifier.register(key, asyncio.get_running_loop())
+        try:
+            while True:
+                waiter.event.clear()
+                job = await self.check_job(key)
+                if _finished(job):
+                    return job
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return job
+                try:
+                    await asyncio.wait_for(waiter.event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            notifier.unregister(key, waiter)
+
+    async def update_progress(
+        self, key: str, fields: dict | None = None, increments: dict | None = None
+    ) -> dict:
+        """
+        Update progress fields of a job in place, see JobCache.update_progress.
+        """
+        result = await self._script("update_job_progress")(
+            keys=self._progress_keys(key),
+            args=[
+                orjson.dumps(fields or {}),
+                orjson.dumps(increments or {}),
+                self._cache_timeout or 0,
+                self.history,
+            ],
+            client=self.server,
+        )
+        await self.server.publish(f"{self._key}_events", _notification(key))
+        return _decode_progress(_pairs(result))
+
+    async def get_progress(self, key: str) -> dict:
+        return _decode_progress(await self.server.hgetall(self._progress_keys(key)[0]))
+
+    async def job_events(
+        self,
+        key: str,
+        after: str = "0-0",
+        count: int = 100,
+        timeout: float | None = None,
+    ) -> list[tuple[str, dict]]:
+        """
+        Read the recorded events of a job, see JobCache.job_events.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        stream = self._progress_keys(key)[1]
+        notifier = waiter = None
+        try:
+            while True:
+                if waiter is not None:
+                    waiter.event.clear()
+                events = _decode_events(
+                    await self.server.xrange(stream, f"({after}", "+", count=count)
+                )
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if events or remaining is None or remaining <= 0:
+                    return events
+                if waiter is None:
+                    notifier = JobNotifier.get(
+                        get_client(
+                            self._host, self._port, self._db, cluster=self._cluster
+                        ),
+                        f"{self._key}_events",
+                    )
+                    waiter = notifier.register(key, asyncio.get_running_loop())
+                    continue
+                try:
+                    await asyncio.wait_for(waiter.event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if waiter is not None:
+                notifier.unregister(key, waiter)
+
+    async def child_job_counts(self, key: str) -> tuple[int, dict]:
+        """
+        Returns:
+            tuple[int, dict]: Number of child jobs and their count per status.
+        """
+        return _decode_counts(
+            await self._script("child_job_counts")(
+                keys=self._parent_keys(key), client=self.server
+            )
+        )
+
     async def check_set_parent_job(self, key: str, status: JobStatusEnum, data: dict):
         job = await self.get(key)
         if job:
-            keys = await self.search(pattern=f"{key}_*")
-            children = await self.get_multiple(keys)
-            if all(item.get("status") == JobStatusEnum.COMPLETE for item in children):
-                await self.set_progress(key, status, data)
-            elif any(item.get("status") == JobStatusEnum.FAILED for item in children):
+            total, counts = await self.child_job_counts(key)
+            if not total:
+                # Children stored without create_job are only found by scanning
+                keys = await self.search(pattern=f"{key}_*")
+                total, counts = _legacy_counts(await self.get_multiple(keys))
+            resolved = _resolve_parent(total, counts, status)
+            if resolved == JobStatusEnum.FAILED:
                 await self.set_progress(key, JobStatusEnum.FAILED)
+            elif resolved is not None:
+                await self.set_progress(key, resolved, data)
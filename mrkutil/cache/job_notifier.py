@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import threading
+
+import orjson
+import redis
+
+logger = logging.getLogger(__name__)
+
+
+class _Waiter:
+    def __init__(self, loop: asyncio.AbstractEventLoop | None = None):
+        self._loop = loop
+        self.event = asyncio.Event() if loop is not None else threading.Event()
+
+    def wake(self):
+        if self._loop is None:
+            self.event.set()
+            return
+        try:
+            self._loop.call_soon_threadsafe(self.event.set)
+        except RuntimeError:
+            # The event loop of the waiter is closed
+            pass
+
+
+class JobNotifier:
+    """Process wide subscriber to job status changes
+
+    One thread per connection pool and channel listens while any job is awaited and wakes
+    the waiters of a job when its status changes. All waiters are woken after a (re)subscribe,
+    as changes published while disconnected are lost, and check the job status again.
+    """
+
+    _instances: dict[tuple, "JobNotifier"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, server: redis.Redis, channel: str):
+        self._server = server
+        self._channel = channel
+        self._lock = threading.Lock()
+        self._waiters: dict[str, set[_Waiter]] = {}
+        self._thread = None
+
+    @staticmethod
+    def _connection(server):
+        # Clients of one pool are created per call, so the pool identifies the connection.
+        # Cluster and local clients are shared and identify it themselves.
+        return getattr(server, "connection_pool", server)
+
+    @classmethod
+    def get(cls, server: redis.Redis, channel: str) -> "JobNotifier":
+        """
+        Get the notifier shared by all job caches using the same connection and channel.
+        """
+        key = (cls._connection(server), channel)
+        with cls._instances_lock:
+            notifier = cls._instances.get(key)
+            if notifier is None:
+                notifier = cls._instances[key] = cls(server, channel)
+            return notifier
+
+    @classmethod
+    def discard(cls, connections):
+        """
+        Drop the notifiers of closed connection pools or clients. Listening threads end
+        once their waiters are gone.
+        """
+        connections = {id(x) for x in connections}
+        with cls._instances_lock:
+            for key in [x for x in cls._instances if id(x[0]) in connections]:
+                del cls._instances[key]
+
+    @property
+    def waiting(self) -> int:
+        with self._lock:
+            return sum(len(x) for x in self._waiters.values())
+
+    def register(
+        self, key: str, loop: asyncio.AbstractEventLoop | None = None
+    ) -> _Waiter:
+        """
+        Register interest in a job before reading its status, so no change is missed.
+        """
+        waiter = _Waiter(loop)
+        with self._lock:
+            self._waiters.setdefault(key, set()).add(waiter)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._listen,
+                    name=f"job-notifier-{self._channel}",
+                    daemon=True,
+                )
+                self._thread.start()
+        return waiter
+
+    def unregister(self, key: str, waiter: _Waiter):
+        with self._lock:
+            waiters = self._waiters.get(key)
+            if waiters is not None:
+                waiters.discard(waiter)
+                if not waiters:
+                    del self._waiters[key]
+
+    def _wake(self, key: str | None):
+        with self._lock:
+            if key is None:
+                waiters = [x for group in self._waiters.values() for x in group]
+            else:
+                waiters = list(self._waiters.get(key, ()))
+        for waiter in waiters:
+            waiter.wake()
+
+    def _idle(self) -> bool:
+        with self._lock:
+            if self._waiters:
+                return False
+            self._thread = None
+            return True
+
+    def _listen(self):
+        while not self._idle():
+            pubsub = self._server.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self._channel)
+                self._wake(None)
+                while not self._idle():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message["type"] == "message":
+                        self._on_message(message["data"])
+                return
+            except redis.RedisError as e:
+                logger.warning(f"Job notification listener failed: {e}")
+                self._wake(None)
+                threading.Event().wait(1.0)
+            finally:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+
+    def _on_message(self, data: bytes):
+        try:
+            key = orjson.loads(data)["key"]
+        except (orjson.JSONDecodeError, KeyError, TypeError):
+            logger.warning(f"Invalid job notification {data!r}")
+            return
+        self._wake(key)
@@ -0,0 +1,1129 @@
+import asyncio
+import fnmatch
+import hashlib
+import math
+import queue
+import threading
+import time
+import uuid
+from urllib.parse import parse_qs, urlparse
+
+import orjson
+from redis.exceptions import LockError, ResponseError
+
+from .job_notifier import JobNotifier
+from .local_store import HASH, SET, STREAM, STRING, LocalStore, MemoryStore, SQLiteStore
+from .scripts import SCRIPTS
+
+LOCAL_SCHEMES = ("memory", "sqlite")
+
+WRONGTYPE = "WRONGTYPE Operation against a key holding the wrong kind of value"
+
+
+def is_local_url(url: str | None) -> bool:
+    """
+    Check whether a Redis host is a URL selecting an embedded local backend.
+
+    Args:
+        url (str | None): The host, e.g. ``memory://``, ``memory://tests`` or ``sqlite:///var/cache.db``.
+
+    Returns:
+        bool: True for the ``memory://`` and ``sqlite://`` schemes.
+    """
+    return bool(url) and urlparse(url).scheme in LOCAL_SCHEMES
+
+
+def _to_bytes(value) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, (bytearray, memoryview)):
+        return bytes(value)
+    if isinstance(value, str):
+        return value.encode("utf-8")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return repr(value).encode("utf-8")
+    raise ResponseError(f"Invalid input of type {type(value).__name__}")
+
+
+def _document(value: bytes | None) -> dict:
+    if value is None:
+        return {}
+    try:
+        document = orjson.loads(value)
+    except orjson.JSONDecodeError:
+        document = None
+    if not isinstance(document, dict):
+        raise ResponseError("value is not a JSON object")
+    return document
+
+
+def _float_bytes(value: float) -> bytes:
+    # Redis formats integral floats without a fraction
+    if value.is_integer():
+        return str(int(value)).encode("utf-8")
+    return repr(value).encode("utf-8")
+
+
+def _stream_id(stream_id) -> tuple[int, int]:
+    ms, _, seq = _to_bytes(stream_id).decode("utf-8").partition("-")
+    return int(ms), int(seq or 0)
+
+
+def _stream_bound(bound, lowest: bool) -> tuple[tuple[int, int], bool]:
+    """
+    Parse an XRANGE bound into a stream ID and whether it is exclusive.
+    """
+    bound = _to_bytes(bound).decode("utf-8")
+    if bound == "-":
+        return (0, 0), False
+    if bound == "+":
+        return (math.inf, math.inf), False
+    exclusive = bound.startswith("(")
+    ms, _, seq = bound.lstrip("(").partition("-")
+    if not seq:
+        seq = 0 if lowest else math.inf
+    return (int(ms), int(seq)), exclusive
+
+
+def _stream_member(stream_id: tuple[int, int]) -> str:
+    # Zero padded, so members sort in ID order
+    return f"{stream_id[0]:020d}-{stream_id[1]:020d}"
+
+
+def _stream_fields(fields: dict) -> bytes:
+    # Latin-1 maps every byte to one character, so any field and value round trips
+    return orjson.dumps(
+        [_to_bytes(x).decode("latin-1") for pair in fields.items() for x in pair]
+    )
+
+
+def _stream_entry(member: str, value: bytes) -> tuple[bytes, dict]:
+    stream_id = _stream_id(member)
+    flat = [x.encode("latin-1") for x in orjson.loads(value)]
+    return f"{stream_id[0]}-{stream_id[1]}".encode("utf-8"), dict(
+        zip(flat[::2], flat[1::2])
+    )
+
+
+def _number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            try:
+                return float(value)
+            except ValueError:
+                return 0
+    return 0
+
+
+def _store_document(client, key, value, timeout, default_timeout, existed):
+    if int(timeout) > 0:
+        client.set(key, value, ex=int(timeout))
+    elif existed:
+        client.set(key, value, keepttl=True)
+    elif int(default_timeout) > 0:
+        client.set(key, value, ex=int(default_timeout))
+    else:
+        client.set(key, value)
+
+
+def _lua_equal(current, expected) -> bool:
+    # Lua compares tables by identity, booleans only with booleans and numbers as doubles
+    if isinstance(current, (dict, list)) or isinstance(expected, (dict, list)):
+        return False
+    if isinstance(current, bool) or isinstance(expected, bool):
+        return current is expected
+    if isinstance(current, (int, float)) and isinstance(expected, (int, float)):
+        return float(current) == float(expected)
+    return current == expected
+
+
+def _compare_and_set(client, keys, args):
+    field, expected, value, timeout = args
+    current = client.get(keys[0])
+    if current is None:
+        return 0
+    document = _document(current)
+    # A missing field is nil in Lua, which differs from the cjson.null of a null
+    if field not in document or not _lua_equal(document[field], orjson.loads(expected)):
+        return 0
+    _store_document(client, keys[0], value, timeout, 0, True)
+    return 1
+
+
+def _update_fields(client, keys, args):
+    fields, timeout, default_timeout = args
+    current = client.get(keys[0])
+    document = _document(current)
+    document.update(orjson.loads(fields))
+    encoded = orjson.dumps(document)
+    _store_document(
+        client, keys[0], encoded, timeout, default_timeout, current is not None
+    )
+    return encoded
+
+
+def _incr_with_ttl(client, keys, args):
+    amount, timeout = args
+    value = client.incrby(keys[0], int(amount))
+    if int(timeout) > 0 and client.ttl(keys[0]) == -1:
+        client.expire(keys[0], int(timeout))
+    return value
+
+
+def _incr_field_with_ttl(client, keys, args):
+    field, amount, timeout = args
+    current = client.get(keys[0])
+    document = _document(current)
+    value = _number(document.get(field)) + _number(amount)
+    document[field] = value
+    _store_document(
+        client, keys[0], orjson.dumps(document), 0, timeout, current is not None
+    )
+    return orjson.dumps(value)
+
+
+def _bucket_set(client, keys, args):
+    current = client.ttl(keys[0])
+    added = client.hset(keys[0], items=list(args[1:]))
+    ttl = int(args[0])
+    if ttl == 0:
+        client.persist(keys[0])
+    elif current == -2 or 0 <= current < ttl:
+        client.expire(keys[0], ttl)
+    return added
+
+
+def _set_job_status(client, keys, args):
+    job, status, timeout, register = args
+    previous = client.hget(keys[0], job)
+    if previous is None and _to_bytes(register) != b"1":
+        return 0
+    client.hset(keys[0], job, status)
+    if previous is not None:
+        client.hincrby(keys[1], previous, -1)
+    client.hincrby(keys[1], status, 1)
+    if int(timeout) > 0:
+        client.expire(keys[0], int(timeout))
+        client.expire(keys[1], int(timeout))
+    return 1
+
+
+def _flat_hash(client, key) -> list:
+    return [x for pair in client.hgetall(key).items() for x in pair]
+
+
+def _child_job_counts(client, keys, args):
+    return [client.hlen(keys[0]), *_flat_hash(client, keys[1])]
+
+
+def _append_job_event(client, keys, args):
+    event, maxlen, timeout = args
+    entry_id = client.xadd(keys[0], {"event": event}, maxlen=int(maxlen))
+    if int(timeout) > 0:
+        client.expire(keys[0], int(timeout))
+    return entry_id
+
+
+def _update_job_progress(client, keys, args):
+    fields, increments, timeout, maxlen = args
+    changed = {}
+    for field, value in orjson.loads(fields).items():
+        client.hset(keys[0], field, orjson.dumps(value))
+        changed[field] = value
+    for field, amount in orjson.loads(increments).items():
+        value = client.hincrbyfloat(keys[0], field, amount)
+        changed[field] = int(value) if value.is_integer() else value
+    if int(timeout) > 0:
+        client.expire(keys[0], int(timeout))
+    if int(maxlen) > 0 and changed:
+        client.xadd(
+            keys[1], {"event": orjson.dumps({"progress": changed})}, maxlen=int(maxlen)
+        )
+        if int(timeout) > 0:
+            client.expire(keys[1], int(timeout))
+    return _flat_hash(client, keys[0])
+
+
+# Python implementations of the scripts in scripts.SCRIPTS on the commands of LocalRedis,
+# by script name
+LOCAL_SCRIPTS = {
+    "compare_and_set": _compare_and_set,
+    "update_fields": _update_fields,
+    "incr_with_ttl": _incr_with_ttl,
+    "incr_field_with_ttl": _incr_field_with_ttl,
+    "bucket_set": _bucket_set,
+    "set_job_status": _set_job_status,
+    "child_job_counts": _child_job_counts,
+    "append_job_event": _append_job_event,
+    "update_job_progress": _update_job_progress,
+}
+
+_SCRIPT_NAMES = {source: name for name, source in SCRIPTS.items()}
+
+
+class LocalPipeline:
+    """Buffers commands and runs them in one store transaction on `execute`."""
+
+    def __init__(self, client: "LocalRedis"):
+        self._client = client
+        self._commands = []
+
+    def __getattr__(self, name):
+        command = getattr(self._client, name)
+
+        def queue_command(*args, **kwargs):
+            self._commands.append((command, args, kwargs))
+            return self
+
+        return queue_command
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.reset()
+
+    def __len__(self):
+        return len(self._commands)
+
+    def reset(self):
+        self._commands = []
+
+    def execute(self, raise_on_error: bool = True) -> list:
+        results = []
+        with self._client.store.transaction():
+            for command, args, kwargs in self._commands:
+                try:
+                    results.append(command(*args, **kwargs))
+                except ResponseError as e:
+                    if raise_on_error:
+                        self.reset()
+                        raise
+                    results.append(e)
+        self.reset()
+        return results
+
+
+class LocalScript:
+    """Runs the Python implementation of a known Lua script atomically."""
+
+    def __init__(self, client: "LocalRedis", script: str):
+        self._client = client
+        self.script = script
+        self.sha = hashlib.sha1(script.encode("utf-8")).hexdigest()
+        self._function = LOCAL_SCRIPTS.get(_SCRIPT_NAMES.get(script))
+
+    def __call__(self, keys=None, args=None, client=None):
+        if self._function is None:
+            raise ResponseError("Lua scripts are not supported by the local backends")
+        client = self._client if client is None else getattr(client, "sync", client)
+        with client.store.transaction():
+            return self._function(client, list(keys or []), list(args or []))
+
+
+class LocalLock:
+    """Lock with the acquire and release API of redis-py locks."""
+
+    def __init__(
+        self,
+        client: "LocalRedis",
+        name: str,
+        timeout: float | None = None,
+        sleep: float = 0.1,
+        blocking: bool = True,
+        blocking_timeout: float | None = None,
+    ):
+        self._client = client
+        self.name = name
+        self.timeout = timeout
+        self.sleep = sleep
+        self.blocking = blocking
+        self.blocking_timeout = blocking_timeout
+        self.token = None
+
+    def __enter__(self):
+        if self.acquire():
+            return self
+        raise LockError("Unable to acquire lock within the time specified")
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def acquire(
+        self, blocking: bool | None = None, blocking_timeout: float | None = None
+    ):
+        blocking = self.blocking if blocking is None else blocking
+        blocking_timeout = (
+            self.blocking_timeout if blocking_timeout is None else blocking_timeout
+        )
+        token = uuid.uuid4().hex.encode()
+        deadline = (
+            None if blocking_timeout is None else time.monotonic() + blocking_timeout
+        )
+        px = int(self.timeout * 1000) if self.timeout else None
+        while True:
+            if self._client.set(self.name, token, px=px, nx=True):
+                self.token = token
+                return True
+            if not blocking or (deadline is not None and time.monotonic() >= deadline):
+                return False
+            time.sleep(self.sleep)
+
+    def locked(self) -> bool:
+        return self._client.get(self.name) is not None
+
+    def owned(self) -> bool:
+        return self.token is not None and self._client.get(self.name) == self.token
+
+    def release(self):
+        token, self.token = self.token, None
+        if token is None:
+            raise LockError("Cannot release an unlocked lock")
+        with self._client.store.transaction():
+            if self._client.get(self.name) != token:
+                raise LockError("Cannot release a lock that's no longer owned")
+            self._client.delete(self.name)
+
+
+class LocalPubSub:
+    """In-process subscription with the polling API of redis-py PubSub."""
+
+    def __init__(self, client: "LocalRedis", ignore_subscribe_messages: bool = False):
+        self._client = client
+        self.ignore_subscribe_messages = ignore_subscribe_messages
+        self.channels = set()
+        self.patterns = set()
+        self._messages = queue.Queue()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def subscribed(self) -> bool:
+        return bool(self.channels or self.patterns)
+
+    def _deliver(self, message: dict):
+        self._messages.put(message)
+
+    def _subscription(self, kind: str, channel: str):
+        if not self.ignore_subscribe_messages:
+            self._messages.put(
+                {
+                    "type": kind,
+                    "pattern": None,
+                    "channel": _to_bytes(channel),
+                    "data": len(self.channels) + len(self.patterns),
+                }
+            )
+
+    def subscribe(self, *channels):
+        for channel in channels:
+            channel = _to_bytes(channel).decode("utf-8")
+            self.channels.add(channel)
+            self._client._subscribe(self)
+            self._subscription("subscribe", channel)
+
+    def psubscribe(self, *patterns):
+        for pattern in patterns:
+            pattern = _to_bytes(pattern).decode("utf-8")
+            self.patterns.add(pattern)
+            self._client._subscribe(self)
+            self._subscription("psubscribe", pattern)
+
+    def unsubscribe(self, *channels):
+        for channel in channels or list(self.channels):
+            channel = _to_bytes(channel).decode("utf-8")
+            self.channels.discard(channel)
+            self._subscription("unsubscribe", channel)
+
+    def punsubscribe(self, *patterns):
+        for pattern in patterns or list(self.patterns):
+            pattern = _to_bytes(pattern).decode("utf-8")
+            self.patterns.discard(pattern)
+            self._subscription("punsubscribe", pattern)
+
+    def get_message(
+        self, ignore_subscribe_messages: bool = False, timeout: float = 0.0
+    ):
+        try:
+            if timeout is None or timeout > 0:
+                return self._messages.get(timeout=timeout)
+            return self._messages.get_nowait()
+        except queue.Empty:
+            return None
+
+    def listen(self):
+        while self.subscribed:
+            message = self.get_message(timeout=1.0)
+            if message is not None:
+                yield message
+
+    def close(self):
+        self.channels.clear()
+        self.patterns.clear()
+        self._client._unsubscribe(self)
+
+    reset = close
+
+
+class LocalRedis:
+    """Embedded stand-in for a Redis server
+
+    Implements the string, hash, set, stream, key, expiry, pipeline, lock, pub/sub and
+    script commands used by the caches on a LocalStore, so services and benchmarks can run without
+    Redis. Clients are looked up by URL, so every client of one URL and db in a process
+    shares the same data; pub/sub messages reach subscribers of the same process only.
+
+    Attributes:
+        store (LocalStore): The storage.
+    """
+
+    _clients = {}
+    _clients_lock = threading.Lock()
+
+    def __init__(self, store: LocalStore):
+        self.store = store
+        self._subscribers = set()
+        self._subscribers_lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url: str, db: int = 0) -> "LocalRedis":
+        """
+        Get the client registered for a local backend URL and db, creating it on first use.
+
+        ``memory://<name>`` keeps the data in the process. ``sqlite:///<path>`` keeps it in an
+        SQLite file, with a table per db. The ``sweep_interval`` query parameter sets the seconds
+        between expiration sweeps.
+
+        Args:
+            url (str): The backend URL.
+            db (int, optional): The database number. Defaults to 0.
+
+        Returns:
+            LocalRedis: The shared client.
+        """
+        parsed = urlparse(url)
+        location = parsed.netloc + parsed.path
+        options = parse_qs(parsed.query)
+        sweep_interval = float(options.get("sweep_interval", ["60"])[0])
+        key = (parsed.scheme, location, int(db))
+        with cls._clients_lock:
+            client = cls._clients.get(key)
+            if client is None:
+                if parsed.scheme == "sqlite":
+                    store = SQLiteStore(
+                        location, table=f"db{int(db)}", sweep_interval=sweep_interval
+                    )
+                else:
+                    store = MemoryStore(sweep_interval=sweep_interval)
+                client = cls._clients[key] = cls(store)
+            return client
+
+    @classmethod
+    def reset(cls):
+        """
+        Close and drop all registered clients together with in-memory data.
+        """
+        with cls._clients_lock:
+            clients = list(cls._clients.values())
+            cls._clients.clear()
+        JobNotifier.discard(clients)
+        for client in clients:
+            client.store.close()
+
+    def _expires_at(self, ex=None, px=None, exat=None, pxat=None) -> float | None:
+        if ex is not None:
+            return time.time() + float(ex)
+        if px is not None:
+            return time.time() + float(px) / 1000
+        if exat is not None:
+            return float(exat)
+        if pxat is not None:
+            return float(pxat) / 1000
+        return None
+
+    def _entry(self, name: str, kind: str):
+        entry = self.store.get_entry(name)
+        if entry is not None and entry[2] != kind:
+            raise ResponseError(WRONGTYPE)
+        return entry
+
+    def _create(self, name: str, kind: str, value: bytes = b""):
+        # Hashes, sets and streams are created by their first item and never expire at first
+        if self._entry(name, kind) is None:
+            self.store.set(name, value, None, kind)
+
+    def _drop_if_empty(self, name: str):
+        # Redis deletes hashes and sets when their last item is removed
+        if not self.store.count_items(name):
+            self.store.delete(name)
+
+    def ping(self) -> bool:
+        return True
+
+    def close(self):
+        pass
+
+    def get(self, name: str) -> bytes | None:
+        entry = self._entry(name, STRING)
+        return None if entry is None else entry[0]
+
+    def set(
+        self,
+        name: str,
+        value,
+        ex=None,
+        px=None,
+        nx: bool = False,
+        xx: bool = False,
+        keepttl: bool = False,
+        get: bool = False,
+        exat=None,
+        pxat=None,
+    ):
+        value = _to_bytes(value)
+        with self.store.transaction():
+            entry = self._entry(name, STRING) if get else self.store.get_entry(name)
+            if (nx and entry is not None) or (xx and entry is None):
+                return entry[0] if get and entry is not None else None
+            expires_at = self._expires_at(ex, px, exat, pxat)
+            if keepttl and entry is not None:
+                expires_at = entry[1]
+            if entry is not None and entry[2] != STRING:
+                self.store.delete(name)
+            self.store.set(name, value, expires_at)
+        if get:
+            return None if entry is None else entry[0]
+        return True
+
+    def setex(self, name: str, time_: int, value):
+        return self.set(name, value, ex=time_)
+
+    def mget(self, keys, *args) -> list:
+        keys = [keys] if isinstance(keys, (str, bytes)) else list(keys)
+        with self.store.transaction():
+            entries = [self.store.get_entry(key) for key in [*keys, *args]]
+            return [x[0] if x is not None and x[2] == STRING else None for x in entries]
+
+    def delete(self, *names) -> int:
+        return self.store.delete(*names)
+
+    unlink = delete
+
+    def exists(self, *names) -> int:
+        with self.store.transaction():
+            return sum(1 for name in names if self.store.get_entry(name) is not None)
+
+    def incrby(self, name: str, amount: int = 1) -> int:
+        with self.store.transaction():
+            entry = self._entry(name, STRING)
+            try:
+                value = int(entry[0]) + amount if entry is not None else amount
+            except ValueError:
+                raise ResponseError("value is not an integer or out of range")
+            self.store.set(name, _to_bytes(value), None if entry is None else entry[1])
+            return value
+
+    incr = incrby
+
+    def ttl(self, name: str) -> int:
+        entry = self.store.get_entry(name)
+        if entry is None:
+            return -2
+        if entry[1] is None:
+            return -1
+        return max(0, math.ceil(entry[1] - time.time()))
+
+    def pttl(self, name: str) -> int:
+        entry = self.store.get_entry(name)
+        if entry is None:
+            return -2
+        if entry[1] is None:
+            return -1
+        return max(0, math.ceil((entry[1] - time.time()) * 1000))
+
+    def expire(
+        self,
+        name: str,
+        time_,
+        nx: bool = False,
+        xx: bool = False,
+        gt: bool = False,
+        lt: bool = False,
+    ) -> bool:
+        with self.store.transaction():
+            entry = self.store.get_entry(name)
+            if entry is None:
+                return False
+            expires_at = self._expires_at(ex=time_)
+            current = entry[1]
+            if (nx and current is not None) or (xx and current is None):
+                return False
+            if gt and (current is None or expires_at <= current):
+                return False
+            if lt and current is not None and expires_at >= current:
+                return False
+            self.store.set(name, entry[0], expires_at, entry[2])
+            return True
+
+    def persist(self, name: str) -> bool:
+        with self.store.transaction():
+            entry = self.store.get_entry(name)
+            if entry is None or entry[1] is None:
+                return False
+            self.store.set(name, entry[0], None, entry[2])
+            return True
+
+    def type(self, name: str) -> bytes:
+        entry = self.store.get_entry(name)
+        return b"none" if entry is None else entry[2].encode("utf-8")
+
+    def hset(
+        self, name: str, key=None, value=None, mapping: dict | None = None, items=None
+    ) -> int:
+        pairs = []
+        if key is not None:
+            pairs.append((key, value))
+        if mapping:
+            pairs.extend(mapping.items())
+        if items:
+            pairs.extend(zip(items[::2], items[1::2]))
+        if not pairs:
+            raise ResponseError("wrong number of arguments for 'hset' command")
+        with self.store.transaction():
+            self._create(name, HASH)
+            return sum(
+                self.store.set_item(
+                    name, _to_bytes(field).decode("utf-8"), _to_bytes(value)
+                )
+                for field, value in pairs
+            )
+
+    def hget(self, name: str, key) -> bytes | None:
+        with self.store.transaction():
+            if self._entry(name, HASH) is None:
+                return None
+            return self.store.get_item(name, _to_bytes(key).decode("utf-8"))
+
+    def hmget(self, name: str, keys, *args) -> list:
+        keys = [keys] if isinstance(keys, (str, bytes)) else list(keys)
+        with self.store.transaction():
+            if self._entry(name, HASH) is None:
+                return [None for _ in [*keys, *args]]
+            return [
+                self.store.get_item(name, _to_bytes(key).decode("utf-8"))
+                for key in [*keys, *args]
+            ]
+
+    def hgetall(self, name: str) -> dict:
+        with self.store.transaction():
+            if self._entry(name, HASH) is None:
+                return {}
+            return {
+                field.encode("utf-8"): value for field, value in self.store.items(name)
+            }
+
+    def hdel(self, name: str, *keys) -> int:
+        with self.store.transaction():
+            if self._entry(name, HASH) is None:
+                return 0
+            removed = sum(
+                self.store.delete_item(name, _to_bytes(key).decode("utf-8"))
+                for key in keys
+            )
+            self._drop_if_empty(name)
+            return removed
+
+    def hlen(self, name: str) -> int:
+        with self.store.transaction():
+            return (
+                0 if self._entry(name, HASH) is None else self.store.count_items(name)
+            )
+
+    def hexists(self, name: str, key) -> bool:
+        return self.hget(name, key) is not None
+
+    def hincrby(self, name: str, key, amount: int = 1) -> int:
+        with self.store.transaction():
+            current = self.hget(name, key)
+            try:
+                value = (
+                    int(current) + int(amount) if current is not None else int(amount)
+                )
+            except ValueError:
+                raise ResponseError("hash value is not an integer")
+            self.hset(name, key, value)
+            return value
+
+    def hincrbyfloat(self, name: str, key, amount: float = 1.0) -> float:
+        with self.store.transaction():
+            current = self.hget(name, key)
+            try:
+                value = (
+                    float(current) + float(amount)
+                    if current is not None
+                    else float(amount)
+                )
+            except ValueError:
+                raise ResponseError("hash value is not a float")
+            self.hset(name, key, _float_bytes(value))
+            return value
+
+    def sadd(self, name: str, *values) -> int:
+        with self.store.transaction():
+            self._create(name, SET)
+            return sum(
+                self.store.set_item(name, _to_bytes(value).decode("utf-8"), b"")
+                for value in values
+            )
+
+    def srem(self, name: str, *values) -> int:
+        with self.store.transaction():
+            if self._entry(name, SET) is None:
+                return 0
+            removed = sum(
+                self.store.delete_item(name, _to_bytes(value).decode("utf-8"))
+                for value in values
+            )
+            self._drop_if_empty(name)
+            return removed
+
+    def sismember(self, name: str, value) -> bool:
+        with self.store.transaction():
+            if self._entry(name, SET) is None:
+                return False
+            return (
+                self.store.get_item(name, _to_bytes(value).decode("utf-8")) is not None
+            )
+
+    def scard(self, name: str) -> int:
+        with self.store.transaction():
+            return 0 if self._entry(name, SET) is None else self.store.count_items(name)
+
+    def smembers(self, name: str) -> set:
+        with self.store.transaction():
+            if self._entry(name, SET) is None:
+                return set()
+            return {member.encode("utf-8") for member, _ in self.store.items(name)}
+
+    def xadd(
+        self,
+        name: str,
+        fields: dict,
+        id="*",
+        maxlen: int | None = None,
+        approximate: bool = True,
+        nomkstream: bool = False,
+        **_,
+    ) -> bytes | None:
+        """
+        Append a stream entry. Streams keep their last ID and length in the entry value,
+        so appending and trimming touch only the affected items.
+        """
+        with self.store.transaction():
+            entry = self._entry(name, STREAM)
+            if entry is None and nomkstream:
+                return None
+            meta = (
+                orjson.loads(entry[0])
+                if entry is not None
+                else {"last": "0-0", "length": 0}
+            )
+            last = _stream_id(meta["last"])
+            if _to_bytes(id) == b"*":
+                ms = int(time.time() * 1000)
+                stream_id = (ms, 0) if ms > last[0] else (last[0], last[1] + 1)
+            else:
+                stream_id = _stream_id(id)
+                if stream_id <= last:
+                    raise ResponseError(
+                        "The ID specified in XADD is equal or smaller than the target stream top item"
+                    )
+            self.store.set_item(name, _stream_member(stream_id), _stream_fields(fields))
+            length = meta["length"] + 1
+            if maxlen is not None and length > int(maxlen):
+                self.store.trim_items(name, length - int(maxlen))
+                length = int(maxlen)
+            entry_id = f"{stream_id[0]}-{stream_id[1]}"
+            self.store.set(
+                name,
+                orjson.dumps({"last": entry_id, "length": length}),
+                None if entry is None else entry[1],
+                STREAM,
+            )
+            return entry_id.encode("utf-8")
+
+    def xlen(self, name: str) -> int:
+        with self.store.transaction():
+            entry = self._entry(name, STREAM)
+            return 0 if entry is None else orjson.loads(entry[0])["length"]
+
+    def xrange(self, name: str, min="-", max="+", count: int | None = None) -> list:
+        low, low_exclusive = _stream_bound(min, True)
+        high, high_exclusive = _stream_bound(max, False)
+        result = []
+        with self.store.transaction():
+            if self._entry(name, STREAM) is None:
+                return result
+            for member, value in self.store.items(name):
+                stream_id = _stream_id(member)
+                if stream_id < low or (low_exclusive and stream_id == low):
+                    continue
+                if stream_id > high or (high_exclusive and stream_id == high):
+                    break
+                result.append(_stream_entry(member, value))
+                if count is not None and len(result) >= int(count):
+                    break
+        return result
+
+    def keys(self, pattern: str = "*") -> list[bytes]:
+        return [
+            key.encode("utf-8")
+            for key in self.store.keys()
+            if fnmatch.fnmatchcase(key, pattern)
+        ]
+
+    def scan_iter(self, match: str | None = None, count: int | None = None, _type=None):
+        yield from self.keys(match or "*")
+
+    def flushdb(self) -> bool:
+        self.store.clear()
+        return True
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> LocalPipeline:
+        return LocalPipeline(self)
+
+    def register_script(self, script: str) -> LocalScript:
+        return LocalScript(self, script)
+
+    def script_load(self, script: str) -> str:
+        return LocalScript(self, script).sha
+
+    def lock(
+        self,
+        name: str,
+        timeout: float | None = None,
+        sleep: float = 0.1,
+        blocking: bool = True,
+        blocking_timeout: float | None = None,
+        **_,
+    ) -> LocalLock:
+        return LocalLock(self, name, timeout, sleep, blocking, blocking_timeout)
+
+    def pubsub(self, ignore_subscribe_messages: bool = False, **_) -> LocalPubSub:
+        return LocalPubSub(self, ignore_subscribe_messages)
+
+    def _subscribe(self, pubsub: LocalPubSub):
+        with self._subscribers_lock:
+            self._subscribers.add(pubsub)
+
+    def _unsubscribe(self, pubsub: LocalPubSub):
+        with self._subscribers_lock:
+            self._subscribers.discard(pubsub)
+
+    def publish(self, channel: str, message) -> int:
+        channel = _to_bytes(channel).decode("utf-8")
+        data = _to_bytes(message)
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers)
+        received = 0
+        for pubsub in subscribers:
+            if channel in pubsub.channels:
+                pubsub._deliver(
+                    {
+                        "type": "message",
+                        "pattern": None,
+                        "channel": channel.encode(),
+                        "data": data,
+                    }
+                )
+                received += 1
+            for pattern in list(pubsub.patterns):
+                if fnmatch.fnmatchcase(channel, pattern):
+                    pubsub._deliver(
+                        {
+                            "type": "pmessage",
+                            "pattern": pattern.encode(),
+                            "channel": channel.encode(),
+                            "data": data,
+                        }
+                    )
+                    received += 1
+        return received
+
+
+class AsyncLocalPipeline:
+    def __init__(self, client: LocalRedis):
+        self._pipeline = LocalPipeline(client)
+
+    def __getattr__(self, name):
+        command = getattr(self._pipeline, name)
+
+        def queue_command(*args, **kwargs):
+            command(*args, **kwargs)
+            return self
+
+        return queue_command
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self._pipeline.reset()
+
+    def __len__(self):
+        return len(self._pipeline)
+
+    async def execute(self, raise_on_error: bool = True) -> list:
+        return self._pipeline.execute(raise_on_error)
+
+
+class AsyncLocalScript:
+    def __init__(self, client: LocalRedis, script: str):
+        self._script = LocalScript(client, script)
+        self.sha = self._script.sha
+
+    async def __call__(self, keys=None, args=None, client=None):
+        return self._script(keys, args, client)
+
+
+class AsyncLocalLock:
+    def __init__(self, lock: LocalLock):
+        self._lock = lock
+
+    async def __aenter__(self):
+        if await self.acquire():
+            return self
+        raise LockError("Unable to acquire lock within the time specified")
+
+    async def __aexit__(self, *exc):
+        await self.release()
+
+    async def acquire(
+        self, blocking: bool | None = None, blocking_timeout: float | None = None
+    ):
+        lock = self._lock
+        blocking = lock.blocking if blocking is None else blocking
+        blocking_timeout = (
+            lock.blocking_timeout if blocking_timeout is None else blocking_timeout
+        )
+        deadline = (
+            None if blocking_timeout is None else time.monotonic() + blocking_timeout
+        )
+        while True:
+            if lock.acquire(blocking=False):
+                return True
+            if not blocking or (deadline is not None and time.monotonic() >= deadline):
+                return False
+            await asyncio.sleep(lock.sleep)
+
+    async def locked(self) -> bool:
+        return self._lock.locked()
+
+    async def owned(self) -> bool:
+        return self._lock.owned()
+
+    async def release(self):
+        self._lock.release()
+
+
+class AsyncLocalPubSub:
+    def __init__(self, pubsub: LocalPubSub):
+        self._pubsub = pubsub
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    @property
+    def subscribed(self) -> bool:
+        return self._pubsub.subscribed
+
+    async def subscribe(self, *channels):
+        self._pubsub.subscribe(*channels)
+
+    async def psubscribe(self, *patterns):
+        self._pubsub.psubscribe(*patterns)
+
+    async def unsubscribe(self, *channels):
+        self._pubsub.unsubscribe(*channels)
+
+    async def punsubscribe(self, *patterns):
+        self._pubsub.punsubscribe(*patterns)
+
+    async def get_message(
+        self, ignore_subscribe_messages: bool = False, timeout: float = 0.0
+    ):
+        deadline = time.monotonic() + (timeout or 0)
+        while True:
+            message = self._pubsub.get_message()
+            if message is not None or time.monotonic() >= deadline:
+                return message
+            await asyncio.sleep(0.01)
+
+    async def listen(self):
+        while self.subscribed:
+            message = await self.get_message(timeout=1.0)
+            if message is not None:
+                yield message
+
+    async def aclose(self):
+        self._pubsub.close()
+
+    close = aclose
+    reset = aclose
+
+
+class AsyncLocalRedis:
+    """asyncio interface of a LocalRedis
+
+    Commands run directly on the store, which involves no network round trip.
+
+    Attributes:
+        sync (LocalRedis): The wrapped client.
+    """
+
+    def __init__(self, client: LocalRedis):
+        self.sync = client
+
+    @property
+    def store(self) -> LocalStore:
+        return self.sync.store
+
+    def __getattr__(self, name):
+        command = getattr(self.sync, name)
+
+        async def run(*args, **kwargs):
+            return command(*args, **kwargs)
+
+        return run
+
+    async def scan_iter(
+        self, match: str | None = None, count: int | None = None, _type=None
+    ):
+        for key in self.sync.keys(match or "*"):
+            yield key
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> AsyncLocalPipeline:
+        return AsyncLocalPipeline(self.sync)
+
+    def register_script(self, script: str) -> AsyncLocalScript:
+        return AsyncLocalScript(self.sync, script)
+
+    def lock(self, name: str, *args, **kwargs) -> AsyncLocalLock:
+        return AsyncLocalLock(self.sync.lock(name, *args, **kwargs))
+
+    def pubsub(self, ignore_subscribe_messages: bool = False, **_) -> AsyncLocalPubSub:
+        return AsyncLocalPubSub(self.sync.pubsub(ignore_subscribe_messages))
+
+    async def aclose(self, *args, **kwargs):
+        pass
@@ -0,0 +1,430 @@
+import logging
+import os
+import sqlite3
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+STRING = "string"
+HASH = "hash"
+SET = "set"
+STREAM = "stream"
+
+
+class LocalStore:
+    """Thread-safe key value storage with expiration behind LocalRedis
+
+    Every entry has a kind: strings keep their value in the entry, while hashes, sets
+    and streams keep their fields, members or stream entries as separate items of the key,
+    so they are changed one item at a time. Expired entries are never returned and are
+    removed together with their items by a background sweeper every `sweep_interval`
+    seconds. Compound operations run inside `transaction`.
+
+    Attributes:
+        sweep_interval (float | None): Seconds between sweeps, None to sweep only on demand.
+    """
+
+    def __init__(self, sweep_interval: float | None = 60):
+        self.sweep_interval = sweep_interval
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._stop = threading.Event()
+        self._thread = None
+        if sweep_interval:
+            self._thread = threading.Thread(
+                target=self._sweep_loop,
+                name=f"{type(self).__name__}-sweeper",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _sweep_loop(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                removed = self.sweep()
+                if removed:
+                    logger.debug(f"Swept {removed} expired entries")
+            except Exception as e:
+                logger.warning(f"Local store sweep failed: {e}")
+
+    def _begin(self):
+        pass
+
+    def _commit(self):
+        pass
+
+    def _rollback(self):
+        pass
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run the enclosed operations atomically. Transactions can be nested.
+        """
+        with self._lock:
+            self._depth += 1
+            try:
+                if self._depth == 1:
+                    self._begin()
+                yield self
+                if self._depth == 1:
+                    self._commit()
+            except BaseException:
+                if self._depth == 1:
+                    self._rollback()
+                raise
+            finally:
+                self._depth -= 1
+
+    def _read(self, key: str) -> tuple[bytes, float | None, str] | None:
+        raise NotImplementedError
+
+    def _write(self, key: str, value: bytes, expires_at: float | None, kind: str):
+        raise NotImplementedError
+
+    def _remove(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def _scan(self, now: float) -> list[str]:
+        raise NotImplementedError
+
+    def _purge(self, now: float) -> int:
+        raise NotImplementedError
+
+    def _clear(self):
+        raise NotImplementedError
+
+    def _read_item(self, key: str, member: str) -> bytes | None:
+        raise NotImplementedError
+
+    def _write_item(self, key: str, member: str, value: bytes) -> bool:
+        raise NotImplementedError
+
+    def _remove_item(self, key: str, member: str) -> bool:
+        raise NotImplementedError
+
+    def _scan_items(self, key: str) -> list[tuple[str, bytes]]:
+        raise NotImplementedError
+
+    def _count_items(self, key: str) -> int:
+        raise NotImplementedError
+
+    def _trim_items(self, key: str, count: int):
+        raise NotImplementedError
+
+    def get_entry(self, key: str) -> tuple[bytes, float | None, str] | None:
+        """
+        Get a live value together with its expiry as unix time, None when it never expires,
+        and its kind.
+        """
+        with self.transaction():
+            entry = self._read(key)
+            if entry is not None and entry[1] is not None and entry[1] <= time.time():
+                self._remove(key)
+                return None
+            return entry
+
+    def get(self, key: str) -> bytes | None:
+        entry = self.get_entry(key)
+        return None if entry is None else entry[0]
+
+    def set(
+        self,
+        key: str,
+        value: bytes,
+        expires_at: float | None = None,
+        kind: str = STRING,
+    ):
+        with self.transaction():
+            self._write(key, value, expires_at, kind)
+
+    def delete(self, *keys: str) -> int:
+        with self.transaction():
+            return sum(
+                1
+                for key in keys
+                if self.get_entry(key) is not None and self._remove(key)
+            )
+
+    def keys(self) -> list[str]:
+        with self.transaction():
+            return self._scan(time.time())
+
+    def sweep(self) -> int:
+        """
+        Remove expired entries.
+
+        Returns:
+            int: Number of removed entries.
+        """
+        with self.transaction():
+            return self._purge(time.time())
+
+    def clear(self):
+        with self.transaction():
+            self._clear()
+
+    def get_item(self, key: str, member: str) -> bytes | None:
+        """
+        Get an item of a key. Items are not checked for expiry, read the entry first.
+        """
+        with self.transaction():
+            return self._read_item(key, member)
+
+    def set_item(self, key: str, member: str, value: bytes) -> bool:
+        """
+        Set an item of a key.
+
+        Returns:
+            bool: Whether the item is new.
+        """
+        with self.transaction():
+            return self._write_item(key, member, value)
+
+    def delete_item(self, key: str, member: str) -> bool:
+        with self.transaction():
+            return self._remove_item(key, member)
+
+    def items(self, key: str) -> list[tuple[str, bytes]]:
+        """
+        Get the items of a key, ordered by member for SQLite and by insertion in memory.
+        """
+        with self.transaction():
+            return self._scan_items(key)
+
+    def count_items(self, key: str) -> int:
+        with self.transaction():
+            return self._count_items(key)
+
+    def trim_items(self, key: str, count: int):
+        """
+        Remove the first `count` items of a key, e.g. the oldest entries of a stream.
+        """
+        with self.transaction():
+            self._trim_items(key, count)
+
+    def close(self):
+        self._stop.set()
+
+
+class MemoryStore(LocalStore):
+    """Entries kept in a dict of the process, items in a dict per key"""
+
+    def __init__(self, sweep_interval: float | None = 60):
+        self._data = {}
+        self._items = {}
+        super().__init__(sweep_interval)
+
+    def _read(self, key):
+        return self._data.get(key)
+
+    def _write(self, key, value, expires_at, kind):
+        self._data[key] = (value, expires_at, kind)
+
+    def _remove(self, key):
+        self._items.pop(key, None)
+        return self._data.pop(key, None) is not None
+
+    def _scan(self, now):
+        return [
+            key
+            for key, (_, expires_at, _) in self._data.items()
+            if expires_at is None or expires_at > now
+        ]
+
+    def _purge(self, now):
+        expired = [
+            key
+            for key, (_, expires_at, _) in self._data.items()
+            if expires_at is not None and expires_at <= now
+        ]
+        for key in expired:
+            self._remove(key)
+        return len(expired)
+
+    def _clear(self):
+        self._data.clear()
+        self._items.clear()
+
+    def _read_item(self, key, member):
+        return self._items.get(key, {}).get(member)
+
+    def _write_item(self, key, member, value):
+        items = self._items.setdefault(key, {})
+        added = member not in items
+        items[member] = value
+        return added
+
+    def _remove_item(self, key, member):
+        items = self._items.get(key)
+        if items is None or member not in items:
+            return False
+        del items[member]
+        if not items:
+            del self._items[key]
+        return True
+
+    def _scan_items(self, key):
+        return list(self._items.get(key, {}).items())
+
+    def _count_items(self, key):
+        return len(self._items.get(key, ()))
+
+    def _trim_items(self, key, count):
+        items = self._items.get(key, {})
+        for member in list(itertools.islice(items, count)):
+            del items[member]
+
+
+class SQLiteStore(LocalStore):
+    """Entries persisted in an SQLite database file
+
+    The file survives restarts and can be shared by the processes of one host;
+    write-ahead logging lets readers proceed while another process writes.
+
+    Attributes:
+        path (str): The database file.
+        table (str): The table holding the entries, items are held in `<table>_items`.
+    """
+
+    def __init__(
+        self, path: str, table: str = "entries", sweep_interval: float | None = 60
+    ):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name {table}")
+        self.path = path
+        self.table = table
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL, "
+            f"kind TEXT NOT NULL DEFAULT '{STRING}')"
+        )
+        columns = [
+            row[1] for row in self._connection.execute(f"PRAGMA table_info({table})")
+        ]
+        if "kind" not in columns:
+            # Tables created before hashes, sets and streams were supported
+            self._connection.execute(
+                f"ALTER TABLE {table} ADD COLUMN kind TEXT NOT NULL DEFAULT '{STRING}'"
+            )
+        self._connection.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_expires_at ON {table} (expires_at)"
+        )
+        self._connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {table}_items "
+            "(key TEXT NOT NULL, member TEXT NOT NULL, value BLOB NOT NULL, "
+            "PRIMARY KEY (key, member))"
+        )
+        super().__init__(sweep_interval)
+
+    def _begin(self):
+        self._connection.execute("BEGIN IMMEDIATE")
+
+    def _commit(self):
+        self._connection.execute("COMMIT")
+
+    def _rollback(self):
+        self._connection.execute("ROLLBACK")
+
+    def _read(self, key):
+        row = self._connection.execute(
+            f"SELECT value, expires_at, kind FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone()
+        return None if row is None else (bytes(row[0]), row[1], row[2])
+
+    def _write(self, key, value, expires_at, kind):
+        self._connection.execute(
+            f"INSERT INTO {self.table} (key, value, expires_at, kind) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, "
+            "expires_at = excluded.expires_at, kind = excluded.kind",
+            (key, value, expires_at, kind),
+        )
+
+    def _remove(self, key):
+        self._connection.execute(
+            f"DELETE FROM {self.table}_items WHERE key = ?", (key,)
+        )
+        cursor = self._connection.execute(
+            f"DELETE FROM {self.table} WHERE key = ?", (key,)
+        )
+        return cursor.rowcount > 0
+
+    def _scan(self, now):
+        rows = self._connection.execute(
+            f"SELECT key FROM {self.table} WHERE expires_at IS NULL OR expires_at > ?",
+            (now,),
+        )
+        return [row[0] for row in rows]
+
+    def _purge(self, now):
+        self._connection.execute(
+            f"DELETE FROM {self.table}_items WHERE key IN "
+            f"(SELECT key FROM {self.table} WHERE expires_at <= ?)",
+            (now,),
+        )
+        cursor = self._connection.execute(
+            f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,)
+        )
+        return cursor.rowcount
+
+    def _clear(self):
+        self._connection.execute(f"DELETE FROM {self.table}_items")
+        self._connection.execute(f"DELETE FROM {self.table}")
+
+    def _read_item(self, key, member):
+        row = self._connection.execute(
+            f"SELECT value FROM {self.table}_items WHERE key = ? AND member = ?",
+            (key, member),
+        ).fetchone()
+        return None if row is None else bytes(row[0])
+
+    def _write_item(self, key, member, value):
+        added = self._read_item(key, member) is None
+        self._connection.execute(
+            f"INSERT INTO {self.table}_items (key, member, value) VALUES (?, ?, ?) "
+            "ON CONFLICT (key, member) DO UPDATE SET value = excluded.value",
+            (key, member, value),
+        )
+        return added
+
+    def _remove_item(self, key, member):
+        cursor = self._connection.execute(
+            f"DELETE FROM {self.table}_items WHERE key = ? AND member = ?",
+            (key, member),
+        )
+        return cursor.rowcount > 0
+
+    def _scan_items(self, key):
+        rows = self._connection.execute(
+            f"SELECT member, value FROM {self.table}_items WHERE key = ? ORDER BY member",
+            (key,),
+        )
+        return [(row[0], bytes(row[1])) for row in rows]
+
+    def _count_items(self, key):
+        row = self._connection.execute(
+            f"SELECT COUNT(*) FROM {self.table}_items WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0]
+
+    def _trim_items(self, key, count):
+        self._connection.execute(
+            f"DELETE FROM {self.table}_items WHERE key = ? AND member IN "
+            f"(SELECT member FROM {self.table}_items WHERE key = ? ORDER BY member LIMIT ?)",
+            (key, key, count),
+        )
+
+    def close(self):
+        super().close()
+        with self._lock:
+            self._connection.close()
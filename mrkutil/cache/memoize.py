@@ -0,0 +1,324 @@
+import functools
+import hashlib
+import inspect
+import logging
+import math
+
+import orjson
+import redis
+
+from mrkutil.base import BaseHandler
+from mrkutil.exception import HandlerTimeoutException, ServiceException
+from .base_redis import RedisBase, AsyncRedisBase
+from .lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+def is_handler_process(func) -> bool:
+    """
+    Check whether a function is a handler ``process(self, data, corr_id)`` method.
+    """
+    parameters = list(inspect.signature(func).parameters)
+    return func.__name__ == "process" and parameters[:3] == ["self", "data", "corr_id"]
+
+
+def _stable_default(value):
+    # The default repr contains the object address, which differs between calls and processes
+    if (
+        type(value).__repr__ is object.__repr__
+        and type(value).__str__ is object.__str__
+    ):
+        raise TypeError(f"Type is not memoizable: {type(value).__name__}")
+    return str(value)
+
+
+def request_key(
+    args: tuple, kwargs: dict, handler: bool = False
+) -> tuple[str | None, str]:
+    """
+    Build the memoization key of a call.
+
+    Handler calls, ``process(self, data, corr_id)``, are keyed by the method and
+    the ``request`` payload only, so the correlation ID does not defeat the cache.
+    Other calls are keyed by all their arguments.
+
+    Args:
+        args (tuple): Positional arguments of the call.
+        kwargs (dict): Keyword arguments of the call.
+        handler (bool, optional): Whether the call is a handler process call. Defaults to False.
+
+    Returns:
+        tuple[str | None, str]: The handler method, if any, and the hex digest of the call.
+
+    Raises:
+        TypeError: If an argument has no stable representation, e.g. an object
+            with the default repr.
+    """
+    method = None
+    payload = [args, kwargs]
+    if handler:
+        if args and isinstance(args[0], BaseHandler):
+            args = args[1:]
+        data = args[0] if args else kwargs.get("data")
+        if isinstance(data, dict) and "method" in data:
+            method = data["method"]
+            payload = [method, data.get("request", data)]
+    canonical = orjson.dumps(
+        payload,
+        option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+        default=_stable_default,
+    )
+    return method, hashlib.blake2b(canonical, digest_size=16).hexdigest()
+
+
+class Memoizer:
+    """
+    Caches results of a function in process and, optionally, in Redis.
+
+    Used through the `memoize` decorator.
+
+    Args:
+        func (Callable): The memoized function or coroutine function.
+        ttl (float | None): Time to live of cached results in seconds.
+        maxsize (int): Number of results kept in process.
+        redis_cache (RedisBase | AsyncRedisBase, optional): Shared tier, AsyncRedisBase for coroutines.
+        method_ttls (dict[str, float], optional): Time to live per handler method.
+        error_ttl (float, optional): Time to live of cached ServiceException results.
+
+    A time to live of 0 disables caching of the matching results. Redis keeps results
+    for whole seconds, rounding the time to live up.
+    """
+
+    def __init__(
+        self,
+        func,
+        ttl: float | None = 300,
+        maxsize: int = 1024,
+        redis_cache: RedisBase | AsyncRedisBase | None = None,
+        method_ttls: dict[str, float] | None = None,
+        error_ttl: float | None = None,
+    ):
+        self.func = func
+        self.handler = is_handler_process(func)
+        self.namespace = f"{func.__module__}.{func.__qualname__}"
+        self.ttl = ttl
+        self.method_ttls = method_ttls or {}
+        self.error_ttl = error_ttl
+        self.local = LRUCache(maxsize=maxsize)
+        self.redis_cache = redis_cache
+
+    def _redis_key(self, digest: str) -> str:
+        return f"memo_{self.namespace}_{digest}"
+
+    def _entry_ttl(self, method: str | None, entry: dict) -> float | None:
+        if "error" in entry:
+            return self.error_ttl
+        return self.method_ttls.get(method, self.ttl)
+
+    @staticmethod
+    def _unwrap(entry: dict):
+        if "error" in entry:
+            raise ServiceException(**entry["error"])
+        return entry["result"]
+
+    def _should_cache_error(self, e: ServiceException) -> bool:
+        # Timeouts and server errors are transient, only client errors are cached
+        return (
+            self.error_ttl is not None
+            and not isinstance(e, HandlerTimeoutException)
+            and e.code < 500
+        )
+
+    @staticmethod
+    def _error_entry(e: ServiceException) -> dict:
+        return {"error": {"message": e.message, "errors": e.errors, "code": e.code}}
+
+    @staticmethod
+    def _redis_timeout(ttl: float | None) -> int:
+        # Redis expiry is set in whole seconds, 0 stores the result without expiry
+        return math.ceil(ttl) if ttl else 0
+
+    @staticmethod
+    def _redis_entry(data) -> dict | None:
+        return data if isinstance(data, dict) else None
+
+    def _redis_get(self, digest: str):
+        try:
+            data = self.redis_cache.get(self._redis_key(digest))
+        except redis.RedisError as e:
+            logger.warning(f"Memoize redis read failed: {e}")
+            return None
+        return self._redis_entry(data)
+
+    def _redis_set(self, digest: str, entry: dict, ttl: float | None):
+        try:
+            self.redis_cache.set_many(
+                {self._redis_key(digest): entry}, timeout=self._redis_timeout(ttl)
+            )
+        except TypeError as e:
+            logger.warning(
+                f"Memoized result of {self.namespace} is not serializable: {e}"
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Memoize redis write failed: {e}")
+
+    async def _aredis_get(self, digest: str):
+        try:
+            data = await self.redis_cache.get(self._redis_key(digest))
+        except redis.RedisError as e:
+            logger.warning(f"Memoize redis read failed: {e}")
+            return None
+        return self._redis_entry(data)
+
+    async def _aredis_set(self, digest: str, entry: dict, ttl: float | None):
+        try:
+            await self.redis_cache.set_many(
+                {self._redis_key(digest): entry}, timeout=self._redis_timeout(ttl)
+            )
+        except TypeError as e:
+            logger.warning(
+                f"Memoized result of {self.namespace} is not serializable: {e}"
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Memoize redis write failed: {e}")
+
+    def _key(self, args: tuple, kwargs: dict) -> tuple[str | None, str | None]:
+        try:
+            return request_key(args, kwargs, self.handler)
+        except TypeError as e:
+            logger.warning(f"Call of {self.namespace} is not memoized: {e}")
+            return None, None
+
+    def _store_local(self, method: str | None, digest: str, entry: dict):
+        self.local.set(digest, entry, ttl=self._entry_ttl(method, entry))
+
+    def _cacheable(self, method: str | None, entry: dict) -> bool:
+        ttl = self._entry_ttl(method, entry)
+        return ttl is None or ttl > 0
+
+    def call(self, *args, **kwargs):
+        method, digest = self._key(args, kwargs)
+        if digest is None:
+            return self.func(*args, **kwargs)
+        entry = self.local.get(digest)
+        if entry is None and self.redis_cache is not None:
+            entry = self._redis_get(digest)
+            if entry is not None:
+                self._store_local(method, digest, entry)
+        if entry is not None:
+            return self._unwrap(entry)
+        try:
+            entry = {"result": self.func(*args, **kwargs)}
+        except ServiceException as e:
+            if not self._should_cache_error(e):
+                raise
+            entry = self._error_entry(e)
+        if self._cacheable(method, entry):
+            self._store_local(method, digest, entry)
+            if self.redis_cache is not None:
+                self._redis_set(digest, entry, self._entry_ttl(method, entry))
+        return self._unwrap(entry)
+
+    async def acall(self, *args, **kwargs):
+        method, digest = self._key(args, kwargs)
+        if digest is None:
+            return await self.func(*args, **kwargs)
+        entry = self.local.get(digest)
+        if entry is None and self.redis_cache is not None:
+            entry = await self._aredis_get(digest)
+            if entry is not None:
+                self._store_local(method, digest, entry)
+        if entry is not None:
+            return self._unwrap(entry)
+        try:
+            entry = {"result": await self.func(*args, **kwargs)}
+        except ServiceException as e:
+            if not self._should_cache_error(e):
+                raise
+            entry = self._error_entry(e)
+        if self._cacheable(method, entry):
+            self._store_local(method, digest, entry)
+            if self.redis_cache is not None:
+                await self._aredis_set(digest, entry, self._entry_ttl(method, entry))
+        return self._unwrap(entry)
+
+    def invalidate(self, *args, **kwargs):
+        """
+        Drop the cached result of a call. Handler results are dropped by their data,
+        e.g. ``invalidate({"method": "m", "request": {...}})``.
+
+        Returns the Redis delete result, awaitable for AsyncRedisBase.
+        """
+        _, digest = request_key(args, kwargs, self.handler)
+        self.local.delete(digest)
+        if self.redis_cache is not None:
+            return self.redis_cache.delete(self._redis_key(digest))
+
+    def invalidate_all(self):
+        """
+        Drop every cached result of the function.
+
+        Returns the Redis delete result, awaitable for AsyncRedisBase.
+        """
+        self.local.clear()
+        if self.redis_cache is not None:
+            return self.redis_cache.delete_keys(f"memo_{self.namespace}_*")
+
+
+def memoize(
+    ttl: float | None = 300,
+    maxsize: int = 1024,
+    redis_cache: RedisBase | AsyncRedisBase | None = None,
+    method_ttls: dict[str, float] | None = None,
+    error_ttl: float | None = None,
+):
+    """
+    Memoize a pure handler `process` method or function.
+
+    Results are kept in a bounded in-process LRU and, when `redis_cache` is given,
+    in Redis so they are shared between replicas; Redis results must be JSON serializable.
+    Handler results are keyed by method and request payload. ServiceException results
+    with a code below 500 are cached for `error_ttl` seconds when it is set.
+    A time to live of 0 disables caching. Calls with arguments that have no stable
+    representation, such as objects with the default repr, are not memoized.
+
+    Args:
+        ttl (float, optional): Time to live of cached results in seconds. Defaults to 300.
+        maxsize (int, optional): Number of results kept in process. Defaults to 1024.
+        redis_cache (RedisBase | AsyncRedisBase, optional): Shared tier. Defaults to None.
+        method_ttls (dict[str, float], optional): Time to live per handler method. Defaults to None.
+        error_ttl (float, optional): Time to live of cached errors. Defaults to None, not cached.
+
+    Returns:
+        Callable: Decorator; the wrapped function has `invalidate`, `invalidate_all`
+            and `memoizer` attributes.
+    """
+
+    def decorator(func):
+        memoizer = Memoizer(
+            func,
+            ttl=ttl,
+            maxsize=maxsize,
+            redis_cache=redis_cache,
+            method_ttls=method_ttls,
+            error_ttl=error_ttl,
+        )
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                return await memoizer.acall(*args, **kwargs)
+
+        else:
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                return memoizer.call(*args, **kwargs)
+
+        wrapper.invalidate = memoizer.invalidate
+        wrapper.invalidate_all = memoizer.invalidate_all
+        wrapper.memoizer = memoizer
+        return wrapper
+
+    return decorator
@@ -0,0 +1,146 @@
+import logging
+import threading
+import uuid
+
+import orjson
+import redis
+
+from .lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+
+class NearCache:
+    """In-process tier in front of RedisBase
+
+    Keeps deserialized values of recently read keys in a bounded LRU with a time to live.
+    Writes through a RedisBase publish the changed keys on an invalidation channel,
+    so every replica using a near cache on the same key prefix drops its local copy.
+    Cached values are shared and must not be mutated.
+
+    Attributes:
+        local (LRUCache): The in-process values.
+        hits (int): Reads served from the process.
+        misses (int): Reads that went to Redis.
+        invalidations (int): Keys dropped because of a write on any replica.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = 60):
+        self.local = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._origin = uuid.uuid4().hex
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._server = None
+        self._channel = None
+        self._thread = None
+
+    def start(self, server: redis.Redis, channel: str):
+        """
+        Start listening for invalidations. Called by RedisBase.
+        """
+        if self._thread is not None:
+            return
+        self._server = server
+        self._channel = channel
+        self._thread = threading.Thread(
+            target=self._listen, name=f"near-cache-{channel}", daemon=True
+        )
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(2)
+
+    def _listen(self):
+        while not self._stop.is_set():
+            pubsub = self._server.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self._channel)
+                # Invalidations may have been missed while disconnected
+                self._drop(None)
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message["type"] == "message":
+                        self._on_message(message["data"])
+            except redis.RedisError as e:
+                logger.warning(f"Near cache invalidation listener failed: {e}")
+                self._drop(None)
+                self._stop.wait(1.0)
+            finally:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+
+    def _on_message(self, data: bytes):
+        try:
+            message = orjson.loads(data)
+        except orjson.JSONDecodeError:
+            logger.warning(f"Invalid near cache invalidation {data!r}")
+            return
+        if message.get("origin") != self._origin:
+            self._drop(message.get("keys"))
+
+    def _drop(self, keys: list[str] | None):
+        with self._lock:
+            self._generation += 1
+            if keys is None:
+                self.invalidations += len(self.local)
+                self.local.clear()
+                return
+            for key in keys:
+                if self.local.delete(key):
+                    self.invalidations += 1
+
+    def get(self, key: str):
+        value = self.local.get(key, MISSING)
+        with self._lock:
+            if value is MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def set(self, key: str, value, generation: int):
+        """
+        Store a value read from Redis, unless an invalidation arrived since `generation`.
+        """
+        with self._lock:
+            if generation == self._generation:
+                self.local.set(key, value)
+
+    def invalidate(self, keys: list[str]):
+        """
+        Drop keys locally and publish them to the other replicas.
+        """
+        self._drop(keys)
+        if self._server is None:
+            return
+        try:
+            self._server.publish(
+                self._channel, orjson.dumps({"origin": self._origin, "keys": keys})
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Near cache invalidation publish failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            reads = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / reads if reads else 0.0,
+                "invalidations": self.invalidations,
+                "size": len(self.local),
+            }
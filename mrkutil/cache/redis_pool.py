@@ -0,0 +1,221 @@
+import asyncio
+import atexit
+import logging
+import os
+import threading
+
+import redis
+import redis.asyncio as aredis
+from redis.asyncio.cluster import RedisCluster as AsyncRedisCluster
+from redis.cluster import RedisCluster
+
+from .job_notifier import JobNotifier
+from .local_redis import AsyncLocalRedis, LocalRedis, is_local_url
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pools: dict[tuple, redis.ConnectionPool] = {}
+_clusters: dict[tuple, RedisCluster] = {}
+_cluster_enabled: dict[tuple, bool] = {}
+# Clients refer to their loop through their connections, so entries are evicted explicitly
+_async_clients: dict[asyncio.AbstractEventLoop, dict] = {}
+
+
+def _pool_options() -> dict:
+    return {
+        "max_connections": int(os.getenv("REDIS_MAX_CONNECTIONS", "50")),
+        "timeout": float(os.getenv("REDIS_POOL_TIMEOUT", "20")),
+        "health_check_interval": int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30")),
+    }
+
+
+def _pool_key(host: str | None, port: int, db: int) -> tuple:
+    return (host or os.getenv("REDIS_HOST"), int(port), int(db))
+
+
+def cluster_requested() -> bool:
+    return os.getenv("REDIS_CLUSTER", "").lower() in ("1", "true", "yes")
+
+
+def cluster_enabled(host: str | None = None, port: int = 6379) -> bool:
+    """
+    Check once per host and port whether the server runs in cluster mode.
+
+    Returns:
+        bool: False when cluster mode is disabled or the server is unreachable.
+    """
+    key = _pool_key(host, port, 0)[:2]
+    enabled = _cluster_enabled.get(key)
+    if enabled is None:
+        client = redis.Redis(host=key[0], port=key[1])
+        try:
+            enabled = bool(client.info("cluster").get("cluster_enabled"))
+        except redis.RedisError as e:
+            logger.warning(f"Could not check cluster mode of {key[0]}:{key[1]}: {e}")
+            return False
+        finally:
+            client.close()
+        if not enabled:
+            logger.warning(
+                f"Redis {key[0]}:{key[1]} is not a cluster, using the single node client"
+            )
+        _cluster_enabled[key] = enabled
+    return enabled
+
+
+def get_client(
+    host: str | None = None, port: int = 6379, db: int = 0, cluster: bool = False
+) -> redis.Redis | RedisCluster | LocalRedis:
+    """
+    Get a Redis client using the process-wide connection pool of host, port and db.
+
+    With `cluster`, a shared RedisCluster client is returned instead when the server
+    runs in cluster mode, falling back to the single node client otherwise.
+    A ``memory://`` or ``sqlite://`` host selects an embedded LocalRedis backend.
+
+    Pools block for up to ``REDIS_POOL_TIMEOUT`` seconds when all of their
+    ``REDIS_MAX_CONNECTIONS`` connections are in use, and check idle connections
+    every ``REDIS_HEALTH_CHECK_INTERVAL`` seconds.
+
+    Args:
+        host (str, optional): Redis host. Defaults to the REDIS_HOST environment variable.
+        port (int, optional): Redis port. Defaults to 6379.
+        db (int, optional): Redis database. Defaults to 0.
+        cluster (bool, optional): Use Redis Cluster when available. Defaults to False.
+
+    Returns:
+        redis.Redis | redis.cluster.RedisCluster | LocalRedis: The client.
+    """
+    key = _pool_key(host, port, db)
+    if is_local_url(key[0]):
+        return LocalRedis.from_url(key[0], key[2])
+    if cluster and cluster_enabled(host, port):
+        return _get_cluster(key)
+    pool = _pools.get(key)
+    if pool is None:
+        with _lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = redis.BlockingConnectionPool(
+                    host=key[0], port=key[1], db=key[2], **_pool_options()
+                )
+    return redis.Redis(connection_pool=pool)
+
+
+def _get_cluster(key: tuple) -> RedisCluster:
+    client = _clusters.get(key[:2])
+    if client is None:
+        options = _pool_options()
+        with _lock:
+            client = _clusters.get(key[:2])
+            if client is None:
+                client = _clusters[key[:2]] = RedisCluster(
+                    host=key[0],
+                    port=key[1],
+                    max_connections=options["max_connections"],
+                    health_check_interval=options["health_check_interval"],
+                )
+    return client
+
+
+def get_async_client(
+    host: str | None = None, port: int = 6379, db: int = 0, cluster: bool = False
+) -> aredis.Redis | AsyncRedisCluster | AsyncLocalRedis:
+    """
+    Get an asyncio Redis client sharing the connection pool of host, port and db
+    within the running event loop.
+
+    Asyncio connections are bound to their event loop, so every loop gets its own pool.
+    Close them with `aclose_pools` before the loop ends. The clients of loops closed
+    without it are evicted on the next call, leaving their connections to the garbage
+    collector. `cluster` behaves as in `get_client`.
+
+    Args:
+        host (str, optional): Redis host. Defaults to the REDIS_HOST environment variable.
+        port (int, optional): Redis port. Defaults to 6379.
+        db (int, optional): Redis database. Defaults to 0.
+        cluster (bool, optional): Use Redis Cluster when available. Defaults to False.
+
+    Returns:
+        redis.asyncio.Redis | redis.asyncio.cluster.RedisCluster | AsyncLocalRedis: The client.
+    """
+    key = _pool_key(host, port, db)
+    if is_local_url(key[0]):
+        return AsyncLocalRedis(LocalRedis.from_url(key[0], key[2]))
+    loop = asyncio.get_running_loop()
+    if cluster and cluster_enabled(host, port):
+        key = ("cluster", *key[:2])
+    with _lock:
+        _evict_closed_loops()
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            options = _pool_options()
+            if key[0] == "cluster":
+                client = AsyncRedisCluster(
+                    host=key[1],
+                    port=key[2],
+                    max_connections=options["max_connections"],
+                    health_check_interval=options["health_check_interval"],
+                )
+            else:
+                pool = aredis.BlockingConnectionPool(
+                    host=key[0], port=key[1], db=key[2], **options
+                )
+                client = aredis.Redis(connection_pool=pool)
+            clients[key] = client
+    return client
+
+
+def _evict_closed_loops():
+    closed = [loop for loop in _async_clients if loop.is_closed()]
+    for loop in closed:
+        del _async_clients[loop]
+    if closed:
+        logger.warning(
+            f"Dropped the Redis clients of {len(closed)} event loops closed without aclose_pools"
+        )
+
+
+def close_pools():
+    """
+    Disconnect every process-wide Redis connection pool. Called at interpreter exit.
+    """
+    with _lock:
+        pools = list(_pools.values())
+        clusters = list(_clusters.values())
+        _pools.clear()
+        _clusters.clear()
+    JobNotifier.discard([*pools, *clusters])
+    for pool in pools:
+        try:
+            pool.disconnect()
+        except Exception as e:
+            logger.warning(f"Failed to close redis pool: {e}")
+    for client in clusters:
+        try:
+            client.close()
+        except Exception as e:
+            logger.warning(f"Failed to close redis cluster client: {e}")
+
+
+async def aclose_pools():
+    """
+    Disconnect the asyncio Redis connection pools of the running event loop.
+
+    Call it before the event loop is closed, e.g. at the end of the main coroutine.
+    """
+    with _lock:
+        clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        try:
+            if isinstance(client, AsyncRedisCluster):
+                await client.aclose()
+            else:
+                await client.aclose(close_connection_pool=True)
+        except Exception as e:
+            logger.warning(f"Failed to close redis pool: {e}")
+
+
+atexit.register(close_pools)
@@ -0,0 +1,182 @@
+"""Lua scripts run atomically on the Redis server by RedisBase and AsyncRedisBase.
+
+Scripts work on JSON objects stored uncompressed. Values pass through Lua cjson,
+which encodes numbers with 14 significant digits, so integers with more than 14 digits
+and longer fractions are rounded, and empty lists are written back as empty objects.
+"""
+
+_DECODE_DOCUMENT = """
+local function decode_document(value)
+    if not value then
+        return {}
+    end
+    local ok, document = pcall(cjson.decode, value)
+    if not ok or type(document) ~= 'table' then
+        return nil
+    end
+    return document
+end
+
+local function store(key, value, timeout, default_timeout, existed)
+    if tonumber(timeout) > 0 then
+        redis.call('SET', key, value, 'EX', timeout)
+    elseif existed then
+        redis.call('SET', key, value, 'KEEPTTL')
+    elseif tonumber(default_timeout) > 0 then
+        redis.call('SET', key, value, 'EX', default_timeout)
+    else
+        redis.call('SET', key, value)
+    end
+end
+"""
+
+# KEYS[1] key, ARGV[1] field, ARGV[2] expected JSON value, ARGV[3] new value, ARGV[4] timeout
+COMPARE_AND_SET = (
+    _DECODE_DOCUMENT
+    + """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    return 0
+end
+local document = decode_document(current)
+if not document then
+    return redis.error_reply('value is not a JSON object')
+end
+if document[ARGV[1]] ~= cjson.decode(ARGV[2]) then
+    return 0
+end
+store(KEYS[1], ARGV[3], ARGV[4], 0, true)
+return 1
+"""
+)
+
+# KEYS[1] key, ARGV[1] JSON object of fields, ARGV[2] timeout, ARGV[3] timeout of new keys
+UPDATE_FIELDS = (
+    _DECODE_DOCUMENT
+    + """
+local current = redis.call('GET', KEYS[1])
+local document = decode_document(current)
+if not document then
+    return redis.error_reply('value is not a JSON object')
+end
+for field, value in pairs(cjson.decode(ARGV[1])) do
+    document[field] = value
+end
+local encoded = cjson.encode(document)
+store(KEYS[1], encoded, ARGV[2], ARGV[3], current)
+return encoded
+"""
+)
+
+# KEYS[1] key, ARGV[1] amount, ARGV[2] timeout set when the counter is created
+INCR_WITH_TTL = """
+local value = redis.call('INCRBY', KEYS[1], ARGV[1])
+if tonumber(ARGV[2]) > 0 and redis.call('TTL', KEYS[1]) == -1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return value
+"""
+
+# KEYS[1] key, ARGV[1] field, ARGV[2] amount, ARGV[3] timeout set when the object is created
+INCR_FIELD_WITH_TTL = (
+    _DECODE_DOCUMENT
+    + """
+local current = redis.call('GET', KEYS[1])
+local document = decode_document(current)
+if not document then
+    return redis.error_reply('value is not a JSON object')
+end
+local value = (tonumber(document[ARGV[1]]) or 0) + tonumber(ARGV[2])
+document[ARGV[1]] = value
+store(KEYS[1], cjson.encode(document), 0, ARGV[3], current)
+return cjson.encode(value)
+"""
+)
+
+# KEYS[1] status of every child of the parent, KEYS[2] status counters of the parent,
+# ARGV[1] job key, ARGV[2] status, ARGV[3] timeout, ARGV[4] '1' to register the child.
+# Both keys carry the parent as hash tag, and stored job values are never decoded.
+SET_JOB_STATUS = """
+local previous = redis.call('HGET', KEYS[1], ARGV[1])
+if not previous and ARGV[4] ~= '1' then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+if previous then
+    redis.call('HINCRBY', KEYS[2], previous, -1)
+end
+redis.call('HINCRBY', KEYS[2], ARGV[2], 1)
+if tonumber(ARGV[3]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+    redis.call('EXPIRE', KEYS[2], ARGV[3])
+end
+return 1
+"""
+
+# KEYS[1] child statuses, KEYS[2] status counters; returns the child count followed by counter pairs
+CHILD_JOB_COUNTS = """
+local result = {redis.call('HLEN', KEYS[1])}
+for _, value in ipairs(redis.call('HGETALL', KEYS[2])) do
+    table.insert(result, value)
+end
+return result
+"""
+
+# KEYS[1] event stream, ARGV[1] JSON event, ARGV[2] approximate maximum length, ARGV[3] timeout
+APPEND_JOB_EVENT = """
+local id = redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[2], '*', 'event', ARGV[1])
+if tonumber(ARGV[3]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+return id
+"""
+
+# KEYS[1] progress hash, KEYS[2] event stream, ARGV[1] JSON object of fields to set,
+# ARGV[2] JSON object of increments, ARGV[3] timeout, ARGV[4] maximum stream length, 0 for no event.
+# Hash values are JSON encoded, so numeric fields can be incremented in place.
+UPDATE_JOB_PROGRESS = """
+local changed = {}
+for field, value in pairs(cjson.decode(ARGV[1])) do
+    redis.call('HSET', KEYS[1], field, cjson.encode(value))
+    changed[field] = value
+end
+for field, amount in pairs(cjson.decode(ARGV[2])) do
+    changed[field] = tonumber(redis.call('HINCRBYFLOAT', KEYS[1], field, amount))
+end
+if tonumber(ARGV[3]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+if tonumber(ARGV[4]) > 0 and next(changed) ~= nil then
+    redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[4], '*', 'event', cjson.encode({progress = changed}))
+    if tonumber(ARGV[3]) > 0 then
+        redis.call('EXPIRE', KEYS[2], ARGV[3])
+    end
+end
+return redis.call('HGETALL', KEYS[1])
+"""
+
+# KEYS[1] bucket, ARGV[1] TTL of the fields, 0 when they never expire, ARGV[2..] field value pairs.
+# A bucket without expiry holds fields that never expire, so it is never given one.
+BUCKET_SET = """
+local current = redis.call('TTL', KEYS[1])
+local added = redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+local ttl = tonumber(ARGV[1])
+if ttl == 0 then
+    redis.call('PERSIST', KEYS[1])
+elseif current == -2 or current < ttl and current >= 0 then
+    redis.call('EXPIRE', KEYS[1], ttl)
+end
+return added
+"""
+
+SCRIPTS = {
+    "compare_and_set": COMPARE_AND_SET,
+    "update_fields": UPDATE_FIELDS,
+    "incr_with_ttl": INCR_WITH_TTL,
+    "incr_field_with_ttl": INCR_FIELD_WITH_TTL,
+    "bucket_set": BUCKET_SET,
+    "set_job_status": SET_JOB_STATUS,
+    "child_job_counts": CHILD_JOB_COUNTS,
+    "append_job_event": APPEND_JOB_EVENT,
+    "update_job_progress": UPDATE_JOB_PROGRESS,
+}
@@ -0,0 +1,135 @@
+import dataclasses
+import datetime
+import uuid
+from typing import Any, Callable
+
+import orjson
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+
+def _to_builtin(obj):
+    """
+    Fallback serializer for values orjson and msgpack do not handle themselves.
+    """
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not serializable: {obj.__class__.__name__}")
+
+
+def construct(type: type, obj):
+    """
+    Build an instance of `type` from a decoded value.
+
+    Pydantic models are validated, dataclasses and other classes are called with
+    the fields as keyword arguments, and values already of `type` are returned as they are.
+    """
+    if obj is None or isinstance(obj, type):
+        return obj
+    if hasattr(type, "model_validate"):
+        return type.model_validate(obj)
+    if isinstance(obj, dict):
+        return type(**obj)
+    return type(obj)
+
+
+class ValueCodec:
+    """Serialization of RedisBase values
+
+    Subclass it to plug in another format; `encode` must return bytes and
+    `decode` must accept the bytes it returned.
+    """
+
+    def encode(self, data: Any) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, data: bytes, type: type | None = None):
+        raise NotImplementedError
+
+
+class OrjsonCodec(ValueCodec):
+    """JSON values encoded with orjson
+
+    Dataclasses, datetimes, UUIDs and numpy arrays are serialized natively, pydantic models
+    through their own JSON serializer. Typed reads of pydantic models validate the stored
+    JSON directly, without decoding it to a dict first.
+
+    Attributes:
+        option (int): orjson option flags.
+        default (Callable): Serializer for other types.
+    """
+
+    def __init__(
+        self,
+        option: int = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        default: Callable = _to_builtin,
+    ):
+        self.option = option
+        self.default = default
+
+    def encode(self, data: Any) -> bytes:
+        if hasattr(data, "model_dump_json"):
+            return data.model_dump_json().encode("utf-8")
+        return orjson.dumps(data, default=self.default, option=self.option)
+
+    def decode(self, data: bytes, type: type | None = None):
+        if type is not None and hasattr(type, "model_validate_json"):
+            return type.model_validate_json(data)
+        obj = orjson.loads(data)
+        return obj if type is None else construct(type, obj)
+
+
+class MsgpackCodec(ValueCodec):
+    """Compact binary values encoded with msgpack
+
+    Requires the msgpack package. Dataclasses, datetimes, UUIDs and pydantic models are
+    stored as their plain representation, so typed reads are needed to get them back.
+    """
+
+    def __init__(self):
+        if msgpack is None:
+            raise ValueError("msgpack serialization requires the msgpack package")
+
+    @staticmethod
+    def _default(obj):
+        if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+            return dataclasses.asdict(obj)
+        if isinstance(obj, (datetime.date, datetime.time)):
+            return obj.isoformat()
+        if isinstance(obj, uuid.UUID):
+            return str(obj)
+        return _to_builtin(obj)
+
+    def encode(self, data: Any) -> bytes:
+        return msgpack.packb(data, default=self._default, use_bin_type=True)
+
+    def decode(self, data: bytes, type: type | None = None):
+        obj = msgpack.unpackb(data, raw=False)
+        return obj if type is None else construct(type, obj)
+
+
+class RawCodec(ValueCodec):
+    """Values stored as they are
+
+    Accepts bytes and str only and reads back bytes, or str with `type=str`.
+    """
+
+    def encode(self, data: Any) -> bytes:
+        if isinstance(data, str):
+            return data.encode("utf-8")
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            return bytes(data)
+        raise TypeError(f"RawCodec stores bytes or str, got {data.__class__.__name__}")
+
+    def decode(self, data: bytes, type: type | None = None):
+        if type is str:
+            return data.decode("utf-8")
+        return data
+
+
+JSON_CODEC = OrjsonCodec()
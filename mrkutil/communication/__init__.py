@@ -1,6 +1,9 @@
 from .call_service import call_service, acall_service
 from .trigger_service import trigger_service, atrigger_service
 from .listen import listen
+from .memory_broker import MemoryBroker
+from .partition import ConsistentHashRing
+from .retry import RetryPolicy
 
 
 __all__ = [
@@ -9,4 +12,7 @@ __all__ = [
     "listen",
     "acall_service",
     "atrigger_service",
+    "MemoryBroker",
+    "ConsistentHashRing",
+    "RetryPolicy",
 ]
@@ -1,5 +1,6 @@
 from rabbitmqpubsub.rabbit_pubsub import RpcClient, AsyncRpcClient
 from mrkutil.utilities import random_string, RequestData
+from .memory_broker import is_memory_url, MemoryRpcClient, AsyncMemoryRpcClient
 import logging
 import os
 
@@ -24,12 +25,14 @@ def call_service(
         corr_id (str, optional): The correlation ID for the RPC call.
         timeout (int, optional): Timeout for the RPC call.
         rabbit_url (str, optional): The RabbitMQ URL. Defaults to the value of the RABBIT_URL environment variable.
+            A ``memory://`` URL uses the in-process MemoryBroker instead of RabbitMQ.
 
     Returns:
         dict: The response data received from the service.
 
     """
-    rpc = RpcClient(
+    rpc_client = MemoryRpcClient if is_memory_url(rabbit_url) else RpcClient
+    rpc = rpc_client(
         amqp_url=rabbit_url,
         exchange=source,
         queue="temp_{}".format(random_string(6)),
@@ -48,7 +51,8 @@ async def acall_service(
     timeout: int = 30,
     rabbit_url: str = os.getenv("RABBIT_URL"),
 ):
-    rpc = AsyncRpcClient(
+    rpc_client = AsyncMemoryRpcClient if is_memory_url(rabbit_url) else AsyncRpcClient
+    rpc = rpc_client(
         amqp_url=rabbit_url,
         exchange=source,
         queue="temp_{}".format(random_string(6)),
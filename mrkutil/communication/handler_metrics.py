@@ -0,0 +1,59 @@
+import threading
+from collections import Counter
+
+
+class HandlerMetrics:
+    """
+    Thread-safe counters describing handler executions that timed out or failed.
+
+    Attributes:
+        timed_out (Counter): Number of timed out executions per method.
+        cancelled (Counter): Number of async executions cancelled per method.
+        finished_after_timeout (Counter): Sync executions per method that finished
+            after their timeout had already been reported.
+        running_after_timeout (int): Sync executions still occupying a thread after
+            timing out, i.e. capacity not yet given back by cooperative cancellation.
+        retried (Counter): Number of failed messages rescheduled per method.
+        quarantined (Counter): Number of messages quarantined per method.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timed_out = Counter()
+        self.cancelled = Counter()
+        self.finished_after_timeout = Counter()
+        self.running_after_timeout = 0
+        self.retried = Counter()
+        self.quarantined = Counter()
+
+    def record_timeout(self, method: str, cancelled: bool = False):
+        with self._lock:
+            self.timed_out[method] += 1
+            if cancelled:
+                self.cancelled[method] += 1
+            else:
+                self.running_after_timeout += 1
+
+    def record_finished_after_timeout(self, method: str):
+        with self._lock:
+            self.finished_after_timeout[method] += 1
+            self.running_after_timeout -= 1
+
+    def record_retry(self, method: str):
+        with self._lock:
+            self.retried[method] += 1
+
+    def record_quarantine(self, method: str):
+        with self._lock:
+            self.quarantined[method] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "timed_out": dict(self.timed_out),
+                "cancelled": dict(self.cancelled),
+                "finished_after_timeout": dict(self.finished_after_timeout),
+                "running_after_timeout": self.running_after_timeout,
+                "retried": dict(self.retried),
+                "quarantined": dict(self.quarantined),
+            }
@@ -1,15 +1,37 @@
 from typing import Callable
 from rabbitmqpubsub import rabbit_pubsub
-from mrkutil.base import BaseHandler
+from mrkutil.base import BaseHandler, CancellationToken
 from .trigger_service import trigger_service
+from .handler_metrics import HandlerMetrics
+from .memory_broker import is_memory_url, MemorySubscriber
+from .partition import owned_partitions, partition_name
+from .retry import RetryPolicy, schedule_retry, quarantine
 from mrkutil.responses import ServiceResponse
-from mrkutil.exception import ServiceException
+from mrkutil.exception import ServiceException, HandlerTimeoutException
 from mrkutil.enum import JobStatusEnum
+import asyncio
+import inspect
 import logging
 import os
+import threading
 
 logger = logging.getLogger(__name__)
 
+_thread_state = threading.local()
+
+
+def _thread_loop() -> asyncio.AbstractEventLoop:
+    """
+    Event loop running the async handlers of the calling worker thread.
+
+    It lives as long as the thread, so clients bound to it, e.g. the pools of
+    `get_async_client`, are reused across messages instead of leaking per message.
+    """
+    loop = getattr(_thread_state, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = _thread_state.loop = asyncio.new_event_loop()
+    return loop
+
 
 class Subscriber:
     """
@@ -24,9 +46,15 @@ class Subscriber:
         base_handler (type[BaseHandler]): The base handler class to use for processing messages.
         use_job_cache (bool): Whether to use the job cache.
         rabbit_url (str): The RabbitMQ URL.
+        handler_timeout (float): Default execution timeout in seconds, None for no limit.
+        method_timeouts (dict): Execution timeouts per method, overriding handler `timeout` attributes.
+        retry_policy (RetryPolicy): Retry schedule for unexpected handler errors, None to not retry.
+        metrics (HandlerMetrics): Counters of timed out, retried and quarantined messages.
 
     Methods:
         handle: Handles the incoming message.
+        execute: Runs the handler for the message data, enforcing its timeout.
+        retry: Reschedules or quarantines a message whose handler failed.
 
     """
 
@@ -37,6 +65,9 @@ class Subscriber:
         base_handler: type[BaseHandler] | None = None,
         use_job_cache: bool = True,
         rabbit_url: str = os.getenv("RABBIT_URL"),
+        handler_timeout: float | None = None,
+        method_timeouts: dict[str, float] | None = None,
+        retry_policy: RetryPolicy | None = None,
     ):
         if base_handler:
             if not isinstance(base_handler, type):
@@ -48,6 +79,154 @@ class Subscriber:
         self.on_message_process_complete = on_message_process_complete
         self.use_job_cache = use_job_cache
         self.rabbit_url = rabbit_url
+        self.handler_timeout = handler_timeout
+        self.method_timeouts = method_timeouts or {}
+        self.retry_policy = retry_policy
+        self.metrics = HandlerMetrics()
+        self._job_cache = None
+
+    @property
+    def job_cache(self):
+        if self._job_cache is None:
+            from mrkutil.cache import JobCache
+
+            self._job_cache = JobCache()
+        return self._job_cache
+
+    def get_timeout(self, method: str) -> float | None:
+        if method in self.method_timeouts:
+            return self.method_timeouts[method]
+        handler = self.base_handler.get_handler(method)
+        if handler and handler.timeout:
+            return handler.timeout
+        return self.handler_timeout
+
+    def execute(self, data: dict, corr_id: str):
+        """
+        Runs the handler for the message data.
+
+        Sync handlers with a timeout run on their own thread; when the timeout expires
+        their CancellationToken is cancelled and the caller is released while the thread
+        finishes cooperatively. Async handlers run on the long-lived event loop of the
+        worker thread and are cancelled when the timeout expires.
+
+        Args:
+            data (dict): The message data.
+            corr_id (str): The correlation ID.
+
+        Returns:
+            dict: The handler response.
+
+        Raises:
+            HandlerTimeoutException: If the handler did not finish in time.
+        """
+        method = data.get("method")
+        timeout = self.get_timeout(method)
+        handler = self.base_handler.get_handler(method)
+        if handler and inspect.iscoroutinefunction(handler.process):
+            return _thread_loop().run_until_complete(
+                self._execute_async(data, corr_id, timeout)
+            )
+        if not timeout:
+            return self.base_handler.process_data(data, corr_id)
+
+        token = CancellationToken()
+        result = {}
+
+        def run():
+            try:
+                result["response"] = self.base_handler.process_data(
+                    data, corr_id, cancel_token=token
+                )
+            except BaseException as e:
+                result["error"] = e
+            finally:
+                if token._finish():
+                    self.metrics.record_finished_after_timeout(method)
+                    logger.info(
+                        f"Timed out method {method} finished, corr id {corr_id}"
+                    )
+
+        thread = threading.Thread(target=run, name=f"handler-{corr_id}", daemon=True)
+        thread.start()
+        thread.join(timeout)
+        if thread.is_alive() and token._cancel_running():
+            self.metrics.record_timeout(method)
+            raise HandlerTimeoutException(
+                message=f"Method {method} timed out after {timeout} seconds."
+            )
+        thread.join()
+        if "error" in result:
+            raise result["error"]
+        return result.get("response")
+
+    async def _execute_async(self, data: dict, corr_id: str, timeout: float | None):
+        method = data.get("method")
+        token = CancellationToken()
+        try:
+            return await asyncio.wait_for(
+                self.base_handler.process_data(data, corr_id, cancel_token=token),
+                timeout,
+            )
+        except asyncio.TimeoutError:
+            token.cancel()
+            self.metrics.record_timeout(method, cancelled=True)
+            raise HandlerTimeoutException(
+                message=f"Method {method} timed out after {timeout} seconds."
+            )
+
+    def retry(self, body: dict, error: Exception) -> bool:
+        """
+        Reschedules a failed message with a delay, or quarantines it when out of retries.
+
+        The attempt number is kept in ``meta.retryCount``. Retried messages are parked in
+        a TTL queue dead-lettering back to the exchange they were published to.
+
+        Args:
+            body (dict): The failed message body.
+            error (Exception): The handler error.
+
+        Returns:
+            bool: True if the message was rescheduled, False if it was quarantined.
+        """
+        meta = body.get("meta", {})
+        method = body.get("data", {}).get("method")
+        attempt = meta.get("retryCount", 0) + 1
+        message = {"meta": dict(meta), "data": body.get("data")}
+        try:
+            if attempt <= self.retry_policy.max_retries:
+                delay = self.retry_policy.delay(attempt)
+                message["meta"]["retryCount"] = attempt
+                schedule_retry(
+                    message,
+                    meta.get("destination") or self.exchange,
+                    delay,
+                    self.rabbit_url,
+                )
+                self.metrics.record_retry(method)
+                logger.warning(
+                    f"Retrying method {method} in {delay}s, attempt {attempt}, corr id {meta.get('correlationId')}"
+                )
+                return True
+            quarantine(message, self.exchange, str(error), self.rabbit_url)
+            self.metrics.record_quarantine(method)
+            logger.error(
+                f"Quarantined method {method} after {attempt - 1} retries, corr id {meta.get('correlationId')}"
+            )
+        except Exception as e:
+            logger.exception(f"Retry of method {method} failed. Error {e}")
+        return False
+
+    def _job_key(self, data) -> str | None:
+        if (
+            data
+            and isinstance(data, dict)
+            and isinstance(data.get("request", {}), dict)
+            and data.get("request", {}).get("job_key")
+            and self.use_job_cache
+        ):
+            return data.get("request", {}).get("job_key")
+        return None
 
     def handle(self, body=None):
         """
@@ -61,14 +240,11 @@ class Subscriber:
 
         """
         response = None
-        method_exists = isinstance(body.get("data", False), dict) and body.get(
-            "data", {}
-        ).get("method")
+        data = body.get("data", {})
+        method_exists = isinstance(data, dict) and data.get("method")
         try:
             if method_exists:
-                response = self.base_handler.process_data(
-                    body["data"], body["meta"]["correlationId"]
-                )
+                response = self.execute(body["data"], body["meta"]["correlationId"])
                 if response:
                     trigger_service(
                         request_data=response,
@@ -78,22 +254,31 @@ class Subscriber:
                         rabbit_url=self.rabbit_url,
                     )
                 return True
+        except HandlerTimeoutException as e:
+            corr_id = body.get("meta", {}).get("correlationId")
+            logger.error(f"Handler timed out, corr id {corr_id}, message {e.message}")
+            job_key = self._job_key(data)
+            destination = body.get("meta", {}).get("source")
+            if job_key:
+                self.job_cache.set_progress(
+                    job_key, JobStatusEnum.FAILED, {"message": e.message}
+                )
+            elif destination:
+                trigger_service(
+                    request_data=ServiceResponse(code=e.code, message=e.message),
+                    destination=destination,
+                    source=self.exchange,
+                    corr_id=corr_id,
+                    rabbit_url=self.rabbit_url,
+                )
         except ServiceException as e:
-            data = body.get("data", {})
             logger.error(
                 f"Error occured with job, message {e.message} errors {e.errors}"
             )
-            if (
-                data
-                and isinstance(data, dict)
-                and isinstance(data.get("request", {}), dict)
-                and data.get("request", {}).get("job_key")
-                and self.use_job_cache
-            ):
-                from mrkutil.cache import JobCache
-
-                JobCache().set_progress(
-                    data.get("request", {}).get("job_key"),
+            job_key = self._job_key(data)
+            if job_key:
+                self.job_cache.set_progress(
+                    job_key,
                     JobStatusEnum.FAILED,
                     {"message": e.message, "errors": e.errors},
                 )
@@ -101,24 +286,17 @@ class Subscriber:
                 return ServiceResponse(code=e.code, message=e.message, errors=e.errors)
         except Exception as e:
             logger.exception("error parsing received message {}".format(str(e)))
+            if method_exists and self.retry_policy and self.retry(body, e):
+                return False
             if method_exists:
                 destination = body.get("meta", {}).get("source")
                 if destination:
-                    if (
-                        data
-                        and isinstance(data, dict)
-                        and isinstance(data.get("request", {}), dict)
-                        and data.get("request", {}).get("job_key")
-                        and self.use_job_cache
-                    ):
-                        from mrkutil.cache import JobCache
-
-                        JobCache().set_progress(
-                            data.get("request", {}).get("job_key"),
+                    job_key = self._job_key(data)
+                    if job_key:
+                        self.job_cache.set_progress(
+                            job_key,
                             JobStatusEnum.FAILED,
-                            {
-                                "message": f"Unexpected error occured with job {data.get('request', {}).get('job_key')}"
-                            },
+                            {"message": f"Unexpected error occured with job {job_key}"},
                         )
                     else:
                         corr_id = body.get("meta", {}).get("correlationId")
@@ -152,6 +330,12 @@ def listen(
     base_handler: type[BaseHandler] | None = None,
     use_job_cache: bool = True,
     rabbit_url: str = os.getenv("RABBIT_URL"),
+    handler_timeout: float | None = None,
+    method_timeouts: dict[str, float] | None = None,
+    retry_policy: RetryPolicy | None = None,
+    partitions: int = 0,
+    replica_index: int = 0,
+    replica_count: int = 1,
 ):
     """
     Listens for messages on a RabbitMQ exchange and processes them asynchronously if wanted.
@@ -166,23 +350,72 @@ def listen(
         base_handler (type[BaseHandler], optional): The base handler class to use for processing messages. Defaults to None.
         use_job_cache (bool, optional): Whether to use the job cache. Defaults to True.
         rabbit_url (str, optional): The RabbitMQ URL. Defaults to the value of the RABBIT_URL environment variable.
+            A ``memory://`` URL uses the in-process MemoryBroker instead of RabbitMQ.
+        handler_timeout (float, optional): Default handler execution timeout in seconds. Timed out
+            messages are answered with a 504 and free their worker. Defaults to None, no limit.
+        method_timeouts (dict[str, float], optional): Execution timeouts per method. Defaults to None.
+        retry_policy (RetryPolicy, optional): Retries messages whose handler raised an unexpected
+            error after an exponential delay, quarantining them in ``<exchange>_quarantine`` after
+            the last attempt. Defaults to None, failures are answered with a 500 immediately.
+            Not supported with ``partitions``, as retried messages would overtake later ones.
+        partitions (int, optional): Number of partitions messages are hashed onto by
+            ``trigger_service(partition_key=..., partitions=...)``. Each partition has its own
+            exchange and queue and is processed sequentially, preserving per-key order, so
+            ``async_processing`` and ``max_threads`` do not apply. Defaults to 0, not partitioned.
+        replica_index (int, optional): Index of this replica, used with ``partitions``. Defaults to 0.
+        replica_count (int, optional): Number of replicas sharing the partitions; replica ``i``
+            consumes partitions ``p`` where ``p % replica_count == i``. It must be the same on
+            every replica, and changing it requires restarting all of them. Defaults to 1.
+
+    Raises:
+        ValueError: If ``partitions`` is combined with a ``retry_policy``, or if
+            ``replica_index`` owns none of the partitions.
     """
-    subscriber = rabbit_pubsub.Subscriber(
-        amqp_url=rabbit_url,
-        exchange=exchange,
-        exchange_type=exchange_type,
-        queue=queue,
-        async_processing=async_processing,
-        max_threads=max_threads,
+    subscriber_class = (
+        MemorySubscriber if is_memory_url(rabbit_url) else rabbit_pubsub.Subscriber
     )
-    subscriber.subscribe(
-        Subscriber(
-            exchange,
-            on_message_process_complete,
-            base_handler=base_handler,
-            use_job_cache=use_job_cache,
-            rabbit_url=rabbit_url,
+    if partitions and retry_policy:
+        # Retries are dead-lettered back to the partition exchange behind later messages
+        raise ValueError(
+            "Partitioned consumption does not support a retry_policy, "
+            "retried messages would break the per-key order"
         )
+    if partitions:
+        owned = owned_partitions(partitions, replica_index, replica_count)
+        if not owned:
+            raise ValueError(
+                f"Replica {replica_index} owns none of the {partitions} partitions, "
+                f"use at most {partitions} replicas"
+            )
+        bindings = [
+            (partition_name(exchange, p), partition_name(queue, p)) for p in owned
+        ]
+        async_processing = False
+    else:
+        bindings = [(exchange, queue)]
+    observer = Subscriber(
+        exchange,
+        on_message_process_complete,
+        base_handler=base_handler,
+        use_job_cache=use_job_cache,
+        rabbit_url=rabbit_url,
+        handler_timeout=handler_timeout,
+        method_timeouts=method_timeouts,
+        retry_policy=retry_policy,
     )
-    subscriber.start()
-    subscriber.join()
+    observer.base_handler.get_registry().warm_up()
+    subscribers = []
+    for subscriber_exchange, subscriber_queue in bindings:
+        subscriber = subscriber_class(
+            amqp_url=rabbit_url,
+            exchange=subscriber_exchange,
+            exchange_type=exchange_type,
+            queue=subscriber_queue,
+            async_processing=async_processing,
+            max_threads=max_threads,
+        )
+        subscriber.subscribe(observer)
+        subscriber.start()
+        subscribers.append(subscriber)
+    for subscriber in subscribers:
+        subscriber.join()
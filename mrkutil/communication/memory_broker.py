@@ -0,0 +1,596 @@
+import asyncio
+import datetime as dt
+import heapq
+import itertools
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+MEMORY_SCHEME = "memory"
+
+
+def is_memory_url(url: str | None) -> bool:
+    """
+    Check whether the given broker URL selects the in-memory transport.
+
+    Args:
+        url (str | None): The broker URL, e.g. ``memory://`` or ``memory://bench``.
+
+    Returns:
+        bool: True if the URL uses the ``memory://`` scheme.
+    """
+    return bool(url) and urlparse(url).scheme == MEMORY_SCHEME
+
+
+@dataclass(eq=False)
+class MemoryMessage:
+    body: bytes
+    exchange: str
+    routing_key: str
+    properties: dict = field(default_factory=dict)
+    redelivered: bool = False
+
+
+class MemoryQueue:
+    """
+    FIFO message buffer owned by a MemoryBroker.
+
+    Args:
+        name (str): The queue name.
+        exclusive (bool): Whether the queue is deleted together with its owner.
+        arguments (dict, optional): Queue arguments, kept for inspection.
+    """
+
+    def __init__(self, name: str, exclusive: bool = False, arguments: dict = None):
+        self.name = name
+        self.exclusive = exclusive
+        self.arguments = arguments or {}
+        self._messages = deque()
+        self._condition = threading.Condition()
+        self._deleted = False
+
+    def __len__(self):
+        return len(self._messages)
+
+    def put(self, message: MemoryMessage, front: bool = False):
+        with self._condition:
+            if self._deleted:
+                return
+            if front:
+                self._messages.appendleft(message)
+            else:
+                self._messages.append(message)
+            self._condition.notify()
+
+    def get(self, timeout: float | None = None) -> MemoryMessage | None:
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._messages or self._deleted, timeout=timeout
+            )
+            if self._messages:
+                return self._messages.popleft()
+            return None
+
+    def remove(self, message: MemoryMessage) -> bool:
+        with self._condition:
+            try:
+                self._messages.remove(message)
+                return True
+            except ValueError:
+                return False
+
+    def delete(self):
+        with self._condition:
+            self._deleted = True
+            self._messages.clear()
+            self._condition.notify_all()
+
+
+class MemoryConsumer:
+    """
+    Consumer attached to a MemoryQueue with RabbitMQ-like prefetch and acks.
+
+    At most ``prefetch_count`` delivered messages can be unacknowledged at a time;
+    ``get`` blocks until an ack frees a slot. A ``prefetch_count`` of 0 means unlimited.
+
+    Args:
+        queue (MemoryQueue): The queue to consume from.
+        prefetch_count (int): Maximum number of unacknowledged deliveries.
+    """
+
+    def __init__(self, queue: MemoryQueue, prefetch_count: int = 0):
+        self.queue = queue
+        self.prefetch_count = prefetch_count
+        self._unacked = {}
+        self._tags = itertools.count(1)
+        self._condition = threading.Condition()
+
+    def get(self, timeout: float | None = None) -> tuple[int, MemoryMessage] | None:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            has_credit = self._condition.wait_for(
+                lambda: (
+                    not self.prefetch_count or len(self._unacked) < self.prefetch_count
+                ),
+                timeout=timeout,
+            )
+        if not has_credit:
+            return None
+        remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+        message = self.queue.get(remaining)
+        if message is None:
+            return None
+        with self._condition:
+            delivery_tag = next(self._tags)
+            self._unacked[delivery_tag] = message
+        return delivery_tag, message
+
+    def ack(self, delivery_tag: int):
+        with self._condition:
+            self._unacked.pop(delivery_tag, None)
+            self._condition.notify()
+
+    def nack(self, delivery_tag: int, requeue: bool = True):
+        with self._condition:
+            message = self._unacked.pop(delivery_tag, None)
+            self._condition.notify()
+        if message is not None and requeue:
+            message.redelivered = True
+            self.queue.put(message, front=True)
+
+
+class MemoryBroker:
+    """
+    In-process stand-in for a RabbitMQ virtual host.
+
+    Implements the subset of AMQP used by the communication package: the default,
+    direct, fanout and topic exchanges, queue bindings, exclusive queues and consumers
+    with prefetch. Queues support message TTL with dead-lettering through the
+    ``x-message-ttl``, ``x-dead-letter-exchange`` and ``x-dead-letter-routing-key``
+    arguments. Brokers are looked up by URL, so every ``memory://<name>`` URL in one
+    process shares the same exchanges and queues.
+
+    Attributes:
+        name (str): The broker name taken from the URL.
+    """
+
+    _brokers = {}
+    _brokers_lock = threading.Lock()
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self._exchanges = {}
+        self._bindings = {}
+        self._queues = {}
+        self._lock = threading.RLock()
+        self._expirations = []
+        self._expiration_seq = itertools.count()
+        self._expiration_condition = threading.Condition()
+        self._expiration_thread = None
+
+    @classmethod
+    def from_url(cls, url: str) -> "MemoryBroker":
+        """
+        Get the broker registered for the given ``memory://`` URL, creating it on first use.
+
+        Args:
+            url (str): The broker URL.
+
+        Returns:
+            MemoryBroker: The shared broker instance.
+        """
+        parsed = urlparse(url)
+        name = (parsed.netloc + parsed.path).strip("/")
+        with cls._brokers_lock:
+            if name not in cls._brokers:
+                cls._brokers[name] = cls(name)
+            return cls._brokers[name]
+
+    @classmethod
+    def reset(cls):
+        """
+        Drop all registered brokers together with their exchanges and queues.
+        """
+        with cls._brokers_lock:
+            for broker in cls._brokers.values():
+                for queue in list(broker._queues.values()):
+                    queue.delete()
+            cls._brokers = {}
+
+    def exchange_declare(self, exchange: str, exchange_type: str = "direct"):
+        if exchange_type not in ("direct", "fanout", "topic"):
+            raise ValueError(f"Unsupported exchange type {exchange_type}")
+        with self._lock:
+            declared = self._exchanges.setdefault(exchange, exchange_type)
+            if declared != exchange_type:
+                raise ValueError(
+                    f"Exchange {exchange} already declared as {declared}, not {exchange_type}"
+                )
+            self._bindings.setdefault(exchange, [])
+
+    def queue_declare(
+        self, queue: str, exclusive: bool = False, arguments: dict = None
+    ) -> MemoryQueue:
+        with self._lock:
+            if queue not in self._queues:
+                self._queues[queue] = MemoryQueue(queue, exclusive, arguments)
+            return self._queues[queue]
+
+    def queue_bind(self, queue: str, exchange: str, routing_key: str = ""):
+        with self._lock:
+            if exchange not in self._exchanges:
+                raise ValueError(f"Exchange {exchange} is not declared")
+            if queue not in self._queues:
+                raise ValueError(f"Queue {queue} is not declared")
+            binding = (queue, routing_key)
+            if binding not in self._bindings[exchange]:
+                self._bindings[exchange].append(binding)
+
+    def queue_delete(self, queue: str):
+        with self._lock:
+            memory_queue = self._queues.pop(queue, None)
+            for exchange, bindings in self._bindings.items():
+                self._bindings[exchange] = [b for b in bindings if b[0] != queue]
+        if memory_queue is not None:
+            memory_queue.delete()
+
+    def get_queue(self, queue: str) -> MemoryQueue | None:
+        return self._queues.get(queue)
+
+    def consume(self, queue: str, prefetch_count: int = 0) -> MemoryConsumer:
+        with self._lock:
+            if queue not in self._queues:
+                raise ValueError(f"Queue {queue} is not declared")
+            return MemoryConsumer(self._queues[queue], prefetch_count)
+
+    def publish(
+        self,
+        exchange: str,
+        routing_key: str,
+        body: bytes,
+        properties: dict = None,
+    ) -> int:
+        """
+        Route a message to every queue bound to the exchange.
+
+        Messages published to an exchange without matching bindings are dropped,
+        as RabbitMQ does for unroutable messages.
+
+        Args:
+            exchange (str): The exchange name.
+            routing_key (str): The routing key.
+            body (bytes): The encoded message.
+            properties (dict, optional): Message properties such as correlation_id.
+
+        Returns:
+            int: The number of queues the message was delivered to.
+        """
+        with self._lock:
+            if exchange == "":
+                # Default exchange routes straight to the queue named by the routing key
+                queue = self._queues.get(routing_key)
+                queues = [queue] if queue is not None else []
+            else:
+                exchange_type = self._exchanges.get(exchange)
+                if exchange_type is None:
+                    raise ValueError(f"Exchange {exchange} is not declared")
+                queues = [
+                    self._queues[queue]
+                    for queue, binding_key in self._bindings[exchange]
+                    if self._matches(exchange_type, binding_key, routing_key)
+                ]
+        for queue in queues:
+            message = MemoryMessage(
+                body=body,
+                exchange=exchange,
+                routing_key=routing_key,
+                properties=dict(properties or {}),
+            )
+            queue.put(message)
+            ttl = queue.arguments.get("x-message-ttl")
+            if ttl is not None:
+                self._schedule_expiration(queue, message, ttl / 1000)
+        return len(queues)
+
+    def _schedule_expiration(self, queue: MemoryQueue, message: MemoryMessage, ttl):
+        with self._expiration_condition:
+            heapq.heappush(
+                self._expirations,
+                (time.monotonic() + ttl, next(self._expiration_seq), queue, message),
+            )
+            if self._expiration_thread is None:
+                self._expiration_thread = threading.Thread(
+                    target=self._expire_messages,
+                    name=f"memory-broker-{self.name}-ttl",
+                    daemon=True,
+                )
+                self._expiration_thread.start()
+            self._expiration_condition.notify()
+
+    def _expire_messages(self):
+        while True:
+            with self._expiration_condition:
+                while (
+                    not self._expirations or self._expirations[0][0] > time.monotonic()
+                ):
+                    timeout = (
+                        self._expirations[0][0] - time.monotonic()
+                        if self._expirations
+                        else None
+                    )
+                    self._expiration_condition.wait(timeout)
+                _, _, queue, message = heapq.heappop(self._expirations)
+            if queue.remove(message):
+                self._dead_letter(queue, message)
+
+    def _dead_letter(self, queue: MemoryQueue, message: MemoryMessage):
+        exchange = queue.arguments.get("x-dead-letter-exchange")
+        if exchange is None:
+            return
+        routing_key = queue.arguments.get(
+            "x-dead-letter-routing-key", message.routing_key
+        )
+        try:
+            self.publish(exchange, routing_key, message.body, message.properties)
+        except ValueError as e:
+            logger.warning(f"Dead letter from queue {queue.name} dropped. Error {e}")
+
+    @staticmethod
+    def _matches(exchange_type: str, binding_key: str, routing_key: str) -> bool:
+        if exchange_type == "fanout":
+            return True
+        if exchange_type == "direct":
+            return binding_key == routing_key
+        return _topic_matches(binding_key.split("."), routing_key.split("."))
+
+
+def _topic_matches(binding_words: list[str], routing_words: list[str]) -> bool:
+    if not binding_words:
+        return not routing_words
+    word, rest = binding_words[0], binding_words[1:]
+    if word == "#":
+        return any(
+            _topic_matches(rest, routing_words[i:])
+            for i in range(len(routing_words) + 1)
+        )
+    if not routing_words or word not in ("*", routing_words[0]):
+        return False
+    return _topic_matches(rest, routing_words[1:])
+
+
+def _build_message(data, source: str, destination: str, corr_id: str) -> bytes:
+    return orjson.dumps(
+        {
+            "meta": {
+                "timestamp": dt.datetime.now().isoformat(),
+                "source": source,
+                "destination": destination,
+                "correlationId": corr_id,
+            },
+            "data": data,
+        }
+    )
+
+
+class MemoryPublisher:
+    """In-memory counterpart of rabbitmqpubsub Publisher."""
+
+    EXCHANGE_TYPE = "direct"
+
+    def __init__(self, amqp_url: str):
+        self.broker = MemoryBroker.from_url(amqp_url)
+
+    def publish_message(self, data, destination, source, corr_id=None):
+        if not corr_id:
+            corr_id = str(uuid.uuid4())
+        self.broker.exchange_declare(destination, self.EXCHANGE_TYPE)
+        self.broker.publish(
+            destination,
+            "",
+            _build_message(data, source, destination, corr_id),
+            {"content_type": "application/json", "correlation_id": corr_id},
+        )
+
+
+class MemoryRpcClient:
+    """In-memory counterpart of rabbitmqpubsub RpcClient."""
+
+    EXCHANGE_TYPE = "direct"
+    ROUTING_KEY = ""
+
+    def __init__(self, amqp_url, exchange, queue, timeout=30):
+        self.broker = MemoryBroker.from_url(amqp_url)
+        self.EXCHANGE = exchange
+        self.QUEUE = queue
+        self.timeout = timeout
+        self.response = None
+
+    def connect(self):
+        self.broker.exchange_declare(self.EXCHANGE, self.EXCHANGE_TYPE)
+        self.broker.queue_declare(self.QUEUE, exclusive=True)
+        self.broker.queue_bind(self.QUEUE, self.EXCHANGE, self.ROUTING_KEY)
+        self.callback_queue = self.QUEUE
+        self.consumer = self.broker.consume(self.callback_queue)
+
+    def disconnect(self):
+        self.broker.queue_delete(self.callback_queue)
+
+    def _is_response(self, message: MemoryMessage) -> bool:
+        json_body = orjson.loads(message.body)
+        if (
+            self.corr_id == message.properties.get("correlation_id")
+            or self.corr_id == json_body["meta"]["correlationId"]
+        ):
+            self.response = json_body
+            return True
+        return False
+
+    def publish(
+        self,
+        data,
+        recipient,
+        routing_key="",
+        exchange_type="direct",
+        wait_response=True,
+    ):
+        self.broker.exchange_declare(recipient, exchange_type)
+        self.broker.publish(
+            recipient,
+            routing_key,
+            _build_message(data, self.EXCHANGE, recipient, self.corr_id),
+            {
+                "reply_to": self.callback_queue if wait_response else None,
+                "correlation_id": self.corr_id,
+            },
+        )
+
+    def call(
+        self, data, recipient, corr_id=None, routing_key="", exchange_type="direct"
+    ):
+        self.response = None
+        self.connect()
+        self.corr_id = corr_id if corr_id else str(uuid.uuid4())
+        try:
+            self.publish(data, recipient, routing_key, exchange_type)
+            deadline = time.monotonic() + self.timeout
+            while self.response is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise Exception("Timeout occured waiting for response.")
+                delivery = self.consumer.get(timeout=remaining)
+                if delivery and self._is_response(delivery[1]):
+                    self.consumer.ack(delivery[0])
+        finally:
+            self.disconnect()
+        return self.response
+
+
+class AsyncMemoryRpcClient(MemoryRpcClient):
+    """In-memory counterpart of rabbitmqpubsub AsyncRpcClient."""
+
+    async def call(
+        self,
+        data,
+        recipient,
+        corr_id=None,
+        routing_key="",
+        exchange_type="direct",
+        wait_response=True,
+    ):
+        self.response = None
+        self.connect()
+        self.corr_id = corr_id if corr_id else str(uuid.uuid4())
+        try:
+            self.publish(data, recipient, routing_key, exchange_type, wait_response)
+            if not wait_response:
+                return True
+            deadline = time.monotonic() + self.timeout
+            while self.response is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                delivery = await asyncio.to_thread(self.consumer.get, remaining)
+                if delivery and self._is_response(delivery[1]):
+                    self.consumer.ack(delivery[0])
+        finally:
+            self.disconnect()
+        return self.response
+
+
+class MemorySubscriber(threading.Thread):
+    """
+    In-memory counterpart of rabbitmqpubsub Subscriber.
+
+    Declares the exchange and a durable queue bound to it, then dispatches every
+    delivery to the subscribed observers' ``handle`` method. With ``async_processing``
+    up to ``max_threads`` messages are processed concurrently, which is also the
+    consumer prefetch, otherwise messages are processed one at a time.
+    """
+
+    EXCHANGE_TYPE = "direct"
+    ROUTING_KEY = ""
+    POLL_INTERVAL = 0.1
+
+    def __init__(
+        self,
+        amqp_url,
+        exchange=None,
+        exchange_type=None,
+        queue=None,
+        async_processing=True,
+        max_threads=10,
+        **kwargs,
+    ):
+        threading.Thread.__init__(self)
+        self.broker = MemoryBroker.from_url(amqp_url)
+        self.EXCHANGE = str(exchange) if exchange else ""
+        self.EXCHANGE_TYPE = str(exchange_type) if exchange_type else self.EXCHANGE_TYPE
+        self.QUEUE = str(queue) if queue else ""
+        self.async_processing = async_processing
+        self.prefetch_count = max_threads if async_processing else 1
+        if async_processing:
+            self.executor = ThreadPoolExecutor(max_workers=max_threads)
+        self._observers = []
+        self._closing = threading.Event()
+        self.ready = threading.Event()
+
+    def subscribe(self, observer):
+        handle_func = getattr(observer, "handle", None)
+        if not handle_func or not callable(handle_func):
+            raise Exception("Class has to implement handle(self, body) function")
+        self._observers.append(observer)
+
+    def setup(self):
+        self.broker.exchange_declare(self.EXCHANGE, self.EXCHANGE_TYPE)
+        self.broker.queue_declare(self.QUEUE)
+        self.broker.queue_bind(self.QUEUE, self.EXCHANGE, self.ROUTING_KEY)
+        self.consumer = self.broker.consume(self.QUEUE, self.prefetch_count)
+        self.ready.set()
+
+    def process_message(self, delivery_tag: int, message: MemoryMessage):
+        try:
+            json_body = orjson.loads(message.body)
+            json_body["message_meta"] = {
+                "routing_key": message.routing_key,
+                "redelivered": message.redelivered,
+                "exchange": message.exchange,
+                "delivery_tag": delivery_tag,
+                "counsumer_tag": self.name,
+            }
+            for observer in self._observers:
+                observer.handle(json_body)
+        except Exception as e:
+            logger.warning(
+                "Object is not json, proceding without message meta. Error {}".format(
+                    str(e)
+                )
+            )
+        finally:
+            self.consumer.ack(delivery_tag)
+
+    def run(self):
+        self.setup()
+        while not self._closing.is_set():
+            delivery = self.consumer.get(timeout=self.POLL_INTERVAL)
+            if delivery is None:
+                continue
+            if self.async_processing:
+                self.executor.submit(self.process_message, *delivery)
+            else:
+                self.process_message(*delivery)
+        logger.info("Exiting...")
+
+    def stop(self):
+        logger.info("Stopping ...")
+        self._closing.set()
+        if self.async_processing:
+            self.executor.shutdown(wait=True)
@@ -0,0 +1,106 @@
+import bisect
+import hashlib
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big"
+    )
+
+
+class ConsistentHashRing:
+    """
+    Consistent hash ring mapping keys onto a fixed set of partitions.
+
+    Every partition is placed on the ring ``virtual_nodes`` times so keys spread
+    evenly, and changing the number of partitions only moves the keys of the
+    partitions that were added or removed. The hash is stable across processes.
+
+    Args:
+        partitions (int): Number of partitions, numbered from 0.
+        virtual_nodes (int): Number of ring positions per partition.
+    """
+
+    def __init__(self, partitions: int, virtual_nodes: int = 100):
+        if partitions < 1:
+            raise ValueError("Number of partitions must be at least 1")
+        self.partitions = partitions
+        self.virtual_nodes = virtual_nodes
+        ring = sorted(
+            (_hash(f"partition-{partition}#{node}"), partition)
+            for partition in range(partitions)
+            for node in range(virtual_nodes)
+        )
+        self._hashes = [point for point, _ in ring]
+        self._partitions = [partition for _, partition in ring]
+
+    def get_partition(self, key) -> int:
+        index = bisect.bisect(self._hashes, _hash(str(key))) % len(self._hashes)
+        return self._partitions[index]
+
+
+@lru_cache(maxsize=32)
+def get_ring(partitions: int, virtual_nodes: int = 100) -> ConsistentHashRing:
+    return ConsistentHashRing(partitions, virtual_nodes)
+
+
+def partition_name(name: str, partition: int) -> str:
+    """
+    Name of the exchange or queue serving one partition of ``name``.
+    """
+    return f"{name}_p{partition}"
+
+
+def owned_partitions(
+    partitions: int, replica_index: int, replica_count: int
+) -> list[int]:
+    """
+    Partitions consumed by one replica when ``partitions`` are split across ``replica_count``.
+
+    Replica ``i`` takes the partitions ``p`` with ``p % replica_count == i``. Every replica
+    must be started with the same ``replica_count``: with differing counts two replicas
+    consume the same partition queue and per-key ordering is lost. Changing the count
+    moves most partitions to another replica, so resize by restarting all replicas.
+    """
+    if not 0 <= replica_index < replica_count:
+        raise ValueError(
+            f"Replica index {replica_index} out of range for {replica_count} replicas"
+        )
+    return [p for p in range(partitions) if p % replica_count == replica_index]
+
+
+def partition_for_request(
+    request_data: dict, partition_key: str, partitions: int, fallback: str
+) -> int:
+    """
+    Pick the partition for a message from the ``partition_key`` value of its request.
+
+    The value is read from ``request_data["request"]`` and then from ``request_data``.
+    Messages without the key are spread by ``fallback``, usually the correlation id,
+    and therefore have no ordering guarantee.
+
+    Args:
+        request_data (dict): The message data.
+        partition_key (str): Name of the field identifying the entity.
+        partitions (int): Number of partitions.
+        fallback (str): Value hashed when the key is missing.
+
+    Returns:
+        int: The partition number.
+    """
+    request = request_data.get("request") if isinstance(request_data, dict) else None
+    value = None
+    if isinstance(request, dict):
+        value = request.get(partition_key)
+    if value is None and isinstance(request_data, dict):
+        value = request_data.get(partition_key)
+    if value is None:
+        logger.warning(
+            f"Partition key {partition_key} missing from request, routing by {fallback}"
+        )
+        value = fallback
+    return get_ring(partitions).get_partition(value)
@@ -0,0 +1,104 @@
+import datetime as dt
+import logging
+from dataclasses import dataclass
+
+import orjson
+import pika
+
+from .memory_broker import is_memory_url, MemoryBroker
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Bounded retry schedule for messages whose handler failed unexpectedly.
+
+    Attempt ``n`` waits ``base_delay * multiplier ** (n - 1)`` seconds, capped by
+    ``max_delay``. Messages failing after ``max_retries`` retries are quarantined.
+
+    Attributes:
+        max_retries (int): Number of retries before quarantine.
+        base_delay (float): Delay before the first retry in seconds.
+        multiplier (float): Growth factor of the delay between attempts.
+        max_delay (float): Upper bound of the delay in seconds.
+    """
+
+    max_retries: int = 3
+    base_delay: float = 1.0
+    multiplier: float = 2.0
+    max_delay: float = 300.0
+
+    def delay(self, attempt: int) -> float:
+        return min(self.base_delay * self.multiplier ** (attempt - 1), self.max_delay)
+
+
+def retry_queue_name(exchange: str, delay: float) -> str:
+    return f"{exchange}_retry_{int(delay * 1000)}ms"
+
+
+def quarantine_queue_name(exchange: str) -> str:
+    return f"{exchange}_quarantine"
+
+
+def publish_to_queue(
+    rabbit_url: str, queue: str, message: dict, arguments: dict | None = None
+):
+    """
+    Declare a durable queue and publish the message to it through the default exchange.
+
+    Args:
+        rabbit_url (str): The RabbitMQ URL, or a ``memory://`` URL.
+        queue (str): The queue name.
+        message (dict): The message with ``meta`` and ``data``.
+        arguments (dict, optional): Queue arguments such as ``x-message-ttl``.
+    """
+    body = orjson.dumps(message)
+    corr_id = message.get("meta", {}).get("correlationId")
+    if is_memory_url(rabbit_url):
+        broker = MemoryBroker.from_url(rabbit_url)
+        broker.queue_declare(queue, arguments=arguments)
+        broker.publish("", queue, body, {"correlation_id": corr_id})
+        return
+    connection = pika.BlockingConnection(pika.URLParameters(rabbit_url))
+    try:
+        channel = connection.channel()
+        channel.queue_declare(queue=queue, durable=True, arguments=arguments)
+        channel.basic_publish(
+            exchange="",
+            routing_key=queue,
+            body=body,
+            properties=pika.BasicProperties(
+                content_type="application/json",
+                correlation_id=corr_id,
+                delivery_mode=2,
+            ),
+        )
+    finally:
+        connection.close()
+
+
+def schedule_retry(message: dict, exchange: str, delay: float, rabbit_url: str):
+    """
+    Park the message in a TTL queue that dead-letters it back to the exchange after ``delay``.
+    """
+    publish_to_queue(
+        rabbit_url,
+        retry_queue_name(exchange, delay),
+        message,
+        arguments={
+            "x-message-ttl": int(delay * 1000),
+            "x-dead-letter-exchange": exchange,
+            "x-dead-letter-routing-key": "",
+        },
+    )
+
+
+def quarantine(message: dict, exchange: str, error: str, rabbit_url: str):
+    """
+    Move the message to the quarantine queue of the exchange for manual inspection.
+    """
+    message["meta"]["error"] = error
+    message["meta"]["quarantinedAt"] = dt.datetime.now().isoformat()
+    publish_to_queue(rabbit_url, quarantine_queue_name(exchange), message)
@@ -1,5 +1,7 @@
 from rabbitmqpubsub.rabbit_pubsub import Publisher, AsyncRpcClient
 from mrkutil.utilities import random_string, RequestData
+from .memory_broker import is_memory_url, MemoryPublisher, AsyncMemoryRpcClient
+from .partition import partition_for_request, partition_name
 import logging
 import uuid
 import os
@@ -13,6 +15,8 @@ def trigger_service(
     source: str,
     corr_id: str | None = None,
     rabbit_url: str = os.getenv("RABBIT_URL"),
+    partition_key: str | None = None,
+    partitions: int = 0,
 ):
     """
     Sends a message to a RabbitMQ queue using the provided
@@ -24,13 +28,23 @@ def trigger_service(
         source (str): The source of the message.
         corr_id (str, optional): The correlation ID for the message. Defaults to "none".
         rabbit_url (str, optional): The RabbitMQ URL. Defaults to the value of the RABBIT_URL environment variable.
+            A ``memory://`` URL uses the in-process MemoryBroker instead of RabbitMQ.
+        partition_key (str, optional): Request field hashed to pick the destination partition.
+        partitions (int, optional): Number of partitions of a destination started with
+            ``listen(partitions=...)``. Defaults to 0, meaning not partitioned.
 
     Returns:
         bool: True if the message was successfully sent, False otherwise.
     """
     if not corr_id:
         corr_id = str(uuid.uuid4())
-    Publisher(rabbit_url).publish_message(
+    if partition_key and partitions:
+        destination = partition_name(
+            destination,
+            partition_for_request(request_data, partition_key, partitions, corr_id),
+        )
+    publisher = MemoryPublisher if is_memory_url(rabbit_url) else Publisher
+    publisher(rabbit_url).publish_message(
         data=request_data, destination=destination, source=source, corr_id=corr_id
     )
 
@@ -41,10 +55,18 @@ async def atrigger_service(
     source: str,
     corr_id: str | None = None,
     rabbit_url: str = os.getenv("RABBIT_URL"),
+    partition_key: str | None = None,
+    partitions: int = 0,
 ):
     if not corr_id:
         corr_id = str(uuid.uuid4())
-    rpc = AsyncRpcClient(
+    if partition_key and partitions:
+        destination = partition_name(
+            destination,
+            partition_for_request(request_data, partition_key, partitions, corr_id),
+        )
+    rpc_client = AsyncMemoryRpcClient if is_memory_url(rabbit_url) else AsyncRpcClient
+    rpc = rpc_client(
         amqp_url=rabbit_url,
         exchange=source,
         queue="temp_{}".format(random_string(6)),
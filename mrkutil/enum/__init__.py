@@ -1,3 +1,10 @@
 from .job import JobStatusEnum
+from .handler import HandlerLifecycleEnum, MiddlewareKindEnum
+from .cache import CompressionAlgorithmEnum
 
-__all__ = ["JobStatusEnum"]
+__all__ = [
+    "JobStatusEnum",
+    "HandlerLifecycleEnum",
+    "MiddlewareKindEnum",
+    "CompressionAlgorithmEnum",
+]
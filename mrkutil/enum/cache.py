@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class CompressionAlgorithmEnum(str, Enum):
+    ZLIB = "ZLIB"
+    ZSTD = "ZSTD"
+    LZ4 = "LZ4"
@@ -0,0 +1,13 @@
+from enum import Enum
+
+
+class HandlerLifecycleEnum(str, Enum):
+    TRANSIENT = "TRANSIENT"
+    SINGLETON = "SINGLETON"
+    POOLED = "POOLED"
+
+
+class MiddlewareKindEnum(str, Enum):
+    BEFORE = "BEFORE"
+    AFTER = "AFTER"
+    AROUND = "AROUND"
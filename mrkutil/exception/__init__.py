@@ -1,3 +1,4 @@
 from .service_exception import ServiceException
+from .handler_timeout_exception import HandlerTimeoutException
 
-__all__ = ["ServiceException"]
+__all__ = ["ServiceException", "HandlerTimeoutException"]
@@ -0,0 +1,11 @@
+from .service_exception import ServiceException
+
+
+class HandlerTimeoutException(ServiceException):
+    def __init__(
+        self,
+        message: str = "Handler execution timed out.",
+        errors: dict = {},
+        code: int = 504,
+    ) -> None:
+        super().__init__(message=message, errors=errors, code=code)
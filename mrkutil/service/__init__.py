@@ -1,4 +1,5 @@
 from .run import run_service
+from .startup import StartupReport, warm_up_hook
 
 
-__all__ = ["run_service"]
+__all__ = ["run_service", "StartupReport", "warm_up_hook"]
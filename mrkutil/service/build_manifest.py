@@ -0,0 +1,26 @@
+import argparse
+import sys
+
+from mrkutil.base import BaseHandler, HandlerManifest
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m mrkutil.service.build_manifest",
+        description="Record which module defines the handler of every method.",
+    )
+    parser.add_argument("package", nargs="?", default="package.app.handlers")
+    parser.add_argument("--output", default="handlers_manifest.json")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    manifest = HandlerManifest.build(args.package, BaseHandler)
+    manifest.save(args.output)
+    print(f"Wrote {len(manifest)} handlers to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
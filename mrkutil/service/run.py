@@ -1,9 +1,12 @@
 import os
 import sys
+import orjson
+from mrkutil.base import BaseHandler
 from mrkutil.utilities import import_all_subclasses_from_package, register_service_pid
 from mrkutil.communication import listen
 from typing import Callable
 import logging
+from .startup import StartupReport, WARM_UP_HOOKS, run_warm_up_hooks
 
 logger = logging.getLogger(__name__)
 
@@ -14,11 +17,33 @@ def __run_service_prod(
     queue: str,
     max_threads: int,
     on_message_processing_complete: Callable = None,
+    handlers_manifest: str = None,
+    preload_handlers: bool = True,
+    profile_startup: bool = False,
+    warm_up_workers: int = 4,
 ):
     """
     Service starting point
     """
-    import_all_subclasses_from_package("package.app.handlers")
+    report = StartupReport()
+    use_manifest = bool(handlers_manifest) and os.path.isfile(handlers_manifest)
+    with report.phase("import_handlers"):
+        if use_manifest:
+            BaseHandler.use_manifest(handlers_manifest, preload=preload_handlers)
+        else:
+            import_all_subclasses_from_package(
+                "package.app.handlers",
+                import_times=report.imports if profile_startup else None,
+            )
+    with report.phase("build_registry"):
+        if not use_manifest:
+            BaseHandler.initialize()
+        BaseHandler.get_registry()
+    with report.phase("warm_up"):
+        # Handler instances are created by listen, which warms up the registry it consumes with
+        run_warm_up_hooks(WARM_UP_HOOKS, max_workers=warm_up_workers, report=report)
+    if profile_startup:
+        logger.info(f"Startup report: {orjson.dumps(report.as_dict()).decode()}")
     pidfile = register_service_pid(exchange)
     try:
         logger.info("Starting ...")
@@ -40,13 +65,25 @@ def __run_service_develop(
     queue: str,
     max_threads: int,
     on_message_processing_complete: Callable = None,
+    handlers_manifest: str = None,
+    preload_handlers: bool = True,
+    profile_startup: bool = False,
+    warm_up_workers: int = 4,
 ):
     """
     Service starting point with watchfiles
     """
     try:
         __run_service_prod(
-            exchange, exchange_type, queue, max_threads, on_message_processing_complete
+            exchange,
+            exchange_type,
+            queue,
+            max_threads,
+            on_message_processing_complete,
+            handlers_manifest,
+            preload_handlers,
+            profile_startup,
+            warm_up_workers,
         )
     except KeyboardInterrupt:
         logger.info("Detecting changes, reloading..")
@@ -60,6 +97,10 @@ def run_service(
     max_threads: int,
     on_message_processing_complete: Callable = None,
     root_package: str = "package",
+    handlers_manifest: str = None,
+    preload_handlers: bool = True,
+    profile_startup: bool = False,
+    warm_up_workers: int = 4,
 ):
     """
     Run service in develop mode or production mode.
@@ -72,6 +113,13 @@ def run_service(
     - max_threads (int): Max number of threads; start with 5 and increase if needed.
     - on_message_processing_complete (Callable): Optional callback.
     - root_package (str): Root package name.
+    - handlers_manifest (str): Optional path of a manifest written by
+      `python -m mrkutil.service.build_manifest`; handler modules are then imported
+      on first use instead of at startup. Ignored if the file does not exist.
+    - preload_handlers (bool): With a manifest, import all handler modules in the background.
+    - profile_startup (bool): Log a startup report with the time spent in each phase
+      and the slowest handler module imports.
+    - warm_up_workers (int): Threads running the `warm_up_hook` functions before consuming.
     """
     if develop:
         try:
@@ -83,11 +131,21 @@ def run_service(
             )
             logger.info("Falling back to production mode...")
             __run_service_prod(
-                exchange, exchange_type, queue, max_threads, on_message_processing_complete
+                exchange,
+                exchange_type,
+                queue,
+                max_threads,
+                on_message_processing_complete,
+                handlers_manifest,
+                preload_handlers,
+                profile_startup,
+                warm_up_workers,
             )
             return
 
-        logger.info("Running in development mode with watchfiles. Watching for changes...")
+        logger.info(
+            "Running in development mode with watchfiles. Watching for changes..."
+        )
         run_process(
             root_package,
             target=__run_service_develop,
@@ -97,9 +155,21 @@ def run_service(
                 queue,
                 max_threads,
                 on_message_processing_complete,
+                handlers_manifest,
+                preload_handlers,
+                profile_startup,
+                warm_up_workers,
             ),
         )
     else:
         __run_service_prod(
-            exchange, exchange_type, queue, max_threads, on_message_processing_complete
+            exchange,
+            exchange_type,
+            queue,
+            max_threads,
+            on_message_processing_complete,
+            handlers_manifest,
+            preload_handlers,
+            profile_startup,
+            warm_up_workers,
         )
@@ -0,0 +1,101 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+WARM_UP_HOOKS: list[Callable] = []
+
+
+def warm_up_hook(func: Callable) -> Callable:
+    """
+    Register a function run by `run_service` before consuming messages,
+    e.g. to open connection pools or prime caches.
+
+    Hooks run concurrently on a thread pool; a failing hook is logged and does not stop the service.
+    """
+    WARM_UP_HOOKS.append(func)
+    return func
+
+
+class StartupReport:
+    """
+    Time spent in each startup phase of a service.
+
+    Attributes:
+        phases (dict[str, float]): Duration of each phase in seconds.
+        imports (dict[str, float]): Import duration of each handler module in seconds,
+            including the modules it imports first.
+        hooks (dict[str, float]): Duration of each warm-up hook in seconds.
+        failed_hooks (list[str]): Warm-up hooks that raised.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.imports = {}
+        self.hooks = {}
+        self.failed_hooks = []
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def as_dict(self, slowest: int = 10) -> dict:
+        return {
+            "total": round(sum(self.phases.values()), 4),
+            "phases": {name: round(x, 4) for name, x in self.phases.items()},
+            "slowest_imports": {
+                name: round(x, 4)
+                for name, x in sorted(
+                    self.imports.items(), key=lambda item: item[1], reverse=True
+                )[:slowest]
+            },
+            "hooks": {name: round(x, 4) for name, x in self.hooks.items()},
+            "failed_hooks": self.failed_hooks,
+        }
+
+
+def _hook_name(hook: Callable) -> str:
+    return f"{hook.__module__}.{getattr(hook, '__qualname__', repr(hook))}"
+
+
+def run_warm_up_hooks(
+    hooks: list[Callable], max_workers: int = 4, report: StartupReport | None = None
+):
+    """
+    Run warm-up hooks concurrently and wait for all of them.
+
+    Args:
+        hooks (list[Callable]): Functions without arguments.
+        max_workers (int, optional): Size of the thread pool. Defaults to 4.
+        report (StartupReport, optional): Records the duration of every hook.
+    """
+    if not hooks:
+        return
+
+    def run(hook):
+        start = time.perf_counter()
+        try:
+            hook()
+            return None
+        except Exception as e:
+            logger.exception(f"Warm-up hook {_hook_name(hook)} failed: {e}")
+            return e
+        finally:
+            if report is not None:
+                report.hooks[_hook_name(hook)] = time.perf_counter() - start
+
+    with ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="warm-up"
+    ) as executor:
+        errors = list(executor.map(run, hooks))
+    if report is not None:
+        report.failed_hooks.extend(
+            _hook_name(hook) for hook, error in zip(hooks, errors) if error is not None
+        )
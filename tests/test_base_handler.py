@@ -95,11 +95,12 @@ def setup_handlers():
 def test_handler_registration():
     """Test that handlers are properly registered during initialization."""
 
-    assert "test_handler" in BaseHandler.sub_classes
-    assert "another_handler" in BaseHandler.sub_classes
-    assert "exception_handler" in BaseHandler.sub_classes
-    assert BaseHandler.sub_classes["test_handler"] == TestHandler
-    assert BaseHandler.sub_classes["another_handler"] == AnotherHandler
+    registry = BaseHandler.get_registry()
+    assert "test_handler" in registry
+    assert "another_handler" in registry
+    assert "exception_handler" in registry
+    assert registry["test_handler"] == TestHandler
+    assert registry["another_handler"] == AnotherHandler
 
 
 def test_process_data_with_valid_handler():
@@ -1,7 +1,10 @@
 import os
+import orjson
 import pytest
 import pytest_asyncio
 from mrkutil.cache.base_redis import RedisBase, AsyncRedisBase
+from mrkutil.cache.compression import CompressionCodec
+from mrkutil.cache.serialization import RawCodec
 
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 
@@ -102,3 +105,308 @@ async def test_async_redis_base_get_multiple(async_redis_base):
     assert len(results) == 2
     assert results[0]["data"] == 1
     assert results[1]["data"] == 2
+
+
+def test_redis_base_bulk_operations(redis_base):
+    redis_base.set_many(
+        {"bulk1": {"data": 1}, "bulk2": {"data": 2}, "bulk3": {"data": 3}},
+        timeouts={"bulk3": 1},
+        chunk_size=2,
+    )
+
+    assert redis_base.get_many(["bulk1", "missing", "bulk2"], chunk_size=2) == [
+        {"data": 1},
+        None,
+        {"data": 2},
+    ]
+    assert redis_base.get_many(["bulk2", "missing"], as_dict=True) == {
+        "bulk2": {"data": 2},
+        "missing": None,
+    }
+    assert 0 < redis_base.server.ttl("test_base_bulk3") <= 1
+
+    assert redis_base.delete_many(["bulk1", "bulk2", "missing"], chunk_size=2) == 2
+    assert redis_base.get_many(["bulk1", "bulk2"]) == [None, None]
+
+
+@pytest.mark.asyncio
+async def test_async_redis_base_bulk_operations(async_redis_base):
+    await async_redis_base.set_many(
+        {"bulk1": {"data": 1}, "bulk2": {"data": 2}}, chunk_size=1
+    )
+
+    assert await async_redis_base.get_many(["bulk1", "missing", "bulk2"]) == [
+        {"data": 1},
+        None,
+        {"data": 2},
+    ]
+    assert await async_redis_base.delete_many(["bulk1", "bulk2"]) == 2
+    assert await async_redis_base.get_many(["bulk1"], as_dict=True) == {"bulk1": None}
+
+
+def test_redis_base_iter_keys_and_delete_keys(redis_base):
+    redis_base.set_many({f"scan{i}": {"data": i} for i in range(25)})
+    redis_base.set("other", {"data": 0})
+
+    assert sorted(redis_base.iter_keys("scan*", count=10)) == sorted(
+        f"scan{i}" for i in range(25)
+    )
+    assert redis_base.delete_keys("scan*", count=10, chunk_size=7) == 25
+    assert redis_base.search("*") == ["other"]
+
+
+@pytest.mark.asyncio
+async def test_async_redis_base_iter_keys_and_delete_keys(async_redis_base):
+    await async_redis_base.set_many({f"scan{i}": {"data": i} for i in range(25)})
+
+    keys = [key async for key in async_redis_base.iter_keys("scan*", count=10)]
+    assert sorted(keys) == sorted(f"scan{i}" for i in range(25))
+    assert await async_redis_base.delete_keys("scan*", chunk_size=7) == 25
+    assert await async_redis_base.search("scan*") == []
+
+
+def test_redis_base_get_or_set(redis_base):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {"data": len(calls)}
+
+    assert redis_base.get_or_set("computed", loader, ttl=60) == {"data": 1}
+    assert redis_base.get_or_set("computed", loader, ttl=60) == {"data": 1}
+    assert redis_base.get("computed") == {"data": 1}
+    assert len(calls) == 1
+
+
+def test_redis_base_get_or_set_single_loader(redis_base):
+    import threading
+    import time
+
+    calls = []
+    results = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"data": "loaded"}
+
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(
+                redis_base.get_or_set("stampede", loader, ttl=60)
+            )
+        )
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"data": "loaded"}] * 5
+
+
+def test_redis_base_get_or_set_refreshes_early(redis_base):
+    redis_base.get_or_set("early", lambda: {"data": 1}, ttl=60)
+
+    # A huge beta makes XFetch refresh well before expiry
+    assert redis_base.get_or_set("early", lambda: {"data": 2}, ttl=60, beta=1e9) == {
+        "data": 2
+    }
+
+
+@pytest.mark.asyncio
+async def test_async_redis_base_get_or_set(async_redis_base):
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return {"data": "async"}
+
+    assert await async_redis_base.get_or_set("computed", loader, ttl=60) == {
+        "data": "async"
+    }
+    assert await async_redis_base.get_or_set("computed", loader, ttl=60) == {
+        "data": "async"
+    }
+    assert len(calls) == 1
+
+
+def test_redis_base_get_or_set_without_expiry():
+    cache = RedisBase(key="test_base", cache_timeout=0)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {"data": len(calls)}
+
+    try:
+        assert cache.get_or_set("forever", loader) == {"data": 1}
+        assert cache.get_or_set("forever", loader, beta=1e9) == {"data": 1}
+        assert cache.server.ttl("test_base_forever") == -1
+        assert len(calls) == 1
+    finally:
+        cache.delete_keys("*")
+
+
+@pytest.mark.asyncio
+async def test_async_redis_base_get_or_set_without_expiry(async_redis_base):
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return {"data": len(calls)}
+
+    assert await async_redis_base.get_or_set("forever", loader, ttl=0) == {"data": 1}
+    assert await async_redis_base.get_or_set("forever", loader, ttl=0) == {"data": 1}
+    assert await async_redis_base.server.ttl("test_base_forever") == -1
+    assert len(calls) == 1
+
+
+def test_redis_base_hash_tag():
+    cache = RedisBase(key="test_tagged", hash_tag=True)
+    cache.set_many({"a": {"x": 1}, "b": {"x": 2}})
+
+    assert cache.server.get("{test_tagged}_a") is not None
+    assert cache.get_many(["a", "b", "c"]) == [{"x": 1}, {"x": 2}, None]
+    assert sorted(cache.search("*")) == ["a", "b"]
+    assert cache.delete_keys("*") == 2
+
+
+def test_redis_base_scripts(redis_base):
+    redis_base.load_scripts()
+    redis_base.set("job", {"status": "PENDING", "count": 1})
+
+    assert redis_base.compare_and_set("job", "status", "PENDING", {"status": "DONE"})
+    assert not redis_base.compare_and_set(
+        "job", "status", "PENDING", {"status": "LATE"}
+    )
+    assert not redis_base.compare_and_set(
+        "missing", "status", "PENDING", {"status": "X"}
+    )
+    assert redis_base.get("job") == {"status": "DONE"}
+
+    assert redis_base.update_fields("job", {"result": 5}) == {
+        "status": "DONE",
+        "result": 5,
+    }
+    assert redis_base.update_fields("new", {"a": 1}) == {"a": 1}
+    assert 0 < redis_base.server.ttl("test_base_new") <= 86400
+
+    assert redis_base.incr_with_ttl("hits", timeout=60) == 1
+    assert redis_base.incr_with_ttl("hits", amount=2) == 3
+    assert 0 < redis_base.server.ttl("test_base_hits") <= 60
+    assert redis_base.incr_with_ttl("job", amount=1.5, field="result") == 6.5
+    assert redis_base.get("job")["result"] == 6.5
+
+    assert redis_base.set_if_absent("lock", {"owner": "a"}, timeout=10)
+    assert not redis_base.set_if_absent("lock", {"owner": "b"})
+    assert redis_base.get("lock") == {"owner": "a"}
+
+
+def test_redis_base_scripts_require_json_values():
+    compressed = RedisBase(key="test_base", compression=CompressionCodec())
+    raw = RedisBase(key="test_base", codec=RawCodec())
+
+    for cache in (compressed, raw):
+        with pytest.raises(ValueError):
+            cache.compare_and_set("job", "status", "PENDING", {"status": "DONE"})
+        with pytest.raises(ValueError):
+            cache.update_fields("job", {"a": 1})
+        with pytest.raises(ValueError):
+            cache.incr_with_ttl("job", field="a")
+
+
+@pytest.mark.asyncio
+async def test_async_redis_base_scripts(async_redis_base):
+    await async_redis_base.load_scripts()
+    await async_redis_base.set("job", {"status": "PENDING"})
+
+    assert await async_redis_base.compare_and_set(
+        "job", "status", "PENDING", {"status": "DONE"}
+    )
+    assert await async_redis_base.update_fields("job", {"a": 1}) == {
+        "status": "DONE",
+        "a": 1,
+    }
+    assert await async_redis_base.incr_with_ttl("hits") == 1
+    assert await async_redis_base.incr_with_ttl("job", field="a") == 2
+    assert await async_redis_base.set_if_absent("lock", {"owner": "a"})
+    assert not await async_redis_base.set_if_absent("lock", {"owner": "b"})
+
+
+# Script name, initial string values, keys and arguments, run on Redis and on the local twin
+SCRIPT_CASES = [
+    ("compare_and_set", {"k": b'{"s":"A"}'}, ["k"], ["s", b'"A"', b'{"s":"B"}', 0]),
+    ("compare_and_set", {"k": b'{"s":"A"}'}, ["k"], ["s", b'"X"', b'{"s":"B"}', 0]),
+    ("compare_and_set", {"k": b'{"s":null}'}, ["k"], ["s", b"null", b"{}", 60]),
+    ("compare_and_set", {"k": b'{"s":"A"}'}, ["k"], ["t", b"null", b"{}", 0]),
+    ("compare_and_set", {"k": b'{"s":true}'}, ["k"], ["s", b"1", b"{}", 0]),
+    ("compare_and_set", {"k": b'{"s":1}'}, ["k"], ["s", b"1.0", b"{}", 0]),
+    ("compare_and_set", {"k": b'{"s":[1]}'}, ["k"], ["s", b"[1]", b"{}", 0]),
+    ("compare_and_set", {}, ["k"], ["s", b"null", b"{}", 0]),
+    ("update_fields", {"k": b'{"a":1}'}, ["k"], [b'{"b":2}', 0, 60]),
+    ("update_fields", {}, ["k"], [b'{"b":null}', 0, 60]),
+    ("incr_with_ttl", {"k": b"5"}, ["k"], [2, 60]),
+    ("incr_field_with_ttl", {"k": b'{"n":1}'}, ["k"], ["n", 2, 0]),
+    ("incr_field_with_ttl", {}, ["k"], ["n", 1.5, 60]),
+    ("bucket_set", {}, ["k"], [60, "f", "v", "g", "w"]),
+    ("set_job_status", {}, ["c", "n"], ["job", "PENDING", 60, "1"]),
+    ("set_job_status", {}, ["c", "n"], ["job", "PENDING", 60, "0"]),
+    ("child_job_counts", {}, ["c", "n"], []),
+    ("append_job_event", {}, ["e"], [b'{"a":1}', 10, 60]),
+    ("update_job_progress", {}, ["p", "e"], [b'{"stage":"x"}', b'{"done":2}', 60, 10]),
+]
+
+
+def _parity_value(value):
+    if isinstance(value, bytes):
+        try:
+            return orjson.loads(value)
+        except orjson.JSONDecodeError:
+            return value
+    if isinstance(value, list):
+        return [_parity_value(x) for x in value]
+    if isinstance(value, dict):
+        return {k: _parity_value(v) for k, v in value.items()}
+    return value
+
+
+def _parity_state(server, key):
+    kind = server.type(key)
+    if kind == b"hash":
+        value = server.hgetall(key)
+    elif kind == b"stream":
+        value = server.xlen(key)
+    else:
+        value = server.get(key)
+    return kind, _parity_value(value), server.ttl(key) > 0
+
+
+@pytest.mark.parametrize("name,values,keys,args", SCRIPT_CASES)
+def test_redis_scripts_match_their_local_twins(name, values, keys, args):
+    caches = [
+        RedisBase(key="test_base_parity"),
+        RedisBase(key="test_base_parity", host="memory://parity"),
+    ]
+    outcomes = []
+    for cache in caches:
+        cache.delete_keys("*")
+        full_keys = [f"{cache._key}_{key}" for key in keys]
+        for key, value in values.items():
+            cache.server.set(f"{cache._key}_{key}", value)
+        result = cache._script(name)(keys=full_keys, args=args)
+        if name == "append_job_event":
+            # Stream entry ids depend on the clock
+            result = bool(result)
+        elif name == "update_job_progress":
+            result = dict(zip(result[::2], result[1::2]))
+        outcomes.append(
+            (
+                _parity_value(result),
+                [_parity_state(cache.server, key) for key in full_keys],
+            )
+        )
+        cache.delete_keys("*")
+    assert outcomes[0] == outcomes[1]
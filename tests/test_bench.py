@@ -0,0 +1,104 @@
+import json
+import pytest
+from mrkutil.bench import run_benchmarks, compare_results, summarize
+from mrkutil.bench.__main__ import main
+
+MEMORY_URL = "memory://bench_test"
+
+
+def test_summarize_percentiles():
+    stats = summarize([0.001 * i for i in range(1, 101)], elapsed=1.0)
+
+    assert stats["count"] == 100
+    assert stats["ops_per_sec"] == 100
+    assert stats["p50_ms"] == pytest.approx(51, abs=1)
+    assert stats["p99_ms"] == pytest.approx(99, abs=1)
+    assert stats["max_ms"] == pytest.approx(100)
+
+
+def test_run_benchmarks_over_memory_broker():
+    report = run_benchmarks(
+        ["rpc_round_trip", "handler_dispatch", "reply_path", "publish_throughput"],
+        rabbit_url=MEMORY_URL,
+        iterations=5,
+        payload_sizes=[16],
+        concurrency_levels=[1, 2],
+    )
+
+    benchmarks = {result["benchmark"] for result in report["results"]}
+    assert benchmarks == {
+        "rpc_round_trip",
+        "handler_dispatch",
+        "reply_path",
+        "publish_throughput",
+    }
+    assert all(result["stats"]["count"] == 5 for result in report["results"])
+    assert report["meta"]["options"]["rabbit_url"] == MEMORY_URL
+
+
+def test_run_benchmarks_unknown_name():
+    with pytest.raises(ValueError, match="Unknown benchmarks"):
+        run_benchmarks(["does_not_exist"])
+
+
+def test_compare_results():
+    def report(p50):
+        return {
+            "results": [
+                {
+                    "benchmark": "reply_path",
+                    "params": {"payload_size": 64},
+                    "stats": {"p50_ms": p50, "p99_ms": 2.0, "ops_per_sec": 100.0},
+                }
+            ]
+        }
+
+    comparison = compare_results(report(1.0), report(1.5))
+
+    assert comparison[0]["change_pct"] == {
+        "p50_ms": 50.0,
+        "p99_ms": 0.0,
+        "ops_per_sec": 0.0,
+    }
+
+
+def test_main_writes_json_output(tmp_path, capsys):
+    output = tmp_path / "results.json"
+
+    main(
+        [
+            "handler_dispatch",
+            "--rabbit-url",
+            MEMORY_URL,
+            "--iterations",
+            "3",
+            "--payload-sizes",
+            "8",
+            "--output",
+            str(output),
+        ]
+    )
+
+    report = json.loads(output.read_text())
+    assert report["results"][0]["benchmark"] == "handler_dispatch"
+    assert json.loads(capsys.readouterr().out) == report
+
+
+def test_redis_compression_benchmark():
+    report = run_benchmarks(["redis_compression"], iterations=3, payload_sizes=[4096])
+
+    encode = next(r for r in report["results"] if r["params"]["operation"] == "encode")
+    assert encode["params"]["algorithm"] == "ZLIB"
+    assert encode["extra"]["stored_bytes"] < encode["extra"]["raw_bytes"]
+    assert encode["stats"]["count"] == 3
+
+
+def test_redis_bucket_memory_benchmark():
+    report = run_benchmarks(
+        ["redis_bucket_memory"], iterations=200, payload_sizes=[16, 65536]
+    )
+
+    modes = {r["params"]["mode"]: r for r in report["results"]}
+    assert set(modes) == {"plain", "bucketed"}
+    assert all(r["params"]["payload_size"] == 16 for r in report["results"])
+    assert modes["plain"]["stats"]["count"] == 200
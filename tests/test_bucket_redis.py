@@ -0,0 +1,106 @@
+import time
+import pytest
+import pytest_asyncio
+from mrkutil.cache import AsyncBucketRedisBase, BucketRedisBase
+
+
+@pytest.fixture(scope="function")
+def bucket_cache():
+    cache = BucketRedisBase(key="test_buckets", buckets=4)
+    yield cache
+    cache.server.delete(*cache._all_buckets())
+
+
+@pytest_asyncio.fixture(scope="function")
+async def async_bucket_cache():
+    cache = AsyncBucketRedisBase(key="test_buckets_async", buckets=4)
+    yield cache
+    await cache.server.delete(*cache._all_buckets())
+
+
+def later(monkeypatch, seconds):
+    now = time.time() + seconds
+    monkeypatch.setattr("mrkutil.cache.bucket_redis.time.time", lambda: now)
+
+
+def test_bucket_set_get_delete(bucket_cache):
+    bucket_cache.set("a", {"x": 1})
+    bucket_cache.set("b", "hello")
+
+    assert bucket_cache.get("a") == {"x": 1}
+    assert bucket_cache.get("b") == b"hello"
+    assert bucket_cache.get("missing") is None
+    assert bucket_cache.server.hget(bucket_cache._bucket("a"), "a") is not None
+    assert bucket_cache.server.exists("test_buckets_a") == 0
+
+    bucket_cache.delete("a")
+    assert bucket_cache.get("a") is None
+
+
+def test_bucket_multiple_keys(bucket_cache):
+    bucket_cache.set_many({f"k{i}": {"i": i} for i in range(20)}, timeouts={"k0": 60})
+
+    assert bucket_cache.get_multiple(["k1", "missing", "k2"]) == [{"i": 1}, {"i": 2}]
+    assert bucket_cache.get_many(["k3", "missing"]) == [{"i": 3}, None]
+    assert sorted(bucket_cache.search("k1*")) == ["k1"] + [f"k1{i}" for i in range(10)]
+    assert bucket_cache.delete_many(["k0", "k1", "missing"]) == 2
+    assert len(bucket_cache.search("*")) == 18
+
+
+def test_bucket_field_expiry(bucket_cache, monkeypatch):
+    bucket_cache = BucketRedisBase(key="test_buckets", buckets=1)
+    bucket_cache.set("short", {"x": 1}, timeout=10)
+    bucket_cache.set("long", {"x": 2}, timeout=100)
+    bucket_cache.set("forever", {"x": 3}, timeout=0)
+
+    later(monkeypatch, 50)
+
+    assert bucket_cache.get_many(["short", "long", "forever"]) == [
+        None,
+        {"x": 2},
+        {"x": 3},
+    ]
+    # Reads leave expired fields to purge_expired
+    assert bucket_cache.server.hget(bucket_cache._bucket("short"), "short") is not None
+    assert sorted(bucket_cache.search("*")) == ["forever", "long"]
+
+    later(monkeypatch, 200)
+    assert bucket_cache.purge_expired() == 2
+    assert bucket_cache.search("*") == ["forever"]
+
+
+def test_bucket_expires_with_longest_field(bucket_cache):
+    bucket_cache = BucketRedisBase(key="test_buckets", buckets=1)
+    bucket_cache.set("long", {"x": 1}, timeout=100)
+    bucket_cache.set("short", {"x": 2}, timeout=10)
+
+    assert bucket_cache.server.ttl(bucket_cache._bucket("short")) > 50
+
+
+def test_bucket_with_persistent_field_never_expires(bucket_cache):
+    bucket_cache = BucketRedisBase(key="test_buckets", buckets=1)
+    bucket_cache.set("forever", {"x": 1}, timeout=0)
+    bucket_cache.set("short", {"x": 2}, timeout=10)
+    bucket_cache.set_many({"other": {"x": 3}}, timeout=10)
+
+    assert bucket_cache.server.ttl(bucket_cache._bucket("forever")) == -1
+    assert bucket_cache.get("forever") == {"x": 1}
+
+
+def test_bucket_validates_buckets():
+    with pytest.raises(ValueError):
+        BucketRedisBase(key="test_buckets", buckets=0)
+
+
+@pytest.mark.asyncio
+async def test_async_bucket_cache(async_bucket_cache):
+    await async_bucket_cache.set_many({"a": {"x": 1}, "b": {"x": 2}})
+    await async_bucket_cache.set("c", {"x": 3})
+
+    assert await async_bucket_cache.get("a") == {"x": 1}
+    assert await async_bucket_cache.get_many(["b", "missing"], as_dict=True) == {
+        "b": {"x": 2},
+        "missing": None,
+    }
+    assert await async_bucket_cache.delete("a") == 1
+    assert sorted(await async_bucket_cache.search("*")) == ["b", "c"]
@@ -0,0 +1,67 @@
+import os
+import orjson
+import pytest
+from mrkutil.cache import CompressionCodec, RawCodec, RedisBase
+from mrkutil.cache.compression import decompress, zstandard
+from mrkutil.enum import CompressionAlgorithmEnum
+
+DOCUMENT = {"items": [{"id": i, "status": "COMPLETE"} for i in range(200)]}
+
+
+def test_codec_compresses_above_threshold():
+    codec = CompressionCodec(threshold=100)
+    raw = orjson.dumps(DOCUMENT)
+
+    stored = codec.encode(raw)
+
+    assert stored.startswith(b"\x00z")
+    assert len(stored) < len(raw)
+    assert decompress(stored) == raw
+
+
+def test_codec_keeps_small_and_incompressible_values():
+    codec = CompressionCodec(threshold=100)
+    incompressible = os.urandom(4096)
+
+    assert codec.encode(b'{"small": true}') == b'{"small": true}'
+    assert codec.encode(incompressible) == incompressible
+    assert decompress(b'{"small": true}') == b'{"small": true}'
+    assert decompress(None) is None
+
+
+@pytest.mark.skipif(zstandard is not None, reason="zstandard is installed")
+def test_missing_optional_codec():
+    with pytest.raises(ValueError, match="zstandard"):
+        CompressionCodec(CompressionAlgorithmEnum.ZSTD)
+
+
+def test_redis_base_reads_mixed_values():
+    plain = RedisBase(key="test_compression")
+    compressed = RedisBase(
+        key="test_compression", compression=CompressionCodec(threshold=100)
+    )
+    try:
+        compressed.set("large", DOCUMENT)
+        plain.set("small", {"small": True})
+
+        assert compressed.server.get("test_compression_large").startswith(b"\x00z")
+        assert compressed.get("large") == DOCUMENT
+        assert compressed.get_many(["large", "small"]) == [DOCUMENT, {"small": True}]
+        assert compressed.get_multiple(["large", "small"]) == [
+            DOCUMENT,
+            {"small": True},
+        ]
+    finally:
+        plain.delete_keys("*")
+
+
+def test_raw_values_are_not_decompressed():
+    raw = RedisBase(key="test_compression", codec=RawCodec())
+    value = b"\x00z" + os.urandom(64)
+    try:
+        raw.set("binary", value)
+
+        assert raw.get("binary") == value
+        assert raw.get_many(["binary"]) == [value]
+    finally:
+        raw.delete_keys("*")
@@ -0,0 +1,97 @@
+import importlib
+import sys
+import pytest
+from mrkutil.base import HandlerManifest
+
+BASE_MODULE = """
+from mrkutil.base import BaseHandler
+
+
+class LazyBase(BaseHandler):
+    sub_classes = {}
+
+    @staticmethod
+    def name():
+        return None
+"""
+
+HANDLER_MODULE = """
+from {package}.base import LazyBase
+
+
+class Handler(LazyBase):
+    @staticmethod
+    def name():
+        return "{method}"
+
+    def process(self, data, corr_id):
+        return {{"method": "{method}"}}
+"""
+
+
+@pytest.fixture
+def make_package(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    def make(package, methods):
+        root = tmp_path / package
+        (root / "handlers").mkdir(parents=True)
+        (root / "__init__.py").write_text("")
+        (root / "base.py").write_text(BASE_MODULE)
+        (root / "handlers" / "__init__.py").write_text("")
+        for method in methods:
+            (root / "handlers" / f"{method}.py").write_text(
+                HANDLER_MODULE.format(package=package, method=method)
+            )
+        importlib.invalidate_caches()
+        return importlib.import_module(f"{package}.base").LazyBase
+
+    return make
+
+
+def test_build_manifest(make_package, tmp_path):
+    base = make_package("manifest_build_pkg", ["alpha", "beta"])
+
+    manifest = HandlerManifest.build("manifest_build_pkg.handlers", base)
+    manifest.save(str(tmp_path / "manifest.json"))
+
+    assert dict(manifest) == {
+        "alpha": "manifest_build_pkg.handlers.alpha",
+        "beta": "manifest_build_pkg.handlers.beta",
+    }
+    assert dict(HandlerManifest.load(str(tmp_path / "manifest.json"))) == dict(manifest)
+
+
+def test_handlers_are_imported_on_first_use(make_package):
+    base = make_package("manifest_lazy_pkg", ["alpha", "beta"])
+    base.use_manifest(
+        HandlerManifest(
+            {
+                "alpha": "manifest_lazy_pkg.handlers.alpha",
+                "beta": "manifest_lazy_pkg.handlers.beta",
+            }
+        )
+    )
+
+    assert len(base.get_registry()) == 0
+    assert base.process_data({"method": "beta"}, "corr_id") == {"method": "beta"}
+    assert "manifest_lazy_pkg.handlers.beta" in sys.modules
+    assert "manifest_lazy_pkg.handlers.alpha" not in sys.modules
+    assert base.process_data({"method": "missing"}, "corr_id")["code"] == 404
+
+
+def test_manifest_preload(make_package):
+    base = make_package("manifest_preload_pkg", ["alpha", "beta"])
+
+    thread = base.use_manifest(
+        HandlerManifest(
+            {
+                "alpha": "manifest_preload_pkg.handlers.alpha",
+                "beta": "manifest_preload_pkg.handlers.beta",
+            }
+        ),
+        preload=True,
+    )
+    thread.join(5)
+
+    assert set(base.get_registry()) == {"alpha", "beta"}
@@ -0,0 +1,221 @@
+import asyncio
+import threading
+import pytest
+from mrkutil.base import BaseHandler, HandlerRegistry
+from mrkutil.enum import HandlerLifecycleEnum, MiddlewareKindEnum
+
+
+class RegistryTestHandler(BaseHandler):
+    sub_classes = {}
+
+    @staticmethod
+    def name():
+        return None
+
+
+class IntermediateHandler(RegistryTestHandler):
+    @staticmethod
+    def name():
+        return None
+
+
+class GrandchildHandler(IntermediateHandler):
+    @staticmethod
+    def name():
+        return "grandchild"
+
+    def process(self, data, corr_id):
+        return {"grandchild": True}
+
+
+class SingletonHandler(RegistryTestHandler):
+    lifecycle = HandlerLifecycleEnum.SINGLETON
+    setup_calls = 0
+
+    @staticmethod
+    def name():
+        return "singleton"
+
+    def setup(self):
+        SingletonHandler.setup_calls += 1
+
+    def process(self, data, corr_id):
+        return id(self)
+
+
+class PooledHandler(RegistryTestHandler):
+    lifecycle = HandlerLifecycleEnum.POOLED
+    pool_size = 2
+
+    @staticmethod
+    def name():
+        return "pooled"
+
+    async def process(self, data, corr_id):
+        await asyncio.sleep(0)
+        return id(self)
+
+
+class TransientHandler(RegistryTestHandler):
+    @staticmethod
+    def name():
+        return "transient"
+
+    def process(self, data, corr_id):
+        return id(self)
+
+
+def test_registry_finds_nested_handlers():
+    RegistryTestHandler.initialize()
+
+    assert RegistryTestHandler.get_handler("grandchild") is GrandchildHandler
+    assert RegistryTestHandler.process_data({"method": "grandchild"}, "corr_id") == {
+        "grandchild": True
+    }
+    assert "grandchild" not in BaseHandler.get_registry()
+
+
+@pytest.mark.parametrize("intermediate_first", [True, False])
+def test_intermediate_registry_does_not_split_the_family(intermediate_first):
+    class OrderFamily(BaseHandler):
+        sub_classes = {}
+
+        @staticmethod
+        def name():
+            return None
+
+    class OrderIntermediate(OrderFamily):
+        @staticmethod
+        def name():
+            return None
+
+    class OrderLeaf(OrderIntermediate):
+        @staticmethod
+        def name():
+            return "leaf"
+
+        def process(self, data, corr_id):
+            return {"leaf": True}
+
+    if intermediate_first:
+        assert OrderIntermediate.get_handler("leaf") is OrderLeaf
+        assert OrderFamily.process_data({"method": "leaf"}, "corr_id") == {"leaf": True}
+    else:
+        assert OrderFamily.process_data({"method": "leaf"}, "corr_id") == {"leaf": True}
+        assert OrderIntermediate.get_handler("leaf") is OrderLeaf
+    assert "sub_classes" not in OrderIntermediate.__dict__
+
+
+def test_registry_is_immutable():
+    registry = RegistryTestHandler.get_registry()
+
+    assert isinstance(registry, HandlerRegistry)
+    with pytest.raises(TypeError):
+        registry["other"] = TransientHandler
+
+
+def test_duplicate_method_names_are_rejected():
+    class DuplicateFamily(BaseHandler):
+        sub_classes = {}
+
+        @staticmethod
+        def name():
+            return None
+
+    class First(DuplicateFamily):
+        @staticmethod
+        def name():
+            return "duplicate"
+
+        def process(self, data, corr_id):
+            return {}
+
+    class Second(DuplicateFamily):
+        @staticmethod
+        def name():
+            return "duplicate"
+
+        def process(self, data, corr_id):
+            return {}
+
+    with pytest.raises(ValueError):
+        DuplicateFamily.initialize()
+
+
+def test_singleton_handler_is_reused():
+    RegistryTestHandler.initialize()
+    SingletonHandler.setup_calls = 0
+
+    first = RegistryTestHandler.process_data({"method": "singleton"}, "corr_id")
+    second = RegistryTestHandler.process_data({"method": "singleton"}, "corr_id")
+
+    assert first == second
+    assert SingletonHandler.setup_calls == 1
+
+
+def test_adding_middleware_keeps_reused_instances():
+    RegistryTestHandler.initialize()
+    SingletonHandler.setup_calls = 0
+    calls = []
+
+    def count(data, corr_id):
+        calls.append(data["method"])
+
+    first = RegistryTestHandler.process_data({"method": "singleton"}, "corr_id")
+    RegistryTestHandler.add_middleware(
+        MiddlewareKindEnum.BEFORE, count, methods=["singleton"]
+    )
+    try:
+        second = RegistryTestHandler.process_data({"method": "singleton"}, "corr_id")
+    finally:
+        RegistryTestHandler._middlewares.clear()
+        RegistryTestHandler.get_registry().set_middlewares([])
+
+    assert first == second
+    assert SingletonHandler.setup_calls == 1
+    assert calls == ["singleton"]
+
+
+def test_pooled_handler_is_bounded():
+    RegistryTestHandler.initialize()
+    pool = RegistryTestHandler.get_registry().pool(PooledHandler)
+    first = pool.acquire()
+    second = pool.acquire()
+    acquired = threading.Event()
+
+    def acquire_third():
+        pool.release(pool.acquire())
+        acquired.set()
+
+    thread = threading.Thread(target=acquire_third)
+    thread.start()
+    assert not acquired.wait(0.1)
+
+    pool.release(first)
+    assert acquired.wait(1)
+    thread.join()
+    pool.release(second)
+
+    result = asyncio.run(
+        RegistryTestHandler.process_data({"method": "pooled"}, "corr_id")
+    )
+    assert result in (id(first), id(second))
+
+
+def test_transient_handler_is_created_per_message():
+    RegistryTestHandler.initialize()
+    instances = []
+    original_setup = TransientHandler.setup
+
+    def record_setup(self):
+        instances.append(self)
+
+    TransientHandler.setup = record_setup
+    try:
+        RegistryTestHandler.process_data({"method": "transient"}, "corr_id")
+        RegistryTestHandler.process_data({"method": "transient"}, "corr_id")
+    finally:
+        TransientHandler.setup = original_setup
+
+    assert len(instances) == 2
+    assert instances[0] is not instances[1]
@@ -0,0 +1,227 @@
+import asyncio
+import gc
+import threading
+import time
+import orjson
+import pytest
+from mrkutil.base import BaseHandler, CancellationToken
+from mrkutil.cache import AsyncRedisBase, redis_pool
+from mrkutil.communication import MemoryBroker
+from mrkutil.communication.listen import Subscriber
+from mrkutil.exception import HandlerTimeoutException
+
+MEMORY_URL = "memory://timeout_test"
+
+handler_stopped = threading.Event()
+
+
+class TimeoutTestHandler(BaseHandler):
+    sub_classes = {}
+
+    @staticmethod
+    def name():
+        return None
+
+
+class CooperativeSlowHandler(TimeoutTestHandler):
+    @staticmethod
+    def name():
+        return "cooperative_slow"
+
+    def process(self, data, corr_id, cancel_token=None):
+        cancel_token.wait(5)
+        handler_stopped.set()
+        cancel_token.raise_if_cancelled()
+        return {"done": True}
+
+
+class AsyncSlowHandler(TimeoutTestHandler):
+    cancelled = threading.Event()
+
+    @staticmethod
+    def name():
+        return "async_slow"
+
+    async def process(self, data, corr_id):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            AsyncSlowHandler.cancelled.set()
+            raise
+        return {"done": True}
+
+
+class AsyncFastHandler(TimeoutTestHandler):
+    @staticmethod
+    def name():
+        return "async_fast"
+
+    async def process(self, data, corr_id):
+        await asyncio.sleep(0)
+        return {"async": True}
+
+
+class AsyncRedisHandler(TimeoutTestHandler):
+    loops = set()
+
+    @staticmethod
+    def name():
+        return "async_redis"
+
+    async def process(self, data, corr_id):
+        # Creating the client needs no server
+        AsyncRedisBase(key="timeout_test", host="localhost")
+        AsyncRedisHandler.loops.add(asyncio.get_running_loop())
+        return None
+
+
+class ClassTimeoutHandler(TimeoutTestHandler):
+    timeout = 0.1
+
+    @staticmethod
+    def name():
+        return "class_timeout"
+
+    def process(self, data, corr_id):
+        time.sleep(0.3)
+        return {"done": True}
+
+
+class FastHandler(TimeoutTestHandler):
+    @staticmethod
+    def name():
+        return "fast"
+
+    def process(self, data, corr_id):
+        return {"fast": True}
+
+
+@pytest.fixture
+def reply_queue():
+    broker = MemoryBroker.from_url(MEMORY_URL)
+    broker.exchange_declare("timeout_caller")
+    queue = broker.queue_declare("timeout_caller_queue")
+    broker.queue_bind("timeout_caller_queue", "timeout_caller")
+    yield queue
+    broker.queue_delete("timeout_caller_queue")
+
+
+def make_body(method):
+    return {
+        "meta": {"correlationId": f"corr-{method}", "source": "timeout_caller"},
+        "data": {"method": method, "request": {}},
+    }
+
+
+def read_reply(queue):
+    message = queue.get(timeout=1)
+    assert message is not None, "No reply was sent"
+    return orjson.loads(message.body)["data"]
+
+
+def test_sync_handler_timeout_replies_and_cancels(reply_queue):
+    subscriber = Subscriber(
+        "timeout_service",
+        base_handler=TimeoutTestHandler,
+        use_job_cache=False,
+        rabbit_url=MEMORY_URL,
+        method_timeouts={"cooperative_slow": 0.1},
+    )
+
+    start = time.monotonic()
+    assert subscriber.handle(make_body("cooperative_slow")) is False
+    assert time.monotonic() - start < 1
+
+    assert read_reply(reply_queue)["code"] == 504
+    assert handler_stopped.wait(1), "Handler did not observe cancellation"
+    time.sleep(0.05)
+    metrics = subscriber.metrics.snapshot()
+    assert metrics["timed_out"] == {"cooperative_slow": 1}
+    assert metrics["finished_after_timeout"] == {"cooperative_slow": 1}
+    assert metrics["running_after_timeout"] == 0
+
+
+def test_async_handler_is_cancelled(reply_queue):
+    subscriber = Subscriber(
+        "timeout_service",
+        base_handler=TimeoutTestHandler,
+        use_job_cache=False,
+        rabbit_url=MEMORY_URL,
+        handler_timeout=0.1,
+    )
+
+    subscriber.handle(make_body("async_slow"))
+
+    assert AsyncSlowHandler.cancelled.is_set()
+    assert read_reply(reply_queue)["code"] == 504
+    assert subscriber.metrics.snapshot()["cancelled"] == {"async_slow": 1}
+
+
+def test_async_handler_response_is_sent(reply_queue):
+    subscriber = Subscriber(
+        "timeout_service",
+        base_handler=TimeoutTestHandler,
+        use_job_cache=False,
+        rabbit_url=MEMORY_URL,
+    )
+
+    assert subscriber.handle(make_body("async_fast")) is True
+    assert read_reply(reply_queue) == {"async": True}
+
+
+def test_async_handlers_share_the_loop_of_the_worker_thread():
+    subscriber = Subscriber(
+        "timeout_service",
+        base_handler=TimeoutTestHandler,
+        use_job_cache=False,
+        rabbit_url=MEMORY_URL,
+    )
+    before = len(redis_pool._async_clients)
+
+    for _ in range(20):
+        assert subscriber.handle(make_body("async_redis")) is True
+    gc.collect()
+
+    assert len(AsyncRedisHandler.loops) == 1
+    assert len(redis_pool._async_clients) <= before + 1
+
+
+def test_handler_class_timeout_attribute(reply_queue):
+    subscriber = Subscriber(
+        "timeout_service",
+        base_handler=TimeoutTestHandler,
+        use_job_cache=False,
+        rabbit_url=MEMORY_URL,
+    )
+
+    assert subscriber.get_timeout("class_timeout") == 0.1
+    subscriber.handle(make_body("class_timeout"))
+
+    assert read_reply(reply_queue)["code"] == 504
+
+
+def test_fast_handler_within_timeout(reply_queue):
+    subscriber = Subscriber(
+        "timeout_service",
+        base_handler=TimeoutTestHandler,
+        use_job_cache=False,
+        rabbit_url=MEMORY_URL,
+        handler_timeout=1,
+    )
+
+    assert subscriber.handle(make_body("fast")) is True
+    assert read_reply(reply_queue) == {"fast": True}
+    assert subscriber.metrics.snapshot()["timed_out"] == {}
+
+
+def test_cancellation_token():
+    token = CancellationToken()
+    assert token.cancelled is False
+    token.raise_if_cancelled()
+
+    token.cancel()
+
+    assert token.cancelled is True
+    assert token.wait(5) is True
+    with pytest.raises(HandlerTimeoutException):
+        token.raise_if_cancelled()
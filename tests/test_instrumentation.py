@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import pytest
+from mrkutil.base import HandlerRegistry, get_correlation_id
+from mrkutil.base.base_handler import BaseHandler
+from mrkutil.cache import AsyncRedisBase, RedisBase, RedisInstrumentation
+from mrkutil.cache.instrumentation import observe
+from mrkutil.cache.local_redis import LocalRedis
+
+
+@pytest.fixture(autouse=True)
+def reset_local_clients():
+    yield
+    LocalRedis.reset()
+
+
+def test_instrumentation_collects_metrics_per_prefix():
+    metrics = RedisInstrumentation(slow_threshold=None)
+    users = RedisBase(key="users", host="memory://tests", instrumentation=metrics)
+    orders = RedisBase(key="orders", host="memory://tests", instrumentation=metrics)
+
+    users.set("1", {"name": "Ana"})
+    assert users.get("1") == {"name": "Ana"}
+    assert users.get("2") is None
+    orders.set_many({"a": {"x": 1}, "b": {"x": 2}})
+    assert orders.get_many(["a", "b", "c"]) == [{"x": 1}, {"x": 2}, None]
+    orders.delete_many(["a", "b"])
+
+    snapshot = metrics.snapshot()
+    get = snapshot["users"]["get"]
+    assert get["calls"] == 2
+    assert get["hits"] == 1 and get["misses"] == 1 and get["hit_rate"] == 0.5
+    assert get["bytes_read"] == snapshot["users"]["set"]["bytes_written"] > 0
+    assert sum(get["latency_ms"].values()) == 2
+    assert snapshot["orders"]["set_many"]["bytes_written"] > 0
+    assert snapshot["orders"]["mget"]["hits"] == 2
+    assert snapshot["orders"]["mget"]["misses"] == 1
+    assert snapshot["orders"]["delete_many"]["calls"] == 1
+
+    metrics.reset()
+    assert metrics.snapshot() == {}
+
+
+def test_instrumentation_counts_errors():
+    metrics = RedisInstrumentation(slow_threshold=None)
+
+    with pytest.raises(RuntimeError):
+        with metrics.call("users", "get", "users_1"):
+            raise RuntimeError("down")
+
+    assert metrics.snapshot()["users"]["get"]["errors"] == 1
+
+
+def test_uninstrumented_calls_keep_no_state():
+    with observe(None, "users", "get") as call:
+        call.read = 10
+        call.written += 5
+
+    assert not call
+    assert call.read == 0 and call.written == 0
+    assert observe(None, "orders", "set") is call
+
+
+def test_slow_calls_are_logged_with_correlation_id(caplog):
+    metrics = RedisInstrumentation(slow_threshold=0)
+    cache = RedisBase(key="users", host="memory://tests", instrumentation=metrics)
+
+    class SlowHandler(BaseHandler):
+        @staticmethod
+        def name():
+            return "slow"
+
+        def process(self, data, corr_id):
+            assert get_correlation_id() == corr_id
+            return cache.get("1")
+
+    registry = HandlerRegistry({"slow": SlowHandler})
+    with caplog.at_level(logging.WARNING, logger="mrkutil.cache.instrumentation"):
+        registry.call("slow", {}, "corr-42")
+
+    assert "Slow redis get on users key users_1" in caplog.text
+    assert "corr id corr-42" in caplog.text
+    assert metrics.snapshot()["users"]["get"]["slow"] == 1
+    assert get_correlation_id() is None
+
+
+def test_async_instrumentation():
+    metrics = RedisInstrumentation(slow_threshold=None)
+
+    async def run():
+        cache = AsyncRedisBase(
+            key="users", host="memory://tests", instrumentation=metrics
+        )
+        await cache.set("1", {"name": "Ana"})
+        await cache.get("1")
+        await cache.delete("1")
+
+    asyncio.run(run())
+
+    snapshot = metrics.snapshot()["users"]
+    assert snapshot["set"]["calls"] == 1
+    assert snapshot["get"]["hits"] == 1
+    assert snapshot["delete"]["calls"] == 1
@@ -1,6 +1,10 @@
+import asyncio
 import os
+import threading
+import time
 import pytest
 import pytest_asyncio
+from redis.crc import key_slot
 from mrkutil.cache.job_cache import JobCache, AJobCache
 from mrkutil.enum import JobStatusEnum
 
@@ -13,6 +17,7 @@ def job_cache():
     yield cache
     # Clean up all test jobs
     cache.delete_keys("testjob*")
+    cache.delete_keys("{testjob*")
 
 
 @pytest_asyncio.fixture(scope="function")
@@ -20,6 +25,7 @@ async def ajob_cache():
     cache = AJobCache()
     yield cache
     await cache.delete_keys("testjob*")
+    await cache.delete_keys("{testjob*")
 
 
 def test_jobcache_create_and_progress(job_cache):
@@ -87,3 +93,185 @@ async def test_ajobcache_parent_child_logic(ajob_cache):
     )
     parent_job = await ajob_cache.check_job(parent)
     assert parent_job["status"] == JobStatusEnum.FAILED
+
+
+def test_jobcache_script_keys_share_a_slot(job_cache):
+    child = "testjobslot_child"
+
+    assert (
+        len({key_slot(x.encode()) for x in job_cache._parent_keys("testjobslot")}) == 1
+    )
+    assert len({key_slot(x.encode()) for x in job_cache._progress_keys(child)}) == 1
+
+
+def test_jobcache_parent_counters(job_cache):
+    parent = job_cache.create_job("testjobcounters")
+    children = [job_cache.create_job(parent) for _ in range(3)]
+
+    assert job_cache.child_job_counts(parent) == (3, {"PENDING": 3})
+
+    job_cache.set_progress(children[0], status=JobStatusEnum.COMPLETE)
+    job_cache.set_progress(children[1], status=JobStatusEnum.IN_PROGRESS)
+    assert job_cache.child_job_counts(parent) == (
+        3,
+        {"PENDING": 1, "IN_PROGRESS": 1, "COMPLETE": 1},
+    )
+    job_cache.check_set_parent_job(parent, JobStatusEnum.COMPLETE, {})
+    assert job_cache.check_job(parent)["status"] == JobStatusEnum.PENDING
+
+    for child in children:
+        job_cache.set_progress(
+            child, status=JobStatusEnum.COMPLETE, data={"child": child}
+        )
+    assert job_cache.check_job(children[2])["data"] == {"child": children[2]}
+    assert job_cache.child_job_counts(parent)[1]["COMPLETE"] == 3
+    job_cache.check_set_parent_job(parent, JobStatusEnum.COMPLETE, {"msg": "all done"})
+    assert job_cache.check_job(parent) == {
+        "status": JobStatusEnum.COMPLETE,
+        "data": {"msg": "all done"},
+    }
+
+
+@pytest.mark.asyncio
+async def test_ajobcache_parent_counters(ajob_cache):
+    parent = await ajob_cache.create_job("testjobcounters")
+    child1 = await ajob_cache.create_job(parent)
+    child2 = await ajob_cache.create_job(parent)
+
+    await ajob_cache.set_progress(child1, status=JobStatusEnum.COMPLETE)
+    await ajob_cache.set_progress(child2, status=JobStatusEnum.FAILED)
+    assert await ajob_cache.child_job_counts(parent) == (
+        2,
+        {"PENDING": 0, "COMPLETE": 1, "FAILED": 1},
+    )
+    await ajob_cache.check_set_parent_job(parent, JobStatusEnum.COMPLETE, {})
+    assert (await ajob_cache.check_job(parent))["status"] == JobStatusEnum.FAILED
+
+
+def test_jobcache_wait_for_job(job_cache):
+    parent = job_cache.create_job("testjobwait")
+    keys = [job_cache.create_job(parent) for _ in range(5)]
+
+    def finish():
+        time.sleep(0.2)
+        for key in keys:
+            job_cache.set_progress(
+                key, status=JobStatusEnum.COMPLETE, data={"key": key}
+            )
+
+    results = {}
+    waiters = [
+        threading.Thread(
+            target=lambda k=key: results.update({k: job_cache.wait_for_job(k, 5)})
+        )
+        for key in keys
+    ]
+    for waiter in waiters:
+        waiter.start()
+    started = time.monotonic()
+    finish()
+    for waiter in waiters:
+        waiter.join()
+
+    assert time.monotonic() - started < 4
+    assert all(results[key]["data"] == {"key": key} for key in keys)
+    assert (
+        job_cache.wait_for_job(parent, timeout=0.2)["status"] == JobStatusEnum.PENDING
+    )
+    assert job_cache.wait_for_job("testjobmissing", timeout=1) is None
+
+
+@pytest.mark.asyncio
+async def test_ajobcache_wait_for_job(ajob_cache):
+    key = await ajob_cache.create_job("testjobwait")
+
+    async def fail():
+        await asyncio.sleep(0.2)
+        await ajob_cache.set_progress(key, status=JobStatusEnum.FAILED)
+
+    task = asyncio.create_task(fail())
+    job = await ajob_cache.wait_for_job(key, timeout=5)
+    await task
+
+    assert job["status"] == JobStatusEnum.FAILED
+
+
+def test_jobcache_progress_and_events():
+    cache = JobCache(history=100)
+    key = cache.create_job("testjobevents")
+    try:
+        assert cache.get_progress(key) == {}
+        assert cache.update_progress(key, {"percent": 10, "stage": "download"}) == {
+            "percent": 10,
+            "stage": "download",
+        }
+        assert cache.update_progress(
+            key, {"percent": 50}, increments={"processed": 20}
+        ) == {
+            "percent": 50,
+            "stage": "download",
+            "processed": 20,
+        }
+        cache.update_progress(key, increments={"processed": 5})
+        assert cache.get_progress(key)["processed"] == 25
+        cache.set_progress(key, JobStatusEnum.COMPLETE, {"message": "done"})
+
+        events = cache.job_events(key)
+        assert [event for _, event in events] == [
+            {"status": "PENDING"},
+            {"progress": {"percent": 10, "stage": "download"}},
+            {"progress": {"percent": 50, "processed": 20}},
+            {"progress": {"processed": 25}},
+            {"status": "COMPLETE", "data": {"message": "done"}},
+        ]
+        assert cache.job_events(key, after=events[2][0], count=1) == [events[3]]
+        assert cache.job_events(key, after=events[-1][0]) == []
+
+        def update():
+            time.sleep(0.2)
+            cache.update_progress(key, {"percent": 100})
+
+        thread = threading.Thread(target=update)
+        thread.start()
+        tailed = cache.job_events(key, after=events[-1][0], timeout=5)
+        thread.join()
+        assert [event for _, event in tailed] == [{"progress": {"percent": 100}}]
+    finally:
+        cache.delete_keys("testjobevents*")
+
+
+def test_jobcache_history_is_capped():
+    cache = JobCache(history=3)
+    key = cache.create_job("testjobcapped")
+    try:
+        for i in range(10):
+            cache.update_progress(key, {"step": i})
+        events = cache.job_events(key)
+        # Redis trims approximately, in whole stream nodes
+        assert 3 <= len(events) <= 11
+        assert events[-1][1] == {"progress": {"step": 9}}
+        untracked = JobCache()
+        assert untracked.job_events(untracked.create_job("testjobcapped")) == []
+    finally:
+        cache.delete_keys("testjobcapped*")
+
+
+@pytest.mark.asyncio
+async def test_ajobcache_progress_and_events():
+    cache = AJobCache(history=100)
+    key = await cache.create_job("testjobevents")
+    try:
+        await cache.update_progress(key, {"percent": 10}, increments={"processed": 1.5})
+        assert await cache.get_progress(key) == {"percent": 10, "processed": 1.5}
+
+        async def finish():
+            await asyncio.sleep(0.2)
+            await cache.set_progress(key, JobStatusEnum.FAILED)
+
+        events = await cache.job_events(key)
+        task = asyncio.create_task(finish())
+        tailed = await cache.job_events(key, after=events[-1][0], timeout=5)
+        await task
+        assert [event for _, event in tailed] == [{"status": "FAILED", "data": {}}]
+    finally:
+        await cache.delete_keys("testjobevents*")
@@ -0,0 +1,199 @@
+import asyncio
+import sqlite3
+import time
+import pytest
+from mrkutil.cache import AsyncRedisBase, BucketRedisBase, NearCache, RedisBase
+from mrkutil.cache.local_redis import LOCAL_SCRIPTS, LocalRedis
+from mrkutil.cache.local_store import MemoryStore
+from mrkutil.cache.scripts import SCRIPTS
+from redis.exceptions import ResponseError
+
+
+@pytest.fixture(autouse=True)
+def reset_local_clients():
+    yield
+    LocalRedis.reset()
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def local_url(request, tmp_path):
+    if request.param == "memory":
+        return "memory://tests"
+    return f"sqlite:///{tmp_path}/cache.db"
+
+
+def test_local_backend_is_selected_by_url(local_url, monkeypatch):
+    monkeypatch.setenv("REDIS_HOST", local_url)
+
+    assert isinstance(RedisBase(key="local").server, LocalRedis)
+    assert RedisBase(key="local").server is RedisBase(key="other").server
+    assert RedisBase(key="local").server is not RedisBase(key="local", db=1).server
+
+
+def test_local_backend_operations(local_url):
+    cache = RedisBase(key="local", host=local_url)
+    cache.set("a", {"x": 1})
+    cache.set("b", "text")
+    cache.set_many({f"k{i}": {"i": i} for i in range(5)}, timeouts={"k0": 60})
+
+    assert cache.get("a") == {"x": 1}
+    assert cache.get("b") == b"text"
+    assert cache.get_multiple(["a", "missing"]) == [{"x": 1}]
+    assert cache.get_many(["k1", "missing"]) == [{"i": 1}, None]
+    assert sorted(cache.search("k*")) == [f"k{i}" for i in range(5)]
+    assert 0 < cache.server.ttl("local_k0") <= 60
+    assert cache.delete_keys("k*") == 5
+    assert cache.delete("a") == 1
+    assert cache.get("a") is None
+
+
+def test_local_backend_expiry(local_url):
+    cache = RedisBase(key="local", host=local_url)
+    cache.set_many({"short": {"x": 1}}, timeout=1)
+    cache.server.store.set("local_old", b"{}", time.time() - 1)
+
+    assert cache.get("old") is None
+    time.sleep(1.1)
+    assert cache.search("*") == []
+    assert cache.server.store.sweep() == 1
+
+
+def test_memory_store_sweeper():
+    store = MemoryStore(sweep_interval=0.05)
+    store.set("key", b"value", time.time() + 0.01)
+
+    time.sleep(0.2)
+    store.close()
+
+    assert store._data == {}
+
+
+def test_sqlite_backend_persists(tmp_path):
+    url = f"sqlite:///{tmp_path}/cache.db"
+    RedisBase(key="local", host=url).set("a", {"x": 1})
+
+    LocalRedis.reset()
+
+    assert RedisBase(key="local", host=url).get("a") == {"x": 1}
+
+
+def test_sqlite_store_upgrades_tables_without_kinds(tmp_path):
+    path = str(tmp_path / "cache.db")
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE db0 (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)"
+    )
+    connection.execute("INSERT INTO db0 VALUES (?, ?, NULL)", ("local_a", b'{"x": 1}'))
+    connection.commit()
+    connection.close()
+
+    cache = RedisBase(key="local", host=f"sqlite:///{path}")
+    cache.server.sadd("members", "a")
+
+    assert cache.get("a") == {"x": 1}
+    assert cache.server.smembers("members") == {b"a"}
+
+
+def test_local_backend_scripts_and_get_or_set(local_url):
+    cache = RedisBase(key="local", host=local_url)
+    cache.set("job", {"status": "PENDING"})
+
+    assert cache.compare_and_set("job", "status", "PENDING", {"status": "DONE"})
+    assert not cache.compare_and_set("job", "status", "PENDING", {"status": "LATE"})
+    assert cache.update_fields("job", {"n": 1}) == {"status": "DONE", "n": 1}
+    assert cache.incr_with_ttl("job", field="n", amount=2) == 3
+    assert cache.incr_with_ttl("hits", timeout=60) == 1
+    assert cache.incr_with_ttl("hits") == 2
+    assert cache.set_if_absent("lock", {"a": 1})
+    assert not cache.set_if_absent("lock", {"a": 2})
+    assert cache.get_or_set("report", lambda: {"total": 1}, ttl=60) == {"total": 1}
+    assert cache.get_or_set("report", lambda: {"total": 2}, ttl=60) == {"total": 1}
+
+
+def test_every_script_has_a_local_implementation():
+    assert set(LOCAL_SCRIPTS) == set(SCRIPTS)
+
+
+def test_local_backend_hashes_sets_and_streams(local_url):
+    server = LocalRedis.from_url(local_url)
+
+    assert server.hset("h", mapping={"a": 1, "b": "x"}) == 2
+    assert server.hincrby("h", "a", 2) == 3
+    assert server.hincrbyfloat("h", "c", 0.5) == 0.5
+    assert server.hmget("h", ["a", "missing"]) == [b"3", None]
+    assert server.hgetall("h") == {b"a": b"3", b"b": b"x", b"c": b"0.5"}
+    assert server.hdel("h", "a", "b", "c") == 3
+    assert server.exists("h") == 0
+
+    assert server.sadd("s", "a", "b", "a") == 2
+    assert server.sismember("s", "a") and not server.sismember("s", "c")
+    assert server.smembers("s") == {b"a", b"b"}
+    assert server.srem("s", "a", "b") == 2
+    assert server.scard("s") == 0
+
+    ids = [server.xadd("stream", {"event": str(i)}, maxlen=3) for i in range(5)]
+    assert server.xlen("stream") == 3
+    assert [fields for _, fields in server.xrange("stream")] == [
+        {b"event": b"2"},
+        {b"event": b"3"},
+        {b"event": b"4"},
+    ]
+    assert [x[0] for x in server.xrange("stream", b"(" + ids[3], "+")] == [ids[4]]
+
+    server.set("string", "x")
+    with pytest.raises(ResponseError):
+        server.hget("string", "a")
+    server.expire("stream", 60)
+    server.set("stream", "replaced")
+    assert server.get("stream") == b"replaced"
+
+
+def test_local_stream_entries_are_stored_separately(local_url):
+    server = LocalRedis.from_url(local_url)
+    for i in range(200):
+        server.xadd("events", {"event": b"x" * 100}, maxlen=150)
+
+    # The stream entry itself only holds the last ID and the length
+    assert len(server.store.get_entry("events")[0]) < 100
+    assert server.store.count_items("events") == server.xlen("events") == 150
+
+
+def test_local_backend_near_cache_invalidation():
+    first = RedisBase(key="local", host="memory://tests", near_cache=NearCache())
+    second = RedisBase(key="local", host="memory://tests", near_cache=NearCache())
+    first.set("a", {"x": 1})
+    assert second.get("a") == {"x": 1}
+
+    first.set("a", {"x": 2})
+    deadline = time.monotonic() + 2
+    while (
+        second.near_cache.stats()["invalidations"] == 0 and time.monotonic() < deadline
+    ):
+        time.sleep(0.01)
+
+    assert second.get("a") == {"x": 2}
+    first.near_cache.close()
+    second.near_cache.close()
+
+
+def test_async_local_backend(local_url):
+    async def run():
+        cache = AsyncRedisBase(key="local", host=local_url)
+        await cache.set("a", {"x": 1})
+        await cache.set_many({"b": {"x": 2}})
+        keys = [key async for key in cache.iter_keys("*")]
+        loaded = await cache.get_or_set("c", lambda: {"x": 3}, ttl=60)
+        changed = await cache.compare_and_set("a", "x", 1, {"x": 4})
+        return await cache.get_many(["a", "b", "c"]), sorted(keys), loaded, changed
+
+    values, keys, loaded, changed = asyncio.run(run())
+
+    assert values == [{"x": 4}, {"x": 2}, {"x": 3}]
+    assert keys == ["a", "b"]
+    assert loaded == {"x": 3}
+    assert changed
+
+
+def test_bucket_store_requires_redis():
+    with pytest.raises(ValueError):
+        BucketRedisBase(key="local", host="memory://tests")
@@ -0,0 +1,195 @@
+import asyncio
+import time
+import pytest
+from mrkutil.base import BaseHandler
+from mrkutil.cache import LRUCache, RedisBase, memoize
+from mrkutil.cache.compression import MARKER, CompressionCodec
+from mrkutil.exception import ServiceException
+
+calls = []
+
+
+class MemoizeTestHandler(BaseHandler):
+    sub_classes = {}
+
+    @staticmethod
+    def name():
+        return None
+
+
+class SquareHandler(MemoizeTestHandler):
+    @staticmethod
+    def name():
+        return "square"
+
+    @memoize(ttl=60, method_ttls={"square": 0.1})
+    def process(self, data, corr_id):
+        calls.append(data["request"]["value"])
+        if data["request"]["value"] < 0:
+            raise ServiceException("Negative value", code=422)
+        return {"square": data["request"]["value"] ** 2}
+
+
+class NegativeCachingHandler(MemoizeTestHandler):
+    @staticmethod
+    def name():
+        return "negative"
+
+    @memoize(error_ttl=60)
+    def process(self, data, corr_id):
+        calls.append(data["request"]["value"])
+        raise ServiceException("Invalid value", code=422)
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    calls.clear()
+    SquareHandler.process.invalidate_all()
+    NegativeCachingHandler.process.invalidate_all()
+
+
+def make_data(method, value):
+    return {"method": method, "request": {"value": value}}
+
+
+def test_handler_result_is_memoized_by_request():
+    first = MemoizeTestHandler.process_data(make_data("square", 3), "corr-1")
+    second = MemoizeTestHandler.process_data(make_data("square", 3), "corr-2")
+
+    assert first == second == {"square": 9}
+    assert calls == [3]
+
+
+def test_method_ttl_expires_result():
+    MemoizeTestHandler.process_data(make_data("square", 4), "corr-1")
+    time.sleep(0.15)
+    MemoizeTestHandler.process_data(make_data("square", 4), "corr-1")
+
+    assert calls == [4, 4]
+
+
+def test_invalidate_drops_result():
+    MemoizeTestHandler.process_data(make_data("square", 5), "corr-1")
+    SquareHandler.process.invalidate(make_data("square", 5))
+    MemoizeTestHandler.process_data(make_data("square", 5), "corr-1")
+
+    assert calls == [5, 5]
+
+
+def test_errors_are_not_cached_by_default():
+    for _ in range(2):
+        with pytest.raises(ServiceException):
+            MemoizeTestHandler.process_data(make_data("square", -1), "corr-1")
+
+    assert calls == [-1, -1]
+
+
+def test_negative_caching():
+    for _ in range(2):
+        with pytest.raises(ServiceException) as exc:
+            MemoizeTestHandler.process_data(make_data("negative", 1), "corr-1")
+        assert exc.value.code == 422
+
+    assert calls == [1]
+
+
+def test_plain_and_async_functions():
+    @memoize(maxsize=2)
+    def add(a, b=0):
+        calls.append((a, b))
+        return a + b
+
+    @memoize()
+    async def double(value):
+        calls.append(value)
+        return value * 2
+
+    assert add(1, b=2) == add(1, b=2) == 3
+    assert asyncio.run(double(4)) == asyncio.run(double(4)) == 8
+    assert calls == [(1, 2), 4]
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert len(cache) == 2
+
+
+def test_redis_tier_is_shared():
+    redis_cache = RedisBase(key="test_memoize")
+
+    def compute(value):
+        calls.append(value)
+        return {"value": value}
+
+    first = memoize(redis_cache=redis_cache)(compute)
+    second = memoize(redis_cache=redis_cache)(compute)
+    try:
+        assert first(7) == {"value": 7}
+        assert second(7) == {"value": 7}
+        assert calls == [7]
+    finally:
+        first.invalidate_all()
+
+
+def test_redis_tier_uses_the_cache_codec_and_timeout():
+    redis_cache = RedisBase(key="test_memoize", compression=CompressionCodec())
+
+    @memoize(ttl=30, redis_cache=redis_cache)
+    def compute(value):
+        calls.append(value)
+        return {"value": value * 2000}
+
+    try:
+        assert compute("x") == {"value": "x" * 2000}
+        compute.memoizer.local.clear()
+        assert compute("x") == {"value": "x" * 2000}
+        assert calls == ["x"]
+        (key,) = redis_cache.search("memo_*")
+        assert redis_cache.server.get(f"test_memoize_{key}")[:1] == MARKER
+        assert 0 < redis_cache.server.ttl(f"test_memoize_{key}") <= 30
+    finally:
+        compute.invalidate_all()
+
+
+def test_plain_function_keys_all_arguments():
+    @memoize()
+    def lookup(data, scope):
+        calls.append(scope)
+        return scope
+
+    data = {"method": "square", "request": {"value": 1}}
+    assert lookup(data, "a") == "a"
+    assert lookup(data, "b") == "b"
+    assert calls == ["a", "b"]
+
+
+def test_unstable_arguments_are_not_memoized():
+    class Opaque:
+        pass
+
+    @memoize()
+    def identity(value):
+        calls.append(value)
+        return value
+
+    value = Opaque()
+    assert identity(value) is value
+    assert identity(value) is value
+    assert len(calls) == 2
+
+
+def test_zero_ttl_disables_caching():
+    @memoize(ttl=0)
+    def add(a, b):
+        calls.append((a, b))
+        return a + b
+
+    assert add(1, 2) == add(1, 2) == 3
+    assert calls == [(1, 2), (1, 2)]
@@ -0,0 +1,185 @@
+import threading
+import time
+import pytest
+from mrkutil.base import BaseHandler
+from mrkutil.communication import (
+    listen,
+    call_service,
+    acall_service,
+    trigger_service,
+    MemoryBroker,
+)
+
+MEMORY_URL = "memory://test"
+
+
+class MemoryEchoHandler(BaseHandler):
+    @staticmethod
+    def name():
+        return "memory_echo"
+
+    def process(self, data, corr_id):
+        return {"echoed": data["request"], "corr_id": corr_id}
+
+
+def start_listener(exchange, queue, **kwargs):
+    BaseHandler.initialize()
+    thread = threading.Thread(
+        target=listen,
+        kwargs={
+            "exchange": exchange,
+            "exchange_type": "direct",
+            "queue": queue,
+            "rabbit_url": MEMORY_URL,
+            **kwargs,
+        },
+        daemon=True,
+    )
+    thread.start()
+    time.sleep(0.2)  # Give listener time to declare its queue
+    return thread
+
+
+def test_direct_exchange_routes_by_key():
+    broker = MemoryBroker.from_url("memory://routing")
+    broker.exchange_declare("direct_ex", "direct")
+    broker.queue_declare("q_a")
+    broker.queue_declare("q_b")
+    broker.queue_bind("q_a", "direct_ex", "a")
+    broker.queue_bind("q_b", "direct_ex", "b")
+
+    assert broker.publish("direct_ex", "a", b"payload") == 1
+    assert len(broker.get_queue("q_a")) == 1
+    assert len(broker.get_queue("q_b")) == 0
+
+
+def test_topic_exchange_wildcards():
+    broker = MemoryBroker.from_url("memory://routing")
+    broker.exchange_declare("topic_ex", "topic")
+    broker.queue_declare("q_star")
+    broker.queue_declare("q_hash")
+    broker.queue_bind("q_star", "topic_ex", "jobs.*")
+    broker.queue_bind("q_hash", "topic_ex", "jobs.#")
+
+    assert broker.publish("topic_ex", "jobs.created", b"1") == 2
+    assert broker.publish("topic_ex", "jobs.created.child", b"2") == 1
+    assert broker.publish("topic_ex", "jobs", b"3") == 1
+    assert broker.publish("topic_ex", "users.created", b"4") == 0
+
+
+def test_queue_delete_releases_empty_queue():
+    broker = MemoryBroker.from_url("memory://routing")
+    broker.queue_declare("q_empty")
+    memory_queue = broker.get_queue("q_empty")
+
+    broker.queue_delete("q_empty")
+
+    assert broker.get_queue("q_empty") is None
+    started = time.monotonic()
+    assert memory_queue.get(timeout=5) is None
+    assert time.monotonic() - started < 1
+
+
+def test_consumer_prefetch_limits_unacked_messages():
+    broker = MemoryBroker.from_url("memory://prefetch")
+    broker.exchange_declare("prefetch_ex")
+    broker.queue_declare("prefetch_q")
+    broker.queue_bind("prefetch_q", "prefetch_ex")
+    for i in range(3):
+        broker.publish("prefetch_ex", "", str(i).encode())
+
+    consumer = broker.consume("prefetch_q", prefetch_count=2)
+    first = consumer.get(timeout=0.1)
+    second = consumer.get(timeout=0.1)
+    assert consumer.get(timeout=0.1) is None
+
+    consumer.nack(first[0])
+    redelivered = consumer.get(timeout=0.1)
+    assert redelivered[1].body == b"0"
+    assert redelivered[1].redelivered is True
+
+    consumer.ack(second[0])
+    assert consumer.get(timeout=0.1)[1].body == b"2"
+
+
+def test_call_service_over_memory_broker():
+    start_listener("memory_rpc_exchange", "memory_rpc_queue")
+    req = {"method": "memory_echo", "request": {"message": "Hello"}}
+
+    resp = call_service(
+        req,
+        destination="memory_rpc_exchange",
+        source="memory_rpc_caller",
+        rabbit_url=MEMORY_URL,
+        timeout=5,
+    )
+
+    assert resp["echoed"] == {"message": "Hello"}
+
+
+@pytest.mark.asyncio
+async def test_acall_service_over_memory_broker():
+    start_listener("memory_arpc_exchange", "memory_arpc_queue")
+    req = {"method": "memory_echo", "request": {"message": "Hello async"}}
+
+    resp = await acall_service(
+        req,
+        destination="memory_arpc_exchange",
+        source="memory_arpc_caller",
+        rabbit_url=MEMORY_URL,
+        timeout=5,
+    )
+
+    assert resp["echoed"] == {"message": "Hello async"}
+
+
+def test_call_service_memory_timeout():
+    with pytest.raises(Exception, match="Timeout"):
+        call_service(
+            {"method": "memory_echo", "request": {}},
+            destination="memory_nobody_listens",
+            source="memory_timeout_caller",
+            rabbit_url=MEMORY_URL,
+            timeout=0.2,
+        )
+
+
+def test_trigger_service_over_memory_broker():
+    received = threading.Event()
+    start_listener(
+        "memory_trigger_exchange",
+        "memory_trigger_queue",
+        async_processing=False,
+        on_message_process_complete=received.set,
+    )
+
+    trigger_service(
+        request_data={"method": "memory_echo", "request": {}},
+        destination="memory_trigger_exchange",
+        source="memory_trigger_caller",
+        rabbit_url=MEMORY_URL,
+    )
+
+    assert received.wait(timeout=5), "Message was not received within timeout"
+
+
+def test_message_ttl_dead_letters_to_exchange():
+    broker = MemoryBroker.from_url("memory://ttl")
+    broker.exchange_declare("ttl_target")
+    broker.queue_declare("ttl_target_queue")
+    broker.queue_bind("ttl_target_queue", "ttl_target")
+    broker.queue_declare(
+        "ttl_wait_queue",
+        arguments={
+            "x-message-ttl": 50,
+            "x-dead-letter-exchange": "ttl_target",
+            "x-dead-letter-routing-key": "",
+        },
+    )
+
+    assert broker.publish("", "ttl_wait_queue", b"later") == 1
+    assert len(broker.get_queue("ttl_target_queue")) == 0
+
+    message = broker.get_queue("ttl_target_queue").get(timeout=1)
+    assert message.body == b"later"
+    assert len(broker.get_queue("ttl_wait_queue")) == 0
@@ -0,0 +1,118 @@
+import asyncio
+import pytest
+from mrkutil.base import BaseHandler
+from mrkutil.enum import MiddlewareKindEnum
+from mrkutil.exception import ServiceException
+
+events = []
+
+
+class MiddlewareTestHandler(BaseHandler):
+    sub_classes = {}
+
+    @staticmethod
+    def name():
+        return None
+
+
+class EchoMiddlewareHandler(MiddlewareTestHandler):
+    @staticmethod
+    def name():
+        return "echo"
+
+    def process(self, data, corr_id):
+        events.append("process")
+        return {"echo": data["request"]}
+
+
+class AsyncMiddlewareHandler(MiddlewareTestHandler):
+    @staticmethod
+    def name():
+        return "async_echo"
+
+    async def process(self, data, corr_id):
+        return {"echo": data["request"]}
+
+
+class PlainFamilyHandler(BaseHandler):
+    sub_classes = {}
+
+    @staticmethod
+    def name():
+        return None
+
+
+class PlainHandler(PlainFamilyHandler):
+    @staticmethod
+    def name():
+        return "plain"
+
+    def process(self, data, corr_id):
+        return {"plain": True}
+
+
+def require_token(data, corr_id):
+    events.append("before")
+    if not data.get("token"):
+        raise ServiceException("Unauthorized", code=401)
+
+
+def add_trace(data, corr_id, result):
+    events.append("after")
+    return {**result, "traced": True}
+
+
+def timing(call_next, data, corr_id):
+    events.append("around_start")
+    result = call_next(data, corr_id)
+    events.append("around_end")
+    return result
+
+
+MiddlewareTestHandler.add_middleware(MiddlewareKindEnum.AROUND, timing)
+MiddlewareTestHandler.add_middleware(
+    MiddlewareKindEnum.BEFORE, require_token, methods=["echo"]
+)
+MiddlewareTestHandler.add_middleware(MiddlewareKindEnum.AFTER, add_trace)
+
+
+@pytest.fixture(autouse=True)
+def reset_events():
+    events.clear()
+
+
+def test_middlewares_run_in_order():
+    response = MiddlewareTestHandler.process_data(
+        {"method": "echo", "token": "t", "request": 1}, "corr_id"
+    )
+
+    assert response == {"echo": 1, "traced": True}
+    assert events == ["around_start", "before", "process", "after", "around_end"]
+
+
+def test_before_hook_can_reject():
+    with pytest.raises(ServiceException):
+        MiddlewareTestHandler.process_data({"method": "echo", "request": 1}, "corr_id")
+
+    assert "process" not in events
+
+
+def test_middlewares_on_async_handlers():
+    response = asyncio.run(
+        MiddlewareTestHandler.process_data(
+            {"method": "async_echo", "request": 2}, "corr_id"
+        )
+    )
+
+    assert response == {"echo": 2, "traced": True}
+    assert "before" not in events
+
+
+def test_pipelines_are_compiled_once():
+    registry = MiddlewareTestHandler.get_registry()
+
+    assert set(registry._pipelines) == {"echo", "async_echo"}
+    assert PlainFamilyHandler.get_registry()._pipelines == {}
+    assert PlainFamilyHandler.process_data({"method": "plain"}, "corr_id") == {
+        "plain": True
+    }
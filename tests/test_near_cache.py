@@ -0,0 +1,59 @@
+import time
+import pytest
+from mrkutil.cache import NearCache, RedisBase
+from mrkutil.cache.near_cache import MISSING
+
+
+@pytest.fixture
+def replicas():
+    first = RedisBase(key="test_near", near_cache=NearCache(maxsize=10, ttl=60))
+    second = RedisBase(key="test_near", near_cache=NearCache(maxsize=10, ttl=60))
+    time.sleep(0.2)
+    yield first, second
+    first.near_cache.close()
+    second.near_cache.close()
+    first.delete_keys("*")
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_reads_are_served_from_process(replicas):
+    first, _ = replicas
+    first.set("hot", {"value": 1})
+
+    assert first.get("hot") == {"value": 1}
+    assert first.get("hot") == {"value": 1}
+
+    stats = first.near_cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_writes_invalidate_other_replicas(replicas):
+    first, second = replicas
+    first.set("shared", {"value": 1})
+    assert second.get("shared") == {"value": 1}
+
+    first.set("shared", {"value": 2})
+
+    assert wait_for(lambda: second.near_cache.local.get("shared", MISSING) is MISSING)
+    assert second.get("shared") == {"value": 2}
+    assert second.near_cache.stats()["invalidations"] == 1
+
+
+def test_stale_read_is_not_cached():
+    near_cache = NearCache()
+    generation = near_cache.generation
+
+    near_cache.invalidate(["key"])
+    near_cache.set("key", {"value": "stale"}, generation)
+
+    assert near_cache.get("key") is MISSING
@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import defaultdict
+import pytest
+from mrkutil.base import BaseHandler
+from mrkutil.communication import (
+    listen,
+    trigger_service,
+    ConsistentHashRing,
+    RetryPolicy,
+)
+from mrkutil.communication.partition import (
+    owned_partitions,
+    partition_for_request,
+)
+
+MEMORY_URL = "memory://partition_test"
+
+processed = defaultdict(list)
+processed_lock = threading.Lock()
+
+
+class PartitionRecordHandler(BaseHandler):
+    @staticmethod
+    def name():
+        return "partition_record"
+
+    def process(self, data, corr_id):
+        request = data["request"]
+        # Give a later message the chance to overtake if ordering were not preserved
+        time.sleep(0.001 * (request["seq"] % 3))
+        with processed_lock:
+            processed[request["entity_id"]].append(
+                (request["seq"], threading.current_thread().name)
+            )
+        return None
+
+
+def test_ring_is_deterministic_and_balanced():
+    ring = ConsistentHashRing(8)
+    other = ConsistentHashRing(8)
+    counts = defaultdict(int)
+    for i in range(8000):
+        partition = ring.get_partition(f"user-{i}")
+        assert partition == other.get_partition(f"user-{i}")
+        counts[partition] += 1
+
+    assert set(counts) == set(range(8))
+    assert min(counts.values()) > 500
+
+
+def test_ring_moves_few_keys_when_growing():
+    small, large = ConsistentHashRing(8), ConsistentHashRing(9)
+    keys = [f"order-{i}" for i in range(5000)]
+
+    moved = sum(small.get_partition(k) != large.get_partition(k) for k in keys)
+
+    # Ideal is 1/9 of the keys, a modulo scheme would move about 8/9
+    assert moved < len(keys) * 0.25
+
+
+def test_owned_partitions_split_between_replicas():
+    assert owned_partitions(6, 0, 2) == [0, 2, 4]
+    assert owned_partitions(6, 1, 2) == [1, 3, 5]
+    with pytest.raises(ValueError):
+        owned_partitions(6, 2, 2)
+
+
+def test_partition_for_request_reads_request_field():
+    data = {"method": "m", "request": {"entity_id": "abc"}}
+
+    assert partition_for_request(data, "entity_id", 4, "corr") == ConsistentHashRing(
+        4
+    ).get_partition("abc")
+
+
+def test_partitioned_listen_preserves_per_key_order():
+    BaseHandler.initialize()
+    for replica_index in range(2):
+        threading.Thread(
+            target=listen,
+            kwargs={
+                "exchange": "partition_exchange",
+                "exchange_type": "direct",
+                "queue": "partition_queue",
+                "use_job_cache": False,
+                "rabbit_url": MEMORY_URL,
+                "partitions": 4,
+                "replica_index": replica_index,
+                "replica_count": 2,
+            },
+            daemon=True,
+        ).start()
+    time.sleep(0.2)
+
+    entities = [f"entity-{i}" for i in range(6)]
+    for seq in range(10):
+        for entity_id in entities:
+            trigger_service(
+                request_data={
+                    "method": "partition_record",
+                    "request": {"entity_id": entity_id, "seq": seq},
+                },
+                destination="partition_exchange",
+                source="partition_caller",
+                rabbit_url=MEMORY_URL,
+                partition_key="entity_id",
+                partitions=4,
+            )
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        with processed_lock:
+            if sum(len(processed[e]) for e in entities) == 60:
+                break
+        time.sleep(0.05)
+
+    for entity_id in entities:
+        records = processed[entity_id]
+        assert [seq for seq, _ in records] == list(range(10))
+        # Every message of one entity is handled by the same partition consumer
+        assert len({thread for _, thread in records}) == 1
+
+
+def test_partitioned_listen_rejects_retries():
+    with pytest.raises(ValueError):
+        listen(
+            exchange="partition_exchange",
+            exchange_type="direct",
+            queue="partition_queue",
+            rabbit_url=MEMORY_URL,
+            partitions=4,
+            retry_policy=RetryPolicy(),
+        )
+
+
+def test_partitioned_listen_rejects_replicas_without_partitions():
+    with pytest.raises(ValueError, match="Replica 3 owns none of the 2 partitions"):
+        listen(
+            exchange="partition_exchange",
+            exchange_type="direct",
+            queue="partition_queue",
+            rabbit_url=MEMORY_URL,
+            partitions=2,
+            replica_index=3,
+            replica_count=4,
+        )
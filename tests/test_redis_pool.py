@@ -0,0 +1,103 @@
+import asyncio
+import redis
+from mrkutil.cache import (
+    AJobCache,
+    AsyncRedisBase,
+    JobCache,
+    RedisBase,
+    aclose_pools,
+    close_pools,
+)
+from mrkutil.cache.job_notifier import JobNotifier
+from mrkutil.cache import redis_pool
+from mrkutil.cache.redis_pool import get_async_client, get_client
+
+
+def test_clients_share_pool():
+    first = RedisBase(key="pool_test")
+    second = JobCache()
+    other_db = RedisBase(key="pool_test", db=1)
+
+    assert first.server.connection_pool is second.server.connection_pool
+    assert first.server.connection_pool is not other_db.server.connection_pool
+
+
+def test_close_pools_creates_new_pool():
+    pool = RedisBase().server.connection_pool
+
+    close_pools()
+
+    assert RedisBase().server.connection_pool is not pool
+
+
+def test_job_notifier_is_shared_per_pool():
+    channel = "pool_test_events"
+    notifiers = {id(JobNotifier.get(get_client(), channel)) for _ in range(20)}
+    notifier = JobNotifier.get(get_client(), channel)
+
+    assert notifiers == {id(notifier)}
+
+    close_pools()
+
+    assert JobNotifier.get(get_client(), channel) is not notifier
+    assert len([x for x in JobNotifier._instances if x[1] == channel]) == 1
+
+
+def test_async_clients_share_pool_per_event_loop():
+    async def pools():
+        first = AsyncRedisBase(key="pool_test").server.connection_pool
+        second = AJobCache().server.connection_pool
+        await aclose_pools()
+        return first, second
+
+    first, second = asyncio.run(pools())
+    other_loop, _ = asyncio.run(pools())
+
+    assert first is second
+    assert other_loop is not first
+
+
+def test_async_clients_of_closed_loops_are_evicted():
+    async def client():
+        return get_async_client()
+
+    for _ in range(5):
+        asyncio.run(client())
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(client())
+
+    assert list(redis_pool._async_clients) == [loop]
+    loop.run_until_complete(aclose_pools())
+    loop.close()
+    assert redis_pool._async_clients == {}
+
+
+def test_cluster_falls_back_to_single_node(monkeypatch):
+    monkeypatch.setattr("mrkutil.cache.redis_pool._cluster_enabled", {})
+
+    cache = RedisBase(key="pool_test", host="127.0.0.1", port=1, cluster=True)
+
+    assert isinstance(cache.server, redis.Redis)
+
+
+def test_cluster_client_is_shared(monkeypatch):
+    monkeypatch.setattr(
+        "mrkutil.cache.redis_pool.cluster_enabled", lambda host, port: True
+    )
+    monkeypatch.setattr("mrkutil.cache.redis_pool._clusters", {})
+    monkeypatch.setattr(
+        "mrkutil.cache.redis_pool.RedisCluster", lambda **kwargs: object()
+    )
+
+    first = RedisBase(key="pool_test", cluster=True)
+    second = RedisBase(key="other", cluster=True)
+
+    assert first.server is second.server
+    assert not isinstance(first.server, redis.Redis)
+
+
+def test_hash_tag_key_layout():
+    assert RedisBase(key="jobs")._key == "jobs"
+    assert RedisBase(key="jobs", hash_tag=True)._key == "{jobs}"
+    assert RedisBase(key="jobs", hash_tag="tenant1")._key == "{tenant1}jobs"
+    assert AsyncRedisBase(key="jobs", hash_tag=True)._key == "{jobs}"
@@ -0,0 +1,101 @@
+import threading
+import time
+import orjson
+from mrkutil.base import BaseHandler
+from mrkutil.communication import listen, trigger_service, MemoryBroker, RetryPolicy
+
+MEMORY_URL = "memory://retry_test"
+
+attempts = {"flaky": 0, "broken": 0}
+
+
+class RetryTestHandler(BaseHandler):
+    sub_classes = {}
+
+    @staticmethod
+    def name():
+        return None
+
+
+class FlakyHandler(RetryTestHandler):
+    succeeded = threading.Event()
+
+    @staticmethod
+    def name():
+        return "flaky"
+
+    def process(self, data, corr_id):
+        attempts["flaky"] += 1
+        if attempts["flaky"] < 3:
+            raise ConnectionError("Transient failure")
+        FlakyHandler.succeeded.set()
+        return {"attempts": attempts["flaky"]}
+
+
+class BrokenHandler(RetryTestHandler):
+    @staticmethod
+    def name():
+        return "broken"
+
+    def process(self, data, corr_id):
+        attempts["broken"] += 1
+        raise ValueError("Poison message")
+
+
+def test_retry_policy_delays():
+    policy = RetryPolicy(max_retries=5, base_delay=1, multiplier=2, max_delay=5)
+
+    assert [policy.delay(n) for n in range(1, 6)] == [1, 2, 4, 5, 5]
+
+
+def test_listen_retries_and_quarantines():
+    broker = MemoryBroker.from_url(MEMORY_URL)
+    broker.exchange_declare("retry_caller")
+    replies = broker.queue_declare("retry_caller_queue")
+    broker.queue_bind("retry_caller_queue", "retry_caller")
+
+    threading.Thread(
+        target=listen,
+        kwargs={
+            "exchange": "retry_service",
+            "exchange_type": "direct",
+            "queue": "retry_service_queue",
+            "base_handler": RetryTestHandler,
+            "use_job_cache": False,
+            "rabbit_url": MEMORY_URL,
+            "retry_policy": RetryPolicy(max_retries=2, base_delay=0.05),
+        },
+        daemon=True,
+    ).start()
+    time.sleep(0.2)
+
+    for method in ("flaky", "broken"):
+        trigger_service(
+            request_data={"method": method, "request": {}},
+            destination="retry_service",
+            source="retry_caller",
+            corr_id=f"corr-{method}",
+            rabbit_url=MEMORY_URL,
+        )
+
+    assert FlakyHandler.succeeded.wait(2), "Flaky message did not succeed on retry"
+    quarantined = None
+    deadline = time.monotonic() + 2
+    while quarantined is None and time.monotonic() < deadline:
+        queue = broker.get_queue("retry_service_quarantine")
+        quarantined = queue.get(timeout=0.1) if queue is not None else None
+        time.sleep(0.05)
+
+    assert attempts == {"flaky": 3, "broken": 3}
+    assert quarantined is not None, "Broken message was not quarantined"
+    message = orjson.loads(quarantined.body)
+    assert message["meta"]["retryCount"] == 2
+    assert message["meta"]["error"] == "Poison message"
+    assert message["data"]["method"] == "broken"
+
+    received = {}
+    for _ in range(2):
+        reply = orjson.loads(replies.get(timeout=1).body)
+        received[reply["meta"]["correlationId"]] = reply["data"]
+    assert received["corr-flaky"] == {"attempts": 3}
+    assert received["corr-broken"]["code"] == 500
@@ -0,0 +1,85 @@
+import datetime
+import uuid
+from dataclasses import dataclass
+
+import pytest
+from mrkutil.cache import MsgpackCodec, OrjsonCodec, RawCodec, RedisBase
+
+
+@dataclass
+class Point:
+    x: int
+    y: int
+
+
+def test_orjson_codec_types():
+    codec = OrjsonCodec()
+    created = datetime.datetime(2024, 1, 2, 3, 4, 5)
+    identifier = uuid.UUID(int=1)
+
+    data = codec.decode(
+        codec.encode(
+            {"point": Point(1, 2), "created": created, "id": identifier, "tags": {"a"}}
+        )
+    )
+
+    assert data == {
+        "point": {"x": 1, "y": 2},
+        "created": "2024-01-02T03:04:05",
+        "id": str(identifier),
+        "tags": ["a"],
+    }
+    assert codec.decode(codec.encode(Point(1, 2)), type=Point) == Point(1, 2)
+    assert codec.decode(codec.encode([1, 2])) == [1, 2]
+
+
+def test_orjson_codec_pydantic():
+    pydantic = pytest.importorskip("pydantic")
+
+    class User(pydantic.BaseModel):
+        id: int
+        name: str
+
+    codec = OrjsonCodec()
+
+    assert codec.decode(codec.encode(User(id=1, name="a")), type=User) == User(
+        id=1, name="a"
+    )
+
+
+def test_msgpack_codec():
+    pytest.importorskip("msgpack")
+    codec = MsgpackCodec()
+
+    assert codec.decode(codec.encode({"a": [1, b"raw"]})) == {"a": [1, b"raw"]}
+    assert codec.decode(codec.encode(Point(1, 2)), type=Point) == Point(1, 2)
+
+
+def test_raw_codec():
+    codec = RawCodec()
+
+    assert codec.decode(codec.encode(b"\x01\x02")) == b"\x01\x02"
+    assert codec.decode(codec.encode("text"), type=str) == "text"
+    with pytest.raises(TypeError):
+        codec.encode({"a": 1})
+
+
+def test_redis_base_codec():
+    cache = RedisBase(key="test_codec", codec=OrjsonCodec())
+    cache.set("list", [1, 2, 3])
+    cache.set("point", Point(1, 2))
+
+    assert cache.get("list") == [1, 2, 3]
+    assert cache.get("point", type=Point) == Point(1, 2)
+    assert cache.get_many(["point", "missing"], type=Point) == [Point(1, 2), None]
+    assert cache.get("missing", type=Point) is None
+    cache.delete_keys("*")
+
+
+def test_redis_base_typed_get_without_codec():
+    cache = RedisBase(key="test_codec")
+    cache.set("point", {"x": 1, "y": 2})
+
+    assert cache.get("point", type=Point) == Point(1, 2)
+    assert cache.get_multiple(["point"], type=Point) == [Point(1, 2)]
+    cache.delete_keys("*")
@@ -0,0 +1,47 @@
+import threading
+from mrkutil.service import StartupReport
+from mrkutil.service.startup import run_warm_up_hooks
+from mrkutil.utilities import import_all_subclasses_from_package
+
+
+def test_warm_up_hooks_run_concurrently():
+    barrier = threading.Barrier(2, timeout=2)
+    report = StartupReport()
+
+    def open_pool():
+        barrier.wait()
+
+    def prime_cache():
+        barrier.wait()
+
+    def broken():
+        raise ConnectionError("Service unavailable")
+
+    with report.phase("warm_up"):
+        run_warm_up_hooks(
+            [open_pool, prime_cache, broken], max_workers=3, report=report
+        )
+
+    assert len(report.hooks) == 3
+    assert report.failed_hooks == [
+        f"{__name__}.test_warm_up_hooks_run_concurrently.<locals>.broken"
+    ]
+    assert report.phases["warm_up"] > 0
+
+
+def test_import_times_are_recorded(tmp_path, monkeypatch):
+    package = tmp_path / "startup_pkg"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "slow.py").write_text("import time\ntime.sleep(0.05)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    report = StartupReport()
+
+    import_all_subclasses_from_package("startup_pkg", import_times=report.imports)
+
+    assert set(report.imports) == {"startup_pkg", "startup_pkg.slow"}
+    assert report.imports["startup_pkg.slow"] >= 0.05
+    assert list(report.as_dict()["slowest_imports"]) == [
+        "startup_pkg.slow",
+        "startup_pkg",
+    ]